@@ -0,0 +1,114 @@
+"""
+Latencia desde la creación de la tarea hasta el token (p50/p95) contra la API
+de Anti-Captcha local de las pruebas (tests/fake_anticaptcha.py).
+
+Cada resolución tarda en el servidor un tiempo aleatorio (semilla fija). Se
+lanzan todas a la vez y se compara:
+
+- bloqueante: la cadencia del cliente anterior (anticaptchaofficial): un hilo
+  por resolución, 3 s fijos antes de consultar y después una consulta cada
+  segundo, con un cliente HTTP síncrono.
+- asyncio:    ClienteAnticaptcha con varias combinaciones de espera inicial e
+  intervalo, todas las resoluciones en el mismo bucle y la misma conexión.
+
+"espera extra" es la latencia menos lo que tarda el servidor en resolver:
+el tiempo que el token estuvo listo sin que nadie lo recogiera.
+
+    python -m benchmarks.bench_anticaptcha [--intentos 12] [--semilla 7]
+"""
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import redirect_stdout
+import argparse
+import asyncio
+import io
+import random
+import statistics
+import time
+
+import httpx
+
+from src.anticaptcha import ClienteAnticaptcha
+from tests.fake_anticaptcha import ServidorAnticaptcha
+
+_AJUSTES_ASYNC = [(3.0, 1.0), (1.0, 0.5), (1.0, 0.25), (0.5, 0.1)]
+
+
+def _percentiles(valores: list[float]) -> str:
+    cortes = statistics.quantiles(valores, n=20, method="inclusive")
+    return f"p50 {statistics.median(valores):5.2f}s  p95 {cortes[18]:5.2f}s"
+
+
+def _tarea(url: str) -> dict:
+    return {
+        "type": "RecaptchaV3TaskProxyless",
+        "websiteURL": url,
+        "websiteKey": "6Lc-bench",
+        "minScore": 0.9,
+        "pageAction": "login",
+        "isEnterprise": True,
+        "apiDomain": "www.recaptcha.net",
+    }
+
+
+def _bloqueante(http: httpx.Client, url: str) -> float:
+    inicio = time.perf_counter()
+    task_id = http.post("/createTask", json={"clientKey": "bench", "task": _tarea(url)}).json()["taskId"]
+    time.sleep(3)
+    while True:
+        time.sleep(1)
+        resultado = http.post("/getTaskResult", json={"clientKey": "bench", "taskId": task_id}).json()
+        if resultado["status"] == "ready":
+            return time.perf_counter() - inicio
+
+
+def _medir_bloqueante(api: ServidorAnticaptcha, urls: list[str]) -> list[float]:
+    with httpx.Client(base_url=api.url) as http, ThreadPoolExecutor(max_workers=len(urls)) as hilos:
+        return list(hilos.map(lambda url: _bloqueante(http, url), urls))
+
+
+def _medir_async(api: ServidorAnticaptcha, urls: list[str], primera: float, intervalo: float) -> list[float]:
+    async def _una(cliente: ClienteAnticaptcha, url: str) -> float:
+        inicio = time.perf_counter()
+        await cliente.resolver_recaptcha_v3(url, "6Lc-bench", "login")
+        return time.perf_counter() - inicio
+
+    async def _todas() -> list[float]:
+        async with ClienteAnticaptcha(
+            "bench", base_url=api.url, primera_consulta_seg=primera, intervalo_seg=intervalo
+        ) as cliente:
+            return list(await asyncio.gather(*(_una(cliente, url) for url in urls)))
+
+    with redirect_stdout(io.StringIO()):
+        return asyncio.run(_todas())
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--intentos", type=int, default=12)
+    parser.add_argument("--semilla", type=int, default=7)
+    args = parser.parse_args()
+
+    azar = random.Random(args.semilla)
+    urls = [f"https://cloud.mongodb.com/bench/{i}" for i in range(args.intentos)]
+    duraciones = {url: azar.uniform(1.0, 6.0) for url in urls}
+    print(f"{args.intentos} resolución(es) simultáneas por modo, el servidor tarda entre 1.0 y 6.0 s")
+
+    modos = [("bloqueante 3s/1s", lambda api: _medir_bloqueante(api, urls))]
+    modos += [
+        (f"asyncio {p:g}s/{i:g}s", lambda api, p=p, i=i: _medir_async(api, urls, p, i))
+        for p, i in _AJUSTES_ASYNC
+    ]
+    for nombre, medir in modos:
+        with ServidorAnticaptcha(duracion=lambda task: duraciones[task["websiteURL"]]) as api:
+            inicio = time.perf_counter()
+            latencias = medir(api)
+            total = time.perf_counter() - inicio
+            esperas = [lat - duraciones[url] for url, lat in zip(urls, latencias)]
+            consultas = api.peticiones["getTaskResult"] / len(urls)
+        print(f"  {nombre:<20} hasta el token: {_percentiles(latencias)}   "
+              f"espera extra: {_percentiles(esperas)}   "
+              f"{consultas:.1f} consulta(s)/token   total {total:.1f}s")
+
+
+if __name__ == "__main__":
+    main()
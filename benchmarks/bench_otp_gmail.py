@@ -0,0 +1,69 @@
+"""
+Latencia hasta el OTP (p50/p95) contra la API de Gmail local de las pruebas.
+
+Cada intento marca el buzón, "envía" el código y el servidor entrega el
+correo tras un retraso aleatorio (semilla fija). Se mide el tiempo desde el
+envío hasta que obtener_otp devuelve el código y cuánto de ese tiempo es
+espera del bot (latencia - retraso de entrega), con el historial
+(users.history.list) y con la búsqueda clásica (messages.list).
+
+    python -m benchmarks.bench_otp_gmail [--intentos 20] [--semilla 7]
+"""
+from contextlib import redirect_stdout
+import argparse
+import io
+import random
+import statistics
+import time
+
+from src import gmail_otp
+from tests.fake_gmail import ServidorGmail
+
+
+def _percentiles(valores: list[float]) -> str:
+    cortes = statistics.quantiles(valores, n=20, method="inclusive")
+    return f"p50 {statistics.median(valores):5.2f}s  p95 {cortes[18]:5.2f}s"
+
+
+def _medir(gmail: ServidorGmail, modo: str, retrasos: list[float]) -> tuple[list[float], list[float], int]:
+    latencias, esperas = [], []
+    peticiones_antes = sum(gmail.peticiones.values())
+    for i, retraso in enumerate(retrasos):
+        otp = f"{100000 + i}"
+        marca = gmail_otp.marcar_buzon() if modo == "historial" else None
+        envio = time.time()
+        gmail.entregar(otp, retraso=retraso)
+        with redirect_stdout(io.StringIO()):
+            leido = gmail_otp.obtener_otp(timeout_seg=30, after_ts=envio, history_id=marca)
+        latencia = time.time() - envio
+        assert leido == otp, (leido, otp)
+        latencias.append(latencia)
+        esperas.append(latencia - retraso)
+    return latencias, esperas, sum(gmail.peticiones.values()) - peticiones_antes
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--intentos", type=int, default=20)
+    parser.add_argument("--semilla", type=int, default=7)
+    args = parser.parse_args()
+
+    azar = random.Random(args.semilla)
+    retrasos = [azar.uniform(0.5, 3.0) for _ in range(args.intentos)]
+    print(f"{args.intentos} intento(s) por modo, entrega entre 0.5 y 3.0 s; "
+          f"OTP_INTERVALO_MIN/MAX_SEG = {gmail_otp.config.OTP_INTERVALO_MIN_SEG}/"
+          f"{gmail_otp.config.OTP_INTERVALO_MAX_SEG}, OTP_VENTANA_RAPIDA_SEG = "
+          f"{gmail_otp.config.OTP_VENTANA_RAPIDA_SEG}")
+
+    with ServidorGmail() as gmail:
+        service = gmail.servicio()
+        gmail_otp._get_service = lambda: service
+        for modo in ("historial", "busqueda"):
+            latencias, esperas, peticiones = _medir(gmail, modo, retrasos)
+            print(f"  {modo:<10} hasta el OTP: {_percentiles(latencias)}   "
+                  f"espera del bot: {_percentiles(esperas)}   "
+                  f"{peticiones / len(retrasos):.1f} petición(es)/login")
+
+
+if __name__ == "__main__":
+    main()
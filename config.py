@@ -36,34 +36,116 @@ OUTPUT_DIR: Path = _resolve(_resultados_dir or os.getenv("OUTPUT_DIR"), "output/
 # ── Configuración del cluster ─────────────────────────────────────────────────
 CLUSTER_NAME: str = "vis-data-prd"
 LOG_SERVER: str = "vis-data-prd-shard-00-02.ofu2u.mongodb.net"
+# Proyecto PortalSistemas (organización Interseguro) y enlace directo a su lista de clusters
+ATLAS_PROJECT_ID: str = os.getenv("ATLAS_PROJECT_ID", "66ba761f5acbaa376da8f5b3")
+ATLAS_CLUSTERS_URL: str = os.getenv("ATLAS_CLUSTERS_URL", "https://cloud.mongodb.com/v2/{project_id}#/clusters")
+# "enlace": ir directo a la lista de clusters; "clics": organización → proyecto → Clusters
+ATLAS_NAVEGACION: str = os.getenv("ATLAS_NAVEGACION", "enlace").lower()
+# Descargar los logs por HTTP con las cookies del navegador en vez de desde el modal
+ATLAS_DESCARGA_HTTP: bool = os.getenv("ATLAS_DESCARGA_HTTP", "False").lower() == "true"
+# Plantilla de la URL del log: {project_id}, {cluster}, {hostname}, {proceso}, {inicio}, {fin} (epoch s).
+# Sin valor por defecto: hay que copiarla de una descarga real del modal (obligatoria con ATLAS_DESCARGA_HTTP)
+ATLAS_LOG_URL: str = os.getenv("ATLAS_LOG_URL", "")
+ATLAS_DESCARGA_BLOQUE_KB: int = int(os.getenv("ATLAS_DESCARGA_BLOQUE_KB", "1024"))
 
 # ── Navegador ─────────────────────────────────────────────────────────────
 PAGE_TIMEOUT: int = int(os.getenv("PAGE_TIMEOUT", "60")) * 1000  # Playwright usa ms
 HEADLESS: bool = os.getenv("HEADLESS", "False").lower() == "true"
 USE_GOOGLE_LOGIN: bool = os.getenv("USE_GOOGLE_LOGIN", "False").lower() == "true"
+# Intentos de login; cada reintento usa un contexto nuevo sobre el mismo navegador
+ATLAS_LOGIN_REINTENTOS: int = int(os.getenv("ATLAS_LOGIN_REINTENTOS", "4"))
 # Usar Chrome instalado en el sistema (menos detectable que Chromium). Si no está, se usa Chromium.
 USE_CHROME_REAL: bool = os.getenv("USE_CHROME_REAL", "True").lower() == "true"
 # CHROME_PROFILE_DIR solo es relevante cuando USE_GOOGLE_LOGIN=True.
 _chrome_profile_raw = os.getenv("CHROME_PROFILE_DIR", "").strip()
 CHROME_PROFILE_DIR: Path | None = Path(_chrome_profile_raw) if _chrome_profile_raw else None
 CHROME_PROFILE_SUBDIR: str = os.getenv("CHROME_PROFILE_SUBDIR", "Default")
+# Reutilizar la sesión de Atlas entre ejecuciones (storage_state cifrado con DPAPI, solo Windows)
+ATLAS_SESION_REUTILIZAR: bool = os.getenv("ATLAS_SESION_REUTILIZAR", "True").lower() == "true"
+ATLAS_SESION_PATH: Path = _resolve(os.getenv("ATLAS_SESION_PATH"), "output/atlas_sesion.bin")
+ATLAS_SESION_MAX_HORAS: float = float(os.getenv("ATLAS_SESION_MAX_HORAS", "12"))
+# Conectarse al Chrome caliente de `python -m src.browser_daemon` (CDP) en vez de lanzar uno por ejecución
+BROWSER_DAEMON: bool = os.getenv("BROWSER_DAEMON", "False").lower() == "true"
+BROWSER_DAEMON_PUERTO: int = int(os.getenv("BROWSER_DAEMON_PUERTO", "9333"))
+BROWSER_DAEMON_ESTADO_PATH: Path = _resolve(os.getenv("BROWSER_DAEMON_ESTADO_PATH"), "output/browser_daemon.json")
+# El daemon recicla Chrome tras N ejecuciones (en cuanto no haya ninguna activa) y lo revisa cada X segundos
+BROWSER_DAEMON_RECICLAR_CADA: int = int(os.getenv("BROWSER_DAEMON_RECICLAR_CADA", "50"))
+BROWSER_DAEMON_CHEQUEO_SEG: float = float(os.getenv("BROWSER_DAEMON_CHEQUEO_SEG", "30"))
+# Ritmo de interacción: "fast" (sin pausas humanas) o "stealth" (pausas de lectura, tecleo y mouse)
+PERFIL_TIEMPOS: str = os.getenv("PERFIL_TIEMPOS", "fast").lower()
 
 # ── Anti-Captcha ──────────────────────────────────────────────────────────────
 ANTICAPTCHA_API_KEY: str = os.getenv("ANTICAPTCHA_API_KEY", "")
+ANTICAPTCHA_URL: str = os.getenv("ANTICAPTCHA_URL", "https://api.anti-captcha.com")
+# Espera antes de la primera consulta del resultado, intervalo entre consultas y límite total
+ANTICAPTCHA_PRIMERA_CONSULTA_SEG: float = float(os.getenv("ANTICAPTCHA_PRIMERA_CONSULTA_SEG", "3"))
+ANTICAPTCHA_INTERVALO_SEG: float = float(os.getenv("ANTICAPTCHA_INTERVALO_SEG", "1"))
+ANTICAPTCHA_TIMEOUT_SEG: float = float(os.getenv("ANTICAPTCHA_TIMEOUT_SEG", "120"))
 # Site key pública de reCAPTCHA Enterprise de MongoDB Atlas (parámetro k= del iframe)
 RECAPTCHA_SITE_KEY: str = os.getenv("RECAPTCHA_SITE_KEY", "6Lc29rwlAAAAAJptGFZvZDUg48E5BVcqa1QVxeXG")
+# Pool de tokens ya resueltos compartido entre procesos (0 = desactivado).
+# Se rellena con `python -m src.captcha_pool`; solo se entregan tokens con menos de TTL segundos.
+# El relleno solo corre si alguna ejecución pidió un token en los últimos INACTIVIDAD segundos.
+CAPTCHA_POOL_TAMANO: int = int(os.getenv("CAPTCHA_POOL_TAMANO", "0"))
+CAPTCHA_POOL_TTL_SEG: float = float(os.getenv("CAPTCHA_POOL_TTL_SEG", "75"))
+CAPTCHA_POOL_INACTIVIDAD_SEG: float = float(os.getenv("CAPTCHA_POOL_INACTIVIDAD_SEG", "300"))
+CAPTCHA_POOL_PATH: Path = _resolve(os.getenv("CAPTCHA_POOL_PATH"), "output/captcha_pool.json")
 
 # ── Gmail / OTP ───────────────────────────────────────────────────────────────
 GMAIL_CLIENT_ID: str = os.getenv("GMAIL_CLIENT_ID", "")
 GMAIL_CLIENT_SECRET: str = os.getenv("GMAIL_CLIENT_SECRET", "")
 GMAIL_CREDS_PATH: Path = Path(os.getenv("GMAIL_CREDS_PATH", "AuthParaScriptingIago.json"))
 GMAIL_TOKEN_PATH: Path = Path(os.getenv("GMAIL_TOKEN_PATH", "token.json"))
+# Segundos antes de la caducidad del access token en que se refresca en segundo plano
+GOOGLE_TOKEN_MARGEN_SEG: int = int(os.getenv("GOOGLE_TOKEN_MARGEN_SEG", "300"))
 OTP_TIMEOUT_SEG: int = int(os.getenv("OTP_TIMEOUT_SEG", "60"))
+# Sondeo del historial de Gmail: intervalo fijo OTP_INTERVALO_MIN_SEG durante los primeros
+# OTP_VENTANA_RAPIDA_SEG tras "Send Code" (cuando suele llegar el correo); después crece
+# x1.5 en cada consulta hasta OTP_INTERVALO_MAX_SEG
+OTP_INTERVALO_MIN_SEG: float = float(os.getenv("OTP_INTERVALO_MIN_SEG", "0.5"))
+OTP_INTERVALO_MAX_SEG: float = float(os.getenv("OTP_INTERVALO_MAX_SEG", "2"))
+OTP_VENTANA_RAPIDA_SEG: float = float(os.getenv("OTP_VENTANA_RAPIDA_SEG", "10"))
+# Backend del OTP: "gmail_api" (historial de Gmail) o "imap" (IMAP IDLE, con la API como respaldo)
+OTP_BACKEND: str = os.getenv("OTP_BACKEND", "gmail_api").lower()
+IMAP_HOST: str = os.getenv("IMAP_HOST", "imap.gmail.com")
+IMAP_PORT: int = int(os.getenv("IMAP_PORT", "993"))
+IMAP_USER: str = os.getenv("IMAP_USER", "")
+IMAP_PASSWORD: str = os.getenv("IMAP_PASSWORD", "")
+# "password" (contraseña de aplicación) o "xoauth2" (token.json con scope https://mail.google.com/)
+IMAP_AUTH: str = os.getenv("IMAP_AUTH", "password").lower()
+IMAP_CARPETA: str = os.getenv("IMAP_CARPETA", "INBOX")
 
 # ── Google Drive ──────────────────────────────────────────────────────────────
 # ID de la carpeta padre en Drive donde se subirán los resultados
 # Estructura: [PADRE]/[AÑO]/[TRIMESTRE]/MONGODB/[FECHA_EJECUCION]/
 DRIVE_PARENT_FOLDER_ID: str = os.getenv("DRIVE_PARENT_FOLDER_ID", "1CKY8Wq8hKtcgifHb26krW9ajctX4j-HR")
+# Subidas concurrentes: carril de archivos pequeños (evidencias, IPE) y carril
+# separado para archivos grandes (logs .gz) a partir de DRIVE_LARGE_FILE_MB.
+DRIVE_UPLOAD_WORKERS: int = int(os.getenv("DRIVE_UPLOAD_WORKERS", "4"))
+DRIVE_LARGE_UPLOAD_WORKERS: int = int(os.getenv("DRIVE_LARGE_UPLOAD_WORKERS", "2"))
+DRIVE_LARGE_FILE_MB: int = int(os.getenv("DRIVE_LARGE_FILE_MB", "20"))
+# Control de cuota: tasa máxima (req/s) y ráfaga del token bucket, y reintentos
+# con backoff exponencial por clase de error (cuota 403/429, servidor 5xx, red)
+DRIVE_MAX_RPS: float = float(os.getenv("DRIVE_MAX_RPS", "10"))
+DRIVE_RAFAGA: int = int(os.getenv("DRIVE_RAFAGA", "10"))
+DRIVE_REINTENTOS_CUOTA: int = int(os.getenv("DRIVE_REINTENTOS_CUOTA", "8"))
+DRIVE_REINTENTOS_SERVIDOR: int = int(os.getenv("DRIVE_REINTENTOS_SERVIDOR", "5"))
+DRIVE_REINTENTOS_RED: int = int(os.getenv("DRIVE_REINTENTOS_RED", "4"))
+# Sincronización incremental: no re-subir archivos cuyo MD5 ya coincide con el de Drive
+DRIVE_SYNC_INCREMENTAL: bool = os.getenv("DRIVE_SYNC_INCREMENTAL", "True").lower() == "true"
+# Subidas reanudables: tamaño de chunk (múltiplo de 256 KB) y estado persistido de sesiones
+DRIVE_CHUNK_MB: int = int(os.getenv("DRIVE_CHUNK_MB", "8"))
+DRIVE_UPLOAD_STATE_PATH: Path = _resolve(os.getenv("DRIVE_UPLOAD_STATE_PATH"), "output/drive_upload_state.json")
+# Empaquetar las capturas PNG de cada carpeta en un tar + manifiesto JSON (una sola subida)
+DRIVE_EMPAQUETAR_EVIDENCIAS: bool = os.getenv("DRIVE_EMPAQUETAR_EVIDENCIAS", "False").lower() == "true"
+DRIVE_EMPAQUETAR_MAX_MB: float = float(os.getenv("DRIVE_EMPAQUETAR_MAX_MB", "5"))
+# Caché en disco (parent_id, nombre) -> folder_id para no repetir búsquedas de carpetas
+DRIVE_FOLDER_CACHE_PATH: Path = _resolve(os.getenv("DRIVE_FOLDER_CACHE_PATH"), "output/drive_folder_cache.json")
+DRIVE_FOLDER_CACHE_TTL_DIAS: int = int(os.getenv("DRIVE_FOLDER_CACHE_TTL_DIAS", "30"))
+DRIVE_FOLDER_CACHE_MAX: int = int(os.getenv("DRIVE_FOLDER_CACHE_MAX", "500"))
+# Espejo SQLite del árbol de Drive, actualizado con la Changes API (búsquedas locales)
+DRIVE_ESPEJO: bool = os.getenv("DRIVE_ESPEJO", "True").lower() == "true"
+DRIVE_ESPEJO_PATH: Path = _resolve(os.getenv("DRIVE_ESPEJO_PATH"), "output/drive_espejo.sqlite3")
 
 if GMAIL_CLIENT_ID and GMAIL_CLIENT_SECRET:
     _creds = {
@@ -90,6 +172,8 @@ def validate():
         missing.append("MONGO_PASSWORD")
     if not USE_GOOGLE_LOGIN and not ANTICAPTCHA_API_KEY:
         missing.append("ANTICAPTCHA_API_KEY")
+    if ATLAS_DESCARGA_HTTP and not ATLAS_LOG_URL:
+        missing.append("ATLAS_LOG_URL")
 
     if missing:
         raise EnvironmentError(
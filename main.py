@@ -13,12 +13,12 @@ from datetime import datetime
 from pathlib import Path
 
 import config
-from src import browser
+from src import browser, google_client, log_download, timing
 from src.dates import get_date_range, format_range_label
 from src.evidence import capturar
 import src.mongo_atlas as atlas
 from src.ipe import generar_ipe
-from src.drive import subir_resultados_a_drive, subir_archivo_a_drive
+from src.drive import SubidaEnSegundoPlano
 
 
 def main():
@@ -83,117 +83,90 @@ def main():
     start, end = get_date_range()
     print(f"\nRango de extracción: {start} → {end}")
 
+    # ── Drive: el árbol de carpetas se crea en segundo plano durante el login ──
+    subida = SubidaEnSegundoPlano(run_ts, start, end, ["mongod-audit-log", "mongod"])
+
+    rango_label = f"{start.strftime('%d%m')}-{end.strftime('%d%m')}"
+    plantilla = _PROJECT_ROOT / "assets" / "CDBD_IPE_MongoAtlas_.xlsx"
+
+    def _generar_ipe_proceso(nombre: str, carpeta: Path, capturas: list[Path]) -> None:
+        """Genera el IPE de un proceso dentro de su carpeta, con la URL de Drive ya conocida."""
+        if not plantilla.exists():
+            print(f"  [aviso] Plantilla IPE no encontrada en: {plantilla}")
+            return
+        datos_ipe = {
+            "I3": datetime.now().strftime("%d/%m/%Y"),
+            "F4": os.getlogin(),
+            "F5": f"El objetivo principal de la extracción es identificar los cambios realizados en la información de las bases de datos durante el periodo {start.strftime('%d/%m/%Y')} - {end.strftime('%d/%m/%Y')}.",
+            "C11": "x",
+            "C17": "x",
+        }
+        try:
+            generar_ipe(
+                plantilla_path=plantilla,
+                salida_path=carpeta / f"CDBD_IPE_MongoAtlas_{nombre}_{rango_label}.xlsx",
+                datos=datos_ipe,
+                imagenes=capturas,
+                hoja="Hoja 1",
+                fila_base_img=26,
+                col_img="D",
+                espaciado_filas=36,
+                drive_url=(subida.carpetas_drive().get(nombre) or {}).get("url"),
+            )
+        except Exception as e:
+            print(f"  [aviso] No se pudo generar IPE para {nombre}: {e}")
+
     page = None
     try:
         # ── Abrir navegador ────────────────────────────────────────────────────
-        page = browser.launch()
+        with timing.paso("navegador"):
+            page = browser.launch()
 
         # ── Paso 1: Login ──────────────────────────────────────────────────────
         # Capturas de login → logs/ (no son evidencia final del proceso)
-        page = atlas.login(page, logs_dir, logs_dir)
+        with timing.paso("login"):
+            page = atlas.login(page, logs_dir, logs_dir)
 
         # ── Paso 2: Navegar al cluster ─────────────────────────────────────────
         # Capturas de navegación → logs/
-        atlas.ir_al_cluster(page, logs_dir)
+        with timing.paso("ir_al_cluster"):
+            atlas.ir_al_cluster(page, logs_dir)
 
         # ── Paso 3: Ir a la sección de logs ───────────────────────────────────
         atlas.ir_a_logs(page, logs_dir)
 
-        # ── Paso 4: Descargar mongod-audit-log ────────────────────────────────
+        # ── Pasos 4 y 5: Descargar mongod-audit-log y generar su IPE ──────────
+        # La carpeta completa (log, capturas e IPE) se sube mientras se descarga la siguiente
         carpeta_audit = resultados_dir / "mongod-audit-log"
         carpeta_audit.mkdir(parents=True, exist_ok=True)
-        capturas_audit = atlas.descargar_log(page, carpeta_audit, tipo_log="audit", start=start, end=end)
-
-        # Preparar datos comunes para IPEs
-        import os
-        rango_label = f"{start.strftime('%d%m')}-{end.strftime('%d%m')}"
-        plantilla = _PROJECT_ROOT / "assets" / "CDBD_IPE_MongoAtlas_.xlsx"
-
-        # ── Paso 6: Descargar mongod ──────────────────────────────────────────
+        with timing.paso("descarga audit"):
+            capturas_audit = atlas.descargar_log(
+                page, carpeta_audit, tipo_log="audit", start=start, end=end, paso=4
+            )
+        print("\n[5/N] Generando IPE para mongod-audit-log...")
+        _generar_ipe_proceso("mongod-audit-log", carpeta_audit, capturas_audit)
+        subida.encolar(carpeta_audit)
+
+        # ── Pasos 6 y 7: Descargar mongod y generar su IPE ────────────────────
         carpeta_general = resultados_dir / "mongod"
         carpeta_general.mkdir(parents=True, exist_ok=True)
-        capturas_general = atlas.descargar_log(page, carpeta_general, tipo_log="general", start=start, end=end)
+        with timing.paso("descarga general"):
+            capturas_general = atlas.descargar_log(
+                page, carpeta_general, tipo_log="general", start=start, end=end, paso=6
+            )
+        print("\n[7/N] Generando IPE para mongod...")
+        _generar_ipe_proceso("mongod", carpeta_general, capturas_general)
+        subida.encolar(carpeta_general)
 
+        # El navegador no hace falta mientras se espera a Drive
         browser.close()
-        
-        # ── Paso 5: Subir resultados a Google Drive ──────────────────────────────
-        drive_urls = subir_resultados_a_drive(resultados_dir, run_ts, start, end) or {}
-        
-        # ── Paso 6: Generar IPE para mongod-audit-log ─────────────────────────
-        print("\n[6/N] Generando IPE para mongod-audit-log...")
-        
-        if plantilla.exists():
-            datos_ipe_audit = {
-                "I3": datetime.now().strftime("%d/%m/%Y"),
-                "F4": os.getlogin(),
-                "F5": f"El objetivo principal de la extracción es identificar los cambios realizados en la información de las bases de datos durante el periodo {start.strftime('%d/%m/%Y')} - {end.strftime('%d/%m/%Y')}.",
-                "C11": "x",
-                "C17": "x",
-            }
-            salida_ipe_audit = carpeta_audit / f"CDBD_IPE_MongoAtlas_mongod-audit-log_{rango_label}.xlsx"
-            
-            try:
-                generar_ipe(
-                    plantilla_path=plantilla,
-                    salida_path=salida_ipe_audit,
-                    datos=datos_ipe_audit,
-                    imagenes=capturas_audit,
-                    hoja="Hoja 1",
-                    fila_base_img=26,
-                    col_img="D",
-                    espaciado_filas=36,
-                    drive_url=(drive_urls.get("mongod-audit-log") or {}).get("url"),
-                )
-            except Exception as e:
-                print(f"  [aviso] No se pudo generar IPE para mongod-audit-log: {e}")
-            else:
-                try:
-                    carpeta_audit_id = (drive_urls.get("mongod-audit-log") or {}).get("id")
-                    if carpeta_audit_id:
-                        subir_archivo_a_drive(salida_ipe_audit, carpeta_audit_id)
-                        print("  ✓ IPE mongod-audit-log subida a Drive")
-                except Exception as e:
-                    print(f"  [aviso] No se pudo subir IPE mongod-audit-log a Drive: {e}")
-        else:
-            print(f"  [aviso] Plantilla IPE no encontrada en: {plantilla}")
-        
-        # ── Paso 7: Generar IPE para mongod ───────────────────────────────────
-        print("\n[7/N] Generando IPE para mongod...")
-        
-        if plantilla.exists():
-            datos_ipe_general = {
-                "I3": datetime.now().strftime("%d/%m/%Y"),
-                "F4": os.getlogin(),
-                "F5": f"El objetivo principal de la extracción es identificar los cambios realizados en la información de las bases de datos durante el periodo {start.strftime('%d/%m/%Y')} - {end.strftime('%d/%m/%Y')}.",
-                "C11": "x",
-                "C17": "x",
-            }
-            salida_ipe_general = carpeta_general / f"CDBD_IPE_MongoAtlas_mongod_{rango_label}.xlsx"
-            
-            try:
-                generar_ipe(
-                    plantilla_path=plantilla,
-                    salida_path=salida_ipe_general,
-                    datos=datos_ipe_general,
-                    imagenes=capturas_general,
-                    hoja="Hoja 1",
-                    fila_base_img=26,
-                    col_img="D",
-                    espaciado_filas=36,
-                    drive_url=(drive_urls.get("mongod") or {}).get("url"),
-                )
-            except Exception as e:
-                print(f"  [aviso] No se pudo generar IPE para mongod: {e}")
-            else:
-                try:
-                    carpeta_mongod_id = (drive_urls.get("mongod") or {}).get("id")
-                    if carpeta_mongod_id:
-                        subir_archivo_a_drive(salida_ipe_general, carpeta_mongod_id)
-                        print("  ✓ IPE mongod subida a Drive")
-                except Exception as e:
-                    print(f"  [aviso] No se pudo subir IPE mongod a Drive: {e}")
-        
-        # ── Paso 8: Guardar URL de Drive para el orquestador ─────────────────────
+
+        # ── Paso 8: Esperar a que terminen las subidas a Google Drive ─────────
+        print("\n[8/N] Esperando subida de resultados a Google Drive...")
+        with timing.paso("espera subida Drive"):
+            drive_urls = subida.finalizar()
+
+        # Guardar URL de Drive para el orquestador
         if drive_urls and drive_urls.get("execution_folder"):
             drive_url_file = resultados_dir / "drive_url.txt"
             try:
@@ -203,6 +176,11 @@ def main():
                 print(f"  [aviso] No se pudo guardar drive_url.txt: {e}")
         
         print("\n✓ Proceso completado.")
+        print(f"\nTiempos por paso (perfil '{config.PERFIL_TIEMPOS}'):")
+        print(timing.resumen())
+        for clave, m in google_client.latencias().items():
+            print(f"  [google] {clave}: primer cliente en {m['primera_ms']:.0f} ms, reutilizado en "
+                  f"{m['repetida_ms']:.2f} ms ({m['llamadas']:.0f} llamada(s), {m['construcciones']:.0f} cliente(s))")
 
     except NotImplementedError as e:
         print(f"\n[EN CONSTRUCCIÓN] {e}")
@@ -220,10 +198,17 @@ def main():
                 capturar(logs_dir, "error_inesperado", page)
             except Exception:
                 pass
-            browser.close()
         sys.exit(1)
 
     finally:
+        # También tras un error: lo ya encolado termina de subirse a Drive y
+        # se liberan el navegador y el cliente HTTP de descargas
+        try:
+            browser.close()
+        except Exception as e:
+            print(f"  [aviso] No se pudo cerrar el navegador: {e}")
+        log_download.cerrar()
+        subida.finalizar()
         if log_handle:
             log_handle.flush()
             log_handle.close()
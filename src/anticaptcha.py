@@ -1,81 +1,259 @@
 """
 Integración con Anti-Captcha para resolver reCAPTCHA Enterprise v3.
 
-MongoDB Atlas usa reCAPTCHA Enterprise servido desde www.recaptcha.net.
-La librería anticaptchaofficial no incluye isEnterprise/apiDomain en su
-payload por defecto, por eso se subclasifica y se sobreescribe solve_and_return_solution.
+MongoDB Atlas usa reCAPTCHA Enterprise servido desde www.recaptcha.net, así
+que las tareas se crean con isEnterprise/apiDomain. El cliente habla
+directamente con la API JSON de Anti-Captcha (createTask / getTaskResult)
+sobre httpx asíncrono:
+
+- Un único bucle asyncio en un hilo de fondo y un único AsyncClient con
+  conexiones keep-alive, compartidos por todas las resoluciones del proceso;
+  varias pueden estar en curso a la vez.
+- Espera antes de la primera consulta y el intervalo entre consultas son
+  configurables (ANTICAPTCHA_PRIMERA_CONSULTA_SEG, ANTICAPTCHA_INTERVALO_SEG).
+- Una resolución en curso se puede cancelar (Future.cancel).
+
+La resolución tarda decenas de segundos, así que el login la lanza en segundo
+plano (ResolucionAnticipada) en cuanto navega a Atlas y solo espera el token
+justo antes de pulsar Login.
 """
+from concurrent.futures import Future
+import asyncio
+import threading
 import time
 
-from anticaptchaofficial.recaptchav3proxyless import recaptchaV3Proxyless
+import httpx
 
 import config
+from src.captcha_pool import obtener_pool
 
+# Los tokens de reCAPTCHA v3 caducan a los 2 minutos; se deja margen para el envío
+_VIGENCIA_TOKEN_SEG = 100
 
-class _RecaptchaV3Enterprise(recaptchaV3Proxyless):
-    """
-    Extiende recaptchaV3Proxyless añadiendo soporte para reCAPTCHA Enterprise
-    y el dominio de API www.recaptcha.net que usa MongoDB Atlas.
-    """
 
-    api_domain: str = "www.recaptcha.net"
+class ClienteAnticaptcha:
+    """Cliente asyncio de la API de Anti-Captcha con conexión reutilizable."""
+
+    def __init__(
+        self,
+        api_key: str,
+        base_url: str = "https://api.anti-captcha.com",
+        primera_consulta_seg: float = 3.0,
+        intervalo_seg: float = 1.0,
+        timeout_seg: float = 120.0,
+    ):
+        self._api_key = api_key
+        self._primera_consulta_seg = primera_consulta_seg
+        self._intervalo_seg = intervalo_seg
+        self._timeout_seg = timeout_seg
+        self._http = httpx.AsyncClient(base_url=base_url, timeout=httpx.Timeout(30.0))
+
+    async def __aenter__(self) -> "ClienteAnticaptcha":
+        return self
 
-    def solve_and_return_solution(self):
-        task_payload = {
-            "clientKey": self.client_key,
+    async def __aexit__(self, *exc) -> None:
+        await self.cerrar()
+
+    async def cerrar(self) -> None:
+        await self._http.aclose()
+
+    async def _llamar(self, metodo: str, cuerpo: dict) -> dict:
+        resp = await self._http.post(f"/{metodo}", json={"clientKey": self._api_key, **cuerpo})
+        resp.raise_for_status()
+        data = resp.json()
+        if data.get("errorId"):
+            raise RuntimeError(
+                f"Anti-Captcha {metodo}: {data.get('errorCode')} - {data.get('errorDescription')}"
+            )
+        return data
+
+    async def resolver_recaptcha_v3(
+        self, page_url: str, site_key: str, action: str, min_score: float = 0.9
+    ) -> str:
+        """
+        Crea la tarea de reCAPTCHA Enterprise v3 y consulta su resultado hasta
+        que esté lista.
+
+        Raises:
+            RuntimeError: si Anti-Captcha devuelve un error.
+            TimeoutError: si la tarea no termina en `timeout_seg`.
+        """
+        inicio = time.perf_counter()
+        tarea = await self._llamar("createTask", {
             "task": {
                 "type": "RecaptchaV3TaskProxyless",
-                "websiteURL": self.website_url,
-                "websiteKey": self.website_key,
-                "minScore": self.min_score,
-                "pageAction": self.page_action,
+                "websiteURL": page_url,
+                "websiteKey": site_key,
+                "minScore": min_score,
+                "pageAction": action,
                 "isEnterprise": True,
-                "apiDomain": self.api_domain,
+                "apiDomain": "www.recaptcha.net",
             },
-            "softId": self.soft_id,
-        }
+        })
+        task_id = tarea["taskId"]
 
-        if self.create_task(task_payload) == 1:
-            self.log("created task with id " + str(self.task_id))
-        else:
-            self.log("could not create task")
-            self.log(self.err_string)
-            return 0
+        consultas = 0
+        async with asyncio.timeout(self._timeout_seg):
+            await asyncio.sleep(self._primera_consulta_seg)
+            while True:
+                consultas += 1
+                resultado = await self._llamar("getTaskResult", {"taskId": task_id})
+                if resultado.get("status") == "ready":
+                    break
+                await asyncio.sleep(self._intervalo_seg)
+
+        print(f"  → [anticaptcha] Tarea {task_id} resuelta en {time.perf_counter() - inicio:.1f}s "
+              f"({consultas} consulta(s))")
+        return resultado["solution"]["gRecaptchaResponse"]
+
+
+# Bucle asyncio y cliente compartidos por todos los hilos del proceso
+_bucle: asyncio.AbstractEventLoop | None = None
+_cliente: ClienteAnticaptcha | None = None
+_bucle_lock = threading.Lock()
+
+
+def _en_bucle(corrutina_fn) -> Future:
+    """
+    Programa `corrutina_fn(cliente)` en el bucle compartido (creándolo la
+    primera vez) y devuelve un Future cancelable desde cualquier hilo.
+    """
+    global _bucle, _cliente
+    with _bucle_lock:
+        if _bucle is None:
+            _bucle = asyncio.new_event_loop()
+            threading.Thread(target=_bucle.run_forever, name="anticaptcha", daemon=True).start()
+
+            async def _crear() -> ClienteAnticaptcha:
+                return ClienteAnticaptcha(
+                    config.ANTICAPTCHA_API_KEY,
+                    base_url=config.ANTICAPTCHA_URL,
+                    primera_consulta_seg=config.ANTICAPTCHA_PRIMERA_CONSULTA_SEG,
+                    intervalo_seg=config.ANTICAPTCHA_INTERVALO_SEG,
+                    timeout_seg=config.ANTICAPTCHA_TIMEOUT_SEG,
+                )
+
+            _cliente = asyncio.run_coroutine_threadsafe(_crear(), _bucle).result()
+    return asyncio.run_coroutine_threadsafe(corrutina_fn(_cliente), _bucle)
+
+
+def _resolver_async(page_url: str, site_key: str, action: str) -> Future:
+    return _en_bucle(lambda cliente: cliente.resolver_recaptcha_v3(page_url, site_key, action))
 
-        time.sleep(3)
-        task_result = self.wait_for_result(60)
-        if task_result == 0:
-            return 0
-        return task_result["solution"]["gRecaptchaResponse"]
+
+def _tomar_del_pool(site_key: str, action: str) -> tuple[str, float] | None:
+    """(token, hora de resolución) del pool, o None si no hay ninguno vigente."""
+    pool = obtener_pool()
+    if pool is None:
+        return None
+    try:
+        return pool.tomar(site_key, action)
+    except Exception as e:
+        print(f"  [aviso] No se pudo leer el pool de captcha: {e}")
+        return None
 
 
 def resolver_recaptcha(page_url: str, site_key: str, action: str = "login") -> str:
     """
-    Resuelve un reCAPTCHA Enterprise v3 usando Anti-Captcha.
+    Devuelve un token de reCAPTCHA Enterprise v3: primero del pool de tokens
+    ya resueltos (si CAPTCHA_POOL_TAMANO > 0) y si no hay ninguno vigente,
+    resolviéndolo en el momento con Anti-Captcha.
 
     Args:
         page_url:  URL de la página donde vive el captcha.
         site_key:  Clave pública del sitio (parámetro k= del iframe).
         action:    Valor de pageAction configurado por el sitio.
 
+    Raises:
+        RuntimeError: si Anti-Captcha no pudo resolver el captcha.
+    """
+    tomado = _tomar_del_pool(site_key, action)
+    return tomado[0] if tomado else resolver_sin_pool(page_url, site_key, action)
+
+
+def resolver_sin_pool(page_url: str, site_key: str, action: str = "login") -> str:
+    """
+    Resuelve un reCAPTCHA Enterprise v3 usando Anti-Captcha (bloquea el hilo
+    llamador; la resolución corre en el bucle compartido).
+
     Returns:
         Token g-recaptcha-response listo para inyectar en el formulario.
 
     Raises:
         RuntimeError: si Anti-Captcha no pudo resolver el captcha.
     """
-    solver = _RecaptchaV3Enterprise()
-    solver.set_verbose(1)
-    solver.set_key(config.ANTICAPTCHA_API_KEY)
-    solver.set_website_url(page_url)
-    solver.set_website_key(site_key)
-    solver.set_page_action(action)
-    solver.set_min_score(0.9)
-
-    token = solver.solve_and_return_solution()
-    if token == 0:
-        raise RuntimeError(
-            f"Anti-Captcha no pudo resolver reCAPTCHA Enterprise: {solver.error_code}"
-        )
-
-    return token
+    try:
+        return _resolver_async(page_url, site_key, action).result()
+    except (httpx.HTTPError, TimeoutError) as e:
+        raise RuntimeError(f"Anti-Captcha no pudo resolver reCAPTCHA Enterprise: {e}") from e
+
+
+class ResolucionAnticipada:
+    """
+    Resolución de reCAPTCHA lanzada en segundo plano al cargar la página de
+    login, con el action por defecto. El formulario se rellena mientras tanto.
+
+    Uso:
+        captcha = ResolucionAnticipada(config.MONGO_ATLAS_URL, config.RECAPTCHA_SITE_KEY)
+        ...rellenar email y contraseña...
+        token = captcha.token(accion_detectada)   # antes del clic en Login
+    """
+
+    def __init__(self, page_url: str, site_key: str, action: str = "login"):
+        self._page_url = page_url
+        self._site_key = site_key
+        self.action = action
+        # Horas de reloj (time.time()): las de los tokens del pool vienen de otro proceso
+        self._inicio = time.time()
+        self._listo: float | None = None
+
+        tomado = _tomar_del_pool(site_key, action)
+        if tomado:
+            token, self._listo = tomado
+            self._futuro: Future = Future()
+            self._futuro.set_result(token)
+            return
+        self._futuro = _resolver_async(page_url, site_key, action)
+        self._futuro.add_done_callback(self._marcar_listo)
+        print(f"  → Resolviendo reCAPTCHA en segundo plano (action {action!r})...")
+
+    def _marcar_listo(self, _futuro: Future) -> None:
+        self._listo = time.time()
+
+    def cancelar(self) -> None:
+        """Abandona la resolución en curso (p. ej. si el login falla antes de usarla)."""
+        self._futuro.cancel()
+
+    def token(self, action: str | None = None) -> str:
+        """
+        Espera el token anticipado y lo devuelve. Solo se resuelve de nuevo si
+        la página usa otro action o si el token ya está cerca de caducar.
+
+        Raises:
+            RuntimeError: si Anti-Captcha no pudo resolver el captcha.
+        """
+        if action and action != self.action:
+            print(f"  → El formulario usa el action {action!r} (no {self.action!r}): se resuelve de nuevo")
+            self.cancelar()
+            return resolver_recaptcha(self._page_url, self._site_key, action)
+
+        espera = time.time()
+        try:
+            token = self._futuro.result()
+        except (httpx.HTTPError, TimeoutError) as e:
+            raise RuntimeError(f"Anti-Captcha no pudo resolver reCAPTCHA Enterprise: {e}") from e
+        ahora = time.time()
+        # El callback que marca la hora puede ir un instante por detrás de result()
+        listo = self._listo or ahora
+        # La edad cuenta desde la resolución real, también para los tokens del pool
+        if ahora - listo > _VIGENCIA_TOKEN_SEG:
+            print(f"  → El token anticipado tiene {ahora - listo:.0f}s y está por caducar: se resuelve de nuevo")
+            return resolver_sin_pool(self._page_url, self._site_key, self.action)
+        if listo < self._inicio:
+            print(f"  → Token de reCAPTCHA del pool listo (edad {ahora - listo:.1f}s)")
+        else:
+            print(
+                f"  → Token de reCAPTCHA listo: resolución de {listo - self._inicio:.1f}s, "
+                f"espera en el formulario {ahora - espera:.1f}s"
+            )
+        return token
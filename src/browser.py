@@ -4,12 +4,19 @@ Incluye configuración anti-detección para evitar bloqueos por bot-detection.
 """
 import random
 import tempfile
-from playwright.sync_api import sync_playwright, Browser, Page
+from playwright.sync_api import sync_playwright, Browser, BrowserContext, Page
 import config
+from src import browser_daemon, session_store
 
 
 _playwright = None
 _browser: Browser | None = None
+_context: BrowserContext | None = None
+# True si _browser es el Chrome compartido del daemon (no se cierra, solo se desconecta)
+_del_daemon = False
+# True si el contexto actual arrancó con una sesión de Atlas guardada
+_sesion_cargada = False
+_user_agent: str | None = None
 
 # ── Argumentos de Chromium para reducir fingerprint de automatización ──────────
 _ANTI_BOT_ARGS = [
@@ -105,15 +112,11 @@ _STEALTH_INIT_SCRIPT = """() => {
 }"""
 
 
-def launch() -> Page:
+def _lanzar_navegador(playwright, args_extra: list[str] | None = None) -> Browser:
     """
-    Inicia el navegador con configuración anti-detección y devuelve la página activa.
-    Cada ejecución rota el User-Agent para reducir patrones reconocibles.
+    Lanza Chrome (o Chromium si no está instalado) con los argumentos anti-bot.
+    Lo usan tanto launch() como el daemon de navegador caliente.
     """
-    global _playwright, _browser
-
-    _playwright = sync_playwright().start()
-
     # Los archivos temporales de Playwright van al directorio del sistema,
     # no a resultados/ para no contaminar la carpeta con archivos UUID.
     # El bot usa save_as() para mover cada descarga a su destino final.
@@ -122,22 +125,77 @@ def launch() -> Page:
     launch_options = dict(
         headless=config.HEADLESS,
         downloads_path=_tmp_downloads,
-        args=_ANTI_BOT_ARGS,
+        args=_ANTI_BOT_ARGS + (args_extra or []),
     )
     if config.USE_CHROME_REAL:
         try:
-            _browser = _playwright.chromium.launch(channel="chrome", **launch_options)
+            navegador = playwright.chromium.launch(channel="chrome", **launch_options)
             print("  [browser] Usando Chrome instalado (menos detectable que Chromium).")
+            return navegador
         except Exception:
-            _browser = _playwright.chromium.launch(**launch_options)
             print("  [browser] Chrome no encontrado, usando Chromium.")
-    else:
-        _browser = _playwright.chromium.launch(**launch_options)
+    return playwright.chromium.launch(**launch_options)
+
+
+def _conectar_daemon() -> Browser | None:
+    """
+    Se conecta por CDP al navegador caliente del daemon (BROWSER_DAEMON=True).
+    Devuelve None si el daemon no está disponible; el llamador lanza uno propio.
+    """
+    global _del_daemon
+    endpoint = browser_daemon.reservar()
+    if endpoint is None:
+        print("  [aviso] Daemon de navegador no disponible: se lanza un navegador propio")
+        return None
+    try:
+        navegador = _playwright.chromium.connect_over_cdp(endpoint, timeout=10_000)
+    except Exception as e:
+        browser_daemon.liberar()
+        print(f"  [aviso] No se pudo conectar al daemon de navegador ({e}): se lanza uno propio")
+        return None
+    _del_daemon = True
+    print(f"  [browser] Conectado al navegador caliente del daemon ({endpoint})")
+    return navegador
+
+
+def launch(usar_sesion: bool = True) -> Page:
+    """
+    Inicia el navegador con configuración anti-detección y devuelve la página activa.
+    Cada ejecución rota el User-Agent para reducir patrones reconocibles.
+
+    Con BROWSER_DAEMON=True se conecta al Chrome que mantiene abierto
+    `python -m src.browser_daemon` en vez de arrancar uno nuevo; cada
+    ejecución trabaja en su propio contexto aislado.
+
+    Args:
+        usar_sesion: Cargar en el contexto la sesión de Atlas guardada por la
+                     ejecución anterior (si existe y sigue vigente).
+    """
+    global _playwright, _browser
 
-    user_agent = random.choice(_USER_AGENTS)
+    _playwright = sync_playwright().start()
+    _browser = (_conectar_daemon() if config.BROWSER_DAEMON else None) or _lanzar_navegador(_playwright)
+    return _nuevo_contexto(usar_sesion)
+
+
+def _nuevo_contexto(usar_sesion: bool) -> Page:
+    """
+    Crea en el navegador actual un contexto aislado con User-Agent rotado
+    (distinto del anterior) y script stealth, y devuelve su página.
+    """
+    global _context, _sesion_cargada, _user_agent
+
+    user_agent = random.choice([ua for ua in _USER_AGENTS if ua != _user_agent] or _USER_AGENTS)
+    _user_agent = user_agent
     print(f"  [browser] User-Agent: {user_agent[:60]}...")
 
-    context = _browser.new_context(
+    estado = session_store.cargar() if usar_sesion else None
+    _sesion_cargada = estado is not None
+    if _sesion_cargada:
+        print("  [browser] Sesión de Atlas guardada cargada en el contexto")
+
+    _context = _browser.new_context(
+        storage_state=estado,
         accept_downloads=True,
         no_viewport=True,
         user_agent=user_agent,
@@ -149,19 +207,56 @@ def launch() -> Page:
     )
 
     # Inyectar stealth antes de que cualquier script de la página se ejecute
-    context.add_init_script(_STEALTH_INIT_SCRIPT)
+    _context.add_init_script(_STEALTH_INIT_SCRIPT)
 
-    page = context.new_page()
+    page = _context.new_page()
     page.set_default_timeout(config.PAGE_TIMEOUT)
     return page
 
 
+def reciclar_contexto() -> Page:
+    """
+    Descarta el contexto actual (cookies, storage, caché) y abre otro limpio
+    con un User-Agent distinto sobre el mismo navegador y driver, sin el coste
+    de arrancar Playwright y Chrome. Sin sesión guardada: es para reintentar
+    el login. Si el navegador ya no responde, se relanza completo.
+    """
+    if _browser is None or not _browser.is_connected():
+        print("  [browser] El navegador no responde: se relanza")
+        close()
+        return launch(usar_sesion=False)
+    if _context is not None:
+        try:
+            _context.close()
+        except Exception as e:
+            print(f"  [aviso] No se pudo cerrar el contexto anterior: {e}")
+    print("  [browser] Contexto nuevo sobre el navegador en marcha")
+    return _nuevo_contexto(usar_sesion=False)
+
+
+def sesion_cargada() -> bool:
+    """True si el navegador actual arrancó con una sesión de Atlas guardada."""
+    return _sesion_cargada
+
+
 def close():
-    """Cierra el navegador y libera recursos."""
-    global _playwright, _browser
+    """
+    Cierra el navegador y libera recursos. Si el navegador es el del daemon,
+    solo se cierra el contexto de esta ejecución y se desconecta.
+    """
+    global _playwright, _browser, _context, _del_daemon
+    if _context and _del_daemon:
+        try:
+            _context.close()
+        except Exception:
+            pass
     if _browser:
         _browser.close()
     if _playwright:
         _playwright.stop()
+    if _del_daemon:
+        browser_daemon.liberar()
     _browser = None
+    _context = None
     _playwright = None
+    _del_daemon = False
@@ -0,0 +1,177 @@
+"""
+Navegador caliente compartido entre ejecuciones del bot.
+
+Arrancar Chrome con los argumentos anti-bot es una parte apreciable de las
+ejecuciones cortas, y el login lo repite en cada reintento. Este daemon
+mantiene un Chrome abierto con un puerto de depuración remota (CDP) en
+127.0.0.1; con BROWSER_DAEMON=True, browser.launch se conecta a él con
+connect_over_cdp y cada ejecución trabaja en un contexto nuevo y aislado
+(User-Agent rotado y script stealth, como siempre).
+
+El estado (puerto, ejecuciones atendidas y ejecuciones activas por PID) se
+comparte en BROWSER_DAEMON_ESTADO_PATH bajo bloqueo de archivo. Cada
+BROWSER_DAEMON_CHEQUEO_SEG el daemon comprueba que Chrome responde y lo
+relanza si no; tras BROWSER_DAEMON_RECICLAR_CADA ejecuciones lo recicla en
+cuanto no quede ninguna activa, para acotar la memoria.
+
+    python -m src.browser_daemon
+"""
+import json
+import os
+import time
+import urllib.request
+
+import config
+from src.locks import bloqueo_archivo, escribir_atomico
+
+# Una ejecución que no se desregistra en este tiempo se da por muerta
+_MAX_EJECUCION_SEG = 2 * 3600
+
+
+def _endpoint(puerto: int) -> str:
+    return f"http://127.0.0.1:{puerto}"
+
+
+def _responde(puerto: int) -> bool:
+    """True si Chrome contesta en el endpoint HTTP de CDP."""
+    try:
+        with urllib.request.urlopen(f"{_endpoint(puerto)}/json/version", timeout=3) as resp:
+            return resp.status == 200
+    except OSError:
+        return False
+
+
+def _leer_estado() -> dict | None:
+    try:
+        return json.loads(config.BROWSER_DAEMON_ESTADO_PATH.read_text(encoding="utf-8"))
+    except FileNotFoundError:
+        return None
+    except (OSError, ValueError) as e:
+        print(f"  [aviso] Estado del daemon de navegador ilegible: {e}")
+        return None
+
+
+def _guardar_estado(estado: dict) -> None:
+    config.BROWSER_DAEMON_ESTADO_PATH.parent.mkdir(parents=True, exist_ok=True)
+    escribir_atomico(config.BROWSER_DAEMON_ESTADO_PATH, json.dumps(estado, indent=1))
+
+
+def reservar() -> str | None:
+    """
+    Registra esta ejecución en el daemon y devuelve su endpoint CDP, o None
+    si no hay daemon en marcha, está reciclando o Chrome no responde.
+    """
+    try:
+        with bloqueo_archivo(config.BROWSER_DAEMON_ESTADO_PATH, timeout_seg=5):
+            estado = _leer_estado()
+            if not estado or estado.get("reciclando") or not _responde(estado["puerto"]):
+                return None
+            estado["ejecuciones"] += 1
+            estado["activas"][str(os.getpid())] = time.time()
+            _guardar_estado(estado)
+    except TimeoutError as e:
+        print(f"  [aviso] {e}")
+        return None
+    return _endpoint(estado["puerto"])
+
+
+def liberar() -> None:
+    """Desregistra esta ejecución (su contexto ya está cerrado)."""
+    try:
+        with bloqueo_archivo(config.BROWSER_DAEMON_ESTADO_PATH, timeout_seg=5):
+            estado = _leer_estado()
+            if estado and estado["activas"].pop(str(os.getpid()), None) is not None:
+                _guardar_estado(estado)
+    except TimeoutError as e:
+        print(f"  [aviso] {e}")
+
+
+class DaemonNavegador:
+    """Mantiene un Chrome con CDP abierto, lo vigila y lo recicla."""
+
+    def __init__(self, puerto: int, reciclar_cada: int, chequeo_seg: float):
+        self.puerto = puerto
+        self.reciclar_cada = reciclar_cada
+        self.chequeo_seg = chequeo_seg
+        self._playwright = None
+        self._browser = None
+
+    def _arrancar(self) -> None:
+        from playwright.sync_api import sync_playwright
+        from src.browser import _lanzar_navegador
+
+        if self._playwright is None:
+            self._playwright = sync_playwright().start()
+        self._browser = _lanzar_navegador(self._playwright, [
+            f"--remote-debugging-port={self.puerto}",
+            "--remote-debugging-address=127.0.0.1",
+        ])
+        _guardar_estado({
+            "pid": os.getpid(),
+            "puerto": self.puerto,
+            "arrancado": time.time(),
+            "ejecuciones": 0,
+            "activas": {},
+            "reciclando": False,
+        })
+        print(f"[browser-daemon] Chrome listo en {_endpoint(self.puerto)}")
+
+    def _cerrar_navegador(self) -> None:
+        if self._browser is not None:
+            try:
+                self._browser.close()
+            except Exception as e:
+                print(f"[browser-daemon] [aviso] Error al cerrar Chrome: {e}")
+            self._browser = None
+
+    def _revisar(self) -> None:
+        """Chequeo periódico: relanza si Chrome no responde, recicla si toca."""
+        with bloqueo_archivo(config.BROWSER_DAEMON_ESTADO_PATH):
+            estado = _leer_estado() or {"ejecuciones": 0, "activas": {}}
+            ahora = time.time()
+            activas = {pid: ts for pid, ts in estado["activas"].items() if ahora - ts < _MAX_EJECUCION_SEG}
+            sano = self._browser is not None and self._browser.is_connected() and _responde(self.puerto)
+
+            if sano and (estado["ejecuciones"] < self.reciclar_cada or activas):
+                if len(activas) != len(estado["activas"]):
+                    estado["activas"] = activas
+                    _guardar_estado(estado)
+                return
+
+            motivo = "no responde" if not sano else f"{estado['ejecuciones']} ejecuciones atendidas"
+            print(f"[browser-daemon] Reciclando Chrome ({motivo})")
+            estado["reciclando"] = True
+            _guardar_estado(estado)
+
+        self._cerrar_navegador()
+        with bloqueo_archivo(config.BROWSER_DAEMON_ESTADO_PATH):
+            self._arrancar()
+
+    def ejecutar(self) -> None:
+        """Bucle principal hasta Ctrl+C."""
+        with bloqueo_archivo(config.BROWSER_DAEMON_ESTADO_PATH):
+            self._arrancar()
+        try:
+            while True:
+                time.sleep(self.chequeo_seg)
+                self._revisar()
+        except KeyboardInterrupt:
+            print("[browser-daemon] Detenido")
+        finally:
+            with bloqueo_archivo(config.BROWSER_DAEMON_ESTADO_PATH):
+                config.BROWSER_DAEMON_ESTADO_PATH.unlink(missing_ok=True)
+            self._cerrar_navegador()
+            if self._playwright is not None:
+                self._playwright.stop()
+
+
+def main() -> None:
+    DaemonNavegador(
+        config.BROWSER_DAEMON_PUERTO,
+        config.BROWSER_DAEMON_RECICLAR_CADA,
+        config.BROWSER_DAEMON_CHEQUEO_SEG,
+    ).ejecutar()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,171 @@
+"""
+Pool de tokens de reCAPTCHA Enterprise ya resueltos, compartido entre procesos.
+
+Cuando el planificador lanza varias extracciones seguidas (backfills,
+reintentos, varios entornos), cada login pagaría la resolución completa de
+Anti-Captcha. El pool guarda en CAPTCHA_POOL_PATH hasta CAPTCHA_POOL_TAMANO
+tokens recientes por (site_key, action) con su hora de resolución, y
+resolver_recaptcha entrega el más fresco que siga vigente.
+
+Los tokens de reCAPTCHA v3 caducan a los ~2 minutos: solo se entregan los
+que tienen menos de CAPTCHA_POOL_TTL_SEG segundos, para que quede margen
+hasta el envío del formulario.
+
+El relleno lo hace un proceso aparte (cada token cuesta una resolución de
+Anti-Captcha aunque caduque sin usarse):
+
+    python -m src.captcha_pool
+
+Solo rellena bajo demanda: cada vez que una ejecución pide un token al pool
+(lo haya o no) queda anotada la hora, y el proceso solo repone tokens si esa
+petición es de hace menos de CAPTCHA_POOL_INACTIVIDAD_SEG. Sin ejecuciones el
+pool se deja vaciar y no se gastan créditos; la primera ejecución de una tanda
+resuelve su captcha en el momento y reactiva el relleno para las siguientes.
+"""
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+from typing import Callable
+import json
+import time
+
+import config
+from src.locks import bloqueo_archivo, escribir_atomico
+
+
+class PoolTokens:
+    """Tokens resueltos persistidos en JSON; toda lectura/escritura va bajo bloqueo."""
+
+    def __init__(self, path: Path, tamano: int, ttl_seg: float):
+        self._path = path
+        self.tamano = tamano
+        self.ttl_seg = ttl_seg
+
+    def _cargar(self) -> tuple[list[dict], float]:
+        """Tokens vigentes y hora de la última petición al pool (0 si nunca)."""
+        try:
+            data = json.loads(self._path.read_text(encoding="utf-8"))
+        except FileNotFoundError:
+            return [], 0.0
+        except (OSError, ValueError) as e:
+            print(f"  [aviso] Pool de captcha ilegible, se descarta: {e}")
+            return [], 0.0
+        ahora = time.time()
+        tokens = [t for t in data.get("tokens", []) if ahora - float(t.get("ts", 0)) < self.ttl_seg]
+        return tokens, float(data.get("demanda", 0))
+
+    def _guardar(self, tokens: list[dict], demanda: float) -> None:
+        self._path.parent.mkdir(parents=True, exist_ok=True)
+        escribir_atomico(self._path, json.dumps({"tokens": tokens, "demanda": demanda}, indent=1))
+
+    def tomar(self, site_key: str, action: str) -> tuple[str, float] | None:
+        """
+        Saca del pool el token vigente más reciente para (site_key, action) y
+        anota la petición, haya token o no, para que el relleno siga activo.
+
+        Returns:
+            (token, ts) con la hora de resolución (time.time()), o None.
+        """
+        with bloqueo_archivo(self._path):
+            tokens, _ = self._cargar()
+            candidatos = [t for t in tokens if t["site_key"] == site_key and t["action"] == action]
+            if not candidatos:
+                self._guardar(tokens, time.time())
+                return None
+            elegido = max(candidatos, key=lambda t: t["ts"])
+            tokens.remove(elegido)
+            self._guardar(tokens, time.time())
+        print(f"  → Token de reCAPTCHA tomado del pool (edad {time.time() - elegido['ts']:.0f}s, "
+              f"quedan {len(candidatos) - 1})")
+        return elegido["token"], float(elegido["ts"])
+
+    def agregar(self, site_key: str, action: str, token: str) -> None:
+        with bloqueo_archivo(self._path):
+            tokens, demanda = self._cargar()
+            tokens.append({"site_key": site_key, "action": action, "token": token, "ts": time.time()})
+            self._guardar(tokens, demanda)
+
+    def vigentes(self, site_key: str, action: str) -> int:
+        with bloqueo_archivo(self._path):
+            tokens, _ = self._cargar()
+            return sum(1 for t in tokens if t["site_key"] == site_key and t["action"] == action)
+
+    def segundos_sin_demanda(self) -> float:
+        """Segundos desde la última petición de un token al pool (inf si nunca)."""
+        with bloqueo_archivo(self._path):
+            _, demanda = self._cargar()
+        return time.time() - demanda if demanda else float("inf")
+
+    def rellenar(self, site_key: str, action: str, resolver: Callable[[], str]) -> int:
+        """
+        Resuelve en paralelo los tokens que falten hasta `tamano`.
+
+        Returns:
+            Número de tokens añadidos.
+        """
+        faltan = self.tamano - self.vigentes(site_key, action)
+        if faltan <= 0:
+            return 0
+
+        def _uno() -> bool:
+            try:
+                self.agregar(site_key, action, resolver())
+                return True
+            except Exception as e:
+                print(f"  [aviso] No se pudo resolver un token para el pool: {e}")
+                return False
+
+        with ThreadPoolExecutor(max_workers=faltan, thread_name_prefix="captcha-pool") as pool:
+            return sum(pool.map(lambda _: _uno(), range(faltan)))
+
+
+_pool: PoolTokens | None = None
+
+
+def obtener_pool() -> PoolTokens | None:
+    """Pool configurado, o None si CAPTCHA_POOL_TAMANO es 0 (desactivado)."""
+    global _pool
+    if config.CAPTCHA_POOL_TAMANO <= 0:
+        return None
+    if _pool is None:
+        _pool = PoolTokens(config.CAPTCHA_POOL_PATH, config.CAPTCHA_POOL_TAMANO, config.CAPTCHA_POOL_TTL_SEG)
+    return _pool
+
+
+def main() -> None:
+    """
+    Mantiene el pool lleno mientras haya ejecuciones pidiendo tokens, hasta
+    que se interrumpa con Ctrl+C.
+    """
+    from src.anticaptcha import resolver_sin_pool
+
+    pool = obtener_pool()
+    if pool is None:
+        raise SystemExit("CAPTCHA_POOL_TAMANO es 0: el pool de captcha está desactivado")
+
+    site_key, action = config.RECAPTCHA_SITE_KEY, "login"
+    print(f"[captcha-pool] Manteniendo {pool.tamano} token(s) de '{action}' en {config.CAPTCHA_POOL_PATH} "
+          f"mientras haya peticiones en los últimos {config.CAPTCHA_POOL_INACTIVIDAD_SEG:.0f}s")
+    activo = False
+    try:
+        while True:
+            if pool.segundos_sin_demanda() > config.CAPTCHA_POOL_INACTIVIDAD_SEG:
+                if activo:
+                    print("[captcha-pool] Sin peticiones recientes: relleno en pausa")
+                activo = False
+                time.sleep(5)
+                continue
+            if not activo:
+                print("[captcha-pool] Hay ejecuciones pidiendo tokens: rellenando")
+            activo = True
+            anadidos = pool.rellenar(
+                site_key, action, lambda: resolver_sin_pool(config.MONGO_ATLAS_URL, site_key, action)
+            )
+            if anadidos:
+                print(f"[captcha-pool] +{anadidos} token(s), vigentes: {pool.vigentes(site_key, action)}")
+            time.sleep(5)
+    except KeyboardInterrupt:
+        print("[captcha-pool] Detenido")
+
+
+if __name__ == "__main__":
+    main()
@@ -6,24 +6,99 @@ Estructura de carpetas:
 """
 from pathlib import Path
 from datetime import date
-from google.oauth2.credentials import Credentials
-from google.auth.transport.requests import Request
-from googleapiclient.discovery import build
+from concurrent.futures import Future, ThreadPoolExecutor, as_completed
+import hashlib
+import json
+import queue
+import tempfile
+import threading
+import time
 from googleapiclient.http import MediaFileUpload
 import config
+from src import evidence_bundle
+from src.drive_batch import ejecutar_lote, estadisticas as estadisticas_lotes
+from src.drive_cache import CacheCarpetas
+from src.drive_mirror import EspejoDrive
+from src.google_client import obtener_servicio
+from src.rate_limit import control_drive
+from src.upload_state import EstadoSubidas
 
 
 # Scope completo para listar carpetas existentes y reutilizarlas
 _SCOPES = ["https://www.googleapis.com/auth/drive"]
 
+_FOLDER_MIME = 'application/vnd.google-apps.folder'
+
+# Espera máxima al árbol de carpetas antes de escribir el IPE sin URLs de Drive
+_ESPERA_ARBOL_SEG = 120.0
+
+# Caché (parent_id, nombre) -> folder_id compartida por toda la ejecución
+_cache: CacheCarpetas | None = None
+
+# Espejo SQLite del árbol bajo DRIVE_PARENT_FOLDER_ID (se sincroniza una vez por ejecución)
+_espejo: EspejoDrive | None = None
+_espejo_lock = threading.Lock()
+_espejo_fallido = False
+
+# URIs de sesión de subidas reanudables, persistidas para sobrevivir a reinicios
+_estado_subidas: EstadoSubidas | None = None
+_estado_lock = threading.Lock()
+
+# Carpeta temporal con los tar + manifiesto de evidencias (se borra al salir)
+_paquetes_dir: tempfile.TemporaryDirectory | None = None
+
 
 def _get_service():
-    """Crea un servicio de Drive autenticado usando el token.json compartido."""
-    creds = Credentials.from_authorized_user_file(str(config.GMAIL_TOKEN_PATH), _SCOPES)
-    if creds.expired and creds.refresh_token:
-        creds.refresh(Request())
-        config.GMAIL_TOKEN_PATH.write_text(creds.to_json())
-    return build("drive", "v3", credentials=creds)
+    """
+    Devuelve el servicio de Drive del hilo actual (cada hilo tiene el suyo:
+    httplib2 no es thread-safe), reutilizado entre llamadas.
+    """
+    return obtener_servicio("drive", "v3", _SCOPES)
+
+
+def _get_cache() -> CacheCarpetas:
+    """Devuelve la caché de carpetas, cargándola del disco la primera vez."""
+    global _cache
+    if _cache is None:
+        _cache = CacheCarpetas(
+            config.DRIVE_FOLDER_CACHE_PATH,
+            ttl_dias=config.DRIVE_FOLDER_CACHE_TTL_DIAS,
+            max_entradas=config.DRIVE_FOLDER_CACHE_MAX,
+        )
+    return _cache
+
+
+def _get_espejo(service) -> EspejoDrive | None:
+    """
+    Devuelve el espejo local del árbol de Drive, sincronizándolo con la
+    Changes API la primera vez que se pide en la ejecución. Si está
+    desactivado o la sincronización falla se devuelve None y las búsquedas
+    se hacen en vivo contra Drive.
+    """
+    global _espejo, _espejo_fallido
+    if not config.DRIVE_ESPEJO or not config.DRIVE_PARENT_FOLDER_ID:
+        return None
+    with _espejo_lock:
+        if _espejo is None and not _espejo_fallido:
+            espejo = EspejoDrive(config.DRIVE_ESPEJO_PATH, config.DRIVE_PARENT_FOLDER_ID)
+            try:
+                espejo.sincronizar(service)
+            except Exception as e:
+                print(f"  [aviso] No se pudo sincronizar el espejo de Drive, se consulta en vivo: {e}")
+                espejo.cerrar()
+                _espejo_fallido = True
+            else:
+                _espejo = espejo
+        return _espejo
+
+
+def _get_estado_subidas() -> EstadoSubidas:
+    """Devuelve el estado de subidas reanudables (compartido entre hilos)."""
+    global _estado_subidas
+    with _estado_lock:
+        if _estado_subidas is None:
+            _estado_subidas = EstadoSubidas(config.DRIVE_UPLOAD_STATE_PATH)
+        return _estado_subidas
 
 
 def _determinar_anno_trimestre(start: date, end: date) -> tuple[str, str]:
@@ -59,9 +134,72 @@ def _determinar_anno_trimestre(start: date, end: date) -> tuple[str, str]:
     return anno, trimestre
 
 
+def _escapar(nombre: str) -> str:
+    """Escapa comillas y barras para usar un nombre dentro de una query de Drive."""
+    return nombre.replace("\\", "\\\\").replace("'", "\\'")
+
+
+def _listar_carpetas(service, nombre: str, parent_id: str | None = None, page_size: int = 1):
+    """Petición (sin ejecutar) que busca carpetas por nombre, opcionalmente dentro de un padre."""
+    query = f"name='{_escapar(nombre)}' and mimeType='{_FOLDER_MIME}' and trashed=false"
+    if parent_id:
+        query += f" and '{parent_id}' in parents"
+    return service.files().list(
+        q=query,
+        spaces='drive',
+        fields='nextPageToken, files(id, name, parents)',
+        pageSize=page_size
+    )
+
+
+def _carpeta_existente(service, parent_id: str):
+    """
+    comprobar() para ejecutar_lote: tras un error transitorio al crear una
+    carpeta, busca si Drive llegó a crearla antes de reintentar.
+    """
+    def _comprobar(nombre: str) -> dict | None:
+        resp = control_drive().ejecutar(_listar_carpetas(service, nombre, parent_id).execute)
+        items = resp.get('files', [])
+        return items[0] if items else None
+    return _comprobar
+
+
+def _crear_carpetas(service, nombres: list[str], parent_id: str) -> dict[str, str]:
+    """
+    Crea en un lote HTTP las carpetas `nombres` bajo parent_id (sin buscarlas
+    antes) y las registra en la caché y en el espejo.
+
+    Returns:
+        Diccionario nombre -> ID de carpeta
+    """
+    if not nombres:
+        return {}
+    creaciones = ejecutar_lote(service, {
+        nombre: service.files().create(
+            body={'name': nombre, 'mimeType': _FOLDER_MIME, 'parents': [parent_id]},
+            fields='id'
+        )
+        for nombre in nombres
+    }, comprobar=_carpeta_existente(service, parent_id))
+    cache = _get_cache()
+    espejo = _get_espejo(service)
+    ids = {}
+    for nombre in nombres:
+        resp, error = creaciones[nombre]
+        if error is not None:
+            raise error
+        print(f"  → Carpeta creada en Drive: {nombre}")
+        ids[nombre] = resp['id']
+        cache.registrar(parent_id, nombre, resp['id'])
+        if espejo is not None:
+            espejo.registrar(resp['id'], nombre, parent_id)
+    return ids
+
+
 def _buscar_o_crear_carpeta(service, nombre: str, parent_id: str) -> str:
     """
     Busca una carpeta por nombre en un padre específico, o la crea si no existe.
+    Si ya se resolvió en esta ejecución se devuelve desde el memo sin llamar a Drive.
     
     Args:
         service: Servicio de Drive
@@ -71,60 +209,310 @@ def _buscar_o_crear_carpeta(service, nombre: str, parent_id: str) -> str:
     Returns:
         ID de la carpeta encontrada o creada
     """
-    # Buscar carpeta existente
-    query = f"name='{nombre}' and '{parent_id}' in parents and mimeType='application/vnd.google-apps.folder' and trashed=false"
-    results = service.files().list(
-        q=query,
-        spaces='drive',
-        fields='files(id, name)',
-        pageSize=1
-    ).execute()
-    
-    items = results.get('files', [])
-    
-    if items:
-        return items[0]['id']
-    
-    # Crear carpeta si no existe
-    file_metadata = {
-        'name': nombre,
-        'mimeType': 'application/vnd.google-apps.folder',
-        'parents': [parent_id]
+    return _buscar_o_crear_carpetas(service, [nombre], parent_id)[nombre]
+
+
+def _buscar_o_crear_carpetas(service, nombres: list[str], parent_id: str) -> dict[str, str]:
+    """
+    Resuelve varias carpetas hermanas bajo un mismo padre: las que están en
+    el memo o en el espejo local no cuestan ninguna llamada; las demás se
+    buscan en vivo en un lote HTTP y las que falten se crean en otro. Que una
+    carpeta no esté en el espejo no basta para crearla: otra ejecución pudo
+    crearla después de la última sincronización.
+
+    Returns:
+        Diccionario nombre -> ID de carpeta
+    """
+    cache = _get_cache()
+    espejo = _get_espejo(service)
+    ids: dict[str, str] = {}
+    pendientes = []
+    for nombre in nombres:
+        folder_id = cache.en_memo(parent_id, nombre)
+        if not folder_id and espejo is not None:
+            folder_id = espejo.buscar(parent_id, nombre, carpeta=True)
+            if folder_id:
+                cache.registrar(parent_id, nombre, folder_id)
+        if folder_id:
+            ids[nombre] = folder_id
+        else:
+            pendientes.append(nombre)
+
+    busquedas = ejecutar_lote(
+        service, {nombre: _listar_carpetas(service, nombre, parent_id) for nombre in pendientes}
+    )
+    faltantes = []
+    for nombre in pendientes:
+        resp, error = busquedas[nombre]
+        if error is not None:
+            raise error
+        items = resp.get('files', [])
+        if items:
+            ids[nombre] = items[0]['id']
+            cache.registrar(parent_id, nombre, items[0]['id'])
+            if espejo is not None:
+                espejo.registrar(items[0]['id'], nombre, parent_id)
+        else:
+            faltantes.append(nombre)
+
+    ids.update(_crear_carpetas(service, faltantes, parent_id))
+    return ids
+
+
+def _primera_invalida(cadena: list[tuple[str, str, str]], respuestas: dict) -> int | None:
+    """
+    Comprueba con las respuestas de files().get que cada carpeta cacheada
+    sigue existiendo, no está en la papelera y cuelga del padre esperado.
+
+    Returns:
+        Posición de la primera carpeta que ya no vale, o None si todas valen.
+    """
+    for i, (padre, _, _) in enumerate(cadena):
+        meta, error = respuestas[f"v{i}"]
+        if error is not None:
+            if error.resp.status == 404:
+                return i
+            raise error
+        if meta.get('trashed') or padre not in meta.get('parents', []):
+            return i
+    return None
+
+
+def _resolver_ruta(service, nombres: list[str], parent_id: str) -> str:
+    """
+    Resuelve (o crea) una cadena de carpetas anidadas bajo parent_id.
+
+    En un único lote HTTP valida el tramo de la ruta que está en la caché en
+    disco y busca por nombre los niveles restantes; luego recorre la cadena
+    en orden padre → hijo y crea solo lo que falte. Si alguna carpeta cacheada
+    ya no existe, está en la papelera o se movió, se invalida el tramo y se
+    resuelve en vivo.
+
+    Si el espejo local está activo, lo que falte en la caché se completa con
+    él antes de armar el lote: sus IDs se validan igual que los de la caché
+    y lo que no esté en ninguno de los dos se busca en vivo antes de crearlo.
+
+    Returns:
+        ID de la última carpeta de la ruta
+    """
+    cache = _get_cache()
+    espejo = _get_espejo(service)
+
+    # Tramo de la ruta presente en la caché (o, si no, en el espejo)
+    cadena: list[tuple[str, str, str]] = []
+    padre = parent_id
+    for nombre in nombres:
+        folder_id = cache.en_memo(padre, nombre) or cache.en_disco(padre, nombre)
+        if not folder_id and espejo is not None:
+            folder_id = espejo.buscar(padre, nombre, carpeta=True)
+        if not folder_id:
+            break
+        cadena.append((padre, nombre, folder_id))
+        padre = folder_id
+
+    pendientes = nombres[len(cadena):]
+    peticiones = {
+        f"v{i}": service.files().get(fileId=f, fields='id, trashed, parents')
+        for i, (_, _, f) in enumerate(cadena)
     }
-    
-    folder = service.files().create(
-        body=file_metadata,
-        fields='id'
-    ).execute()
-    
-    print(f"  → Carpeta creada en Drive: {nombre}")
-    return folder['id']
+    peticiones.update({
+        f"b{i}": _listar_carpetas(service, nombre, page_size=100)
+        for i, nombre in enumerate(pendientes)
+    })
+    respuestas = ejecutar_lote(service, peticiones)
+
+    invalida = _primera_invalida(cadena, respuestas) if cadena else None
+    if invalida is not None:
+        print(f"  → Caché de carpetas desactualizada para '{cadena[invalida][1]}', buscando en Drive...")
+        for p, n, _ in cadena:
+            cache.invalidar(p, n)
+        if espejo is not None:
+            espejo.eliminar(cadena[invalida][2])
+        cadena = []
+        pendientes = nombres
+        respuestas = ejecutar_lote(service, {
+            f"b{i}": _listar_carpetas(service, nombre, page_size=100)
+            for i, nombre in enumerate(pendientes)
+        })
+    for p, n, f in cadena:
+        cache.registrar(p, n, f)
+
+    padre = cadena[-1][2] if cadena else parent_id
+    creada = False
+    for i, nombre in enumerate(pendientes):
+        if creada:
+            # Bajo una carpeta recién creada no puede existir nada
+            padre = _crear_carpetas(service, [nombre], padre)[nombre]
+            continue
+        resp, error = respuestas[f"b{i}"]
+        if error is not None:
+            raise error
+        candidatos = [f for f in resp.get('files', []) if padre in f.get('parents', [])]
+        if candidatos:
+            cache.registrar(padre, nombre, candidatos[0]['id'])
+            if espejo is not None:
+                espejo.registrar(candidatos[0]['id'], nombre, padre)
+            padre = candidatos[0]['id']
+        elif resp.get('nextPageToken'):
+            # Búsqueda por nombre truncada: se repite filtrando por padre
+            padre = _buscar_o_crear_carpeta(service, nombre, padre)
+        else:
+            padre = _crear_carpetas(service, [nombre], padre)[nombre]
+            creada = True
+    return padre
 
 
-def _subir_archivo(service, file_path: Path, parent_id: str) -> str:
+def _md5_archivo(file_path: Path, bloque: int = 8 * 1024 * 1024) -> str:
+    """Calcula el MD5 de un archivo leyéndolo por bloques (los logs pesan cientos de MB)."""
+    md5 = hashlib.md5()
+    with open(file_path, "rb") as f:
+        while chunk := f.read(bloque):
+            md5.update(chunk)
+    return md5.hexdigest()
+
+
+def _consultar_sesion(http, uri: str, size: int) -> tuple[int | None, dict | None]:
     """
-    Sube un archivo a Drive.
+    Pregunta a Drive cuántos bytes de una sesión reanudable tiene confirmados
+    (PUT vacío con Content-Range: bytes */size).
+
+    Returns:
+        (offset, None) si la sesión sigue abierta, (None, archivo) si la subida
+        ya se había completado, o (None, None) si la sesión caducó o no existe.
+    """
+    control_drive().adquirir()
+    try:
+        resp, content = http.request(
+            uri, "PUT", headers={"Content-Range": f"bytes */{size}", "Content-Length": "0"}
+        )
+    except Exception as e:
+        print(f"    [aviso] No se pudo consultar la sesión de subida: {e}")
+        return None, None
+
+    if resp.status == 308:
+        rango = resp.get("range")
+        return (int(rango.rsplit("-", 1)[1]) + 1 if rango else 0), None
+    if resp.status in (200, 201):
+        return None, json.loads(content)
+    return None, None
+
+
+def _subir_archivo(
+    service,
+    file_path: Path,
+    parent_id: str,
+    file_id: str | None = None,
+    md5_local: str | None = None,
+) -> dict[str, str]:
+    """
+    Sube un archivo a Drive por chunks y verifica que el md5Checksum calculado
+    por Drive coincide con el hash local, sin necesidad de volver a descargarlo.
+
+    Tras cada chunk confirmado se guarda la URI de sesión y el offset en
+    DRIVE_UPLOAD_STATE_PATH; si una ejecución anterior murió a mitad de la
+    subida del mismo contenido a la misma carpeta de proceso, se reanuda desde
+    ahí. La sesión sigue apuntando a la carpeta [run_ts] de aquella ejecución,
+    así que al terminar el archivo se mueve a `parent_id`.
     
     Args:
         service: Servicio de Drive
         file_path: Path local del archivo
         parent_id: ID de la carpeta padre en Drive
+        file_id: Si se indica, reemplaza el contenido de ese archivo existente
+        md5_local: MD5 ya calculado del archivo (si no, se calcula aquí)
     
     Returns:
-        ID del archivo subido
+        Diccionario con el ID y la URL del archivo subido
+
+    Raises:
+        RuntimeError: si el checksum de Drive no coincide con el local.
     """
-    file_metadata = {
-        'name': file_path.name,
-        'parents': [parent_id]
-    }
-    
-    media = MediaFileUpload(str(file_path), resumable=True)
-    
-    file = service.files().create(
-        body=file_metadata,
-        media_body=media,
-        fields='id'
-    ).execute()
+    md5_local = md5_local or _md5_archivo(file_path)
+    size = file_path.stat().st_size
+    media = MediaFileUpload(
+        str(file_path),
+        chunksize=config.DRIVE_CHUNK_MB * 1024 * 1024,
+        resumable=True,
+    )
+
+    if file_id:
+        request = service.files().update(
+            fileId=file_id,
+            media_body=media,
+            fields='id, mimeType, md5Checksum'
+        )
+    else:
+        file_metadata = {
+            'name': file_path.name,
+            'parents': [parent_id]
+        }
+        request = service.files().create(
+            body=file_metadata,
+            media_body=media,
+            fields='id, mimeType, md5Checksum'
+        )
+
+    estado = _get_estado_subidas()
+    clave = EstadoSubidas.clave(file_id or file_path.parent.name, file_path.name, md5_local, size)
+    destino_sesion = parent_id
+    file = None
+
+    sesion = estado.obtener(clave)
+    if sesion:
+        offset, file = _consultar_sesion(request.http, sesion["uri"], size)
+        if offset is not None:
+            print(f"    → Reanudando {file_path.name} desde {offset / (1024 * 1024):.1f} MB")
+            request.resumable_uri = sesion["uri"]
+            request.resumable_progress = offset
+        elif file is None:
+            estado.eliminar(clave)
+        if offset is not None or file is not None:
+            destino_sesion = sesion.get("destino") or parent_id
+
+    # Si un chunk falla por red, antes de reintentarlo se pregunta a Drive
+    # cuántos bytes tiene realmente (pudo recibirlo aunque se perdiera la respuesta)
+    terminado: dict = {}
+
+    def _resincronizar() -> None:
+        if request.resumable_uri:
+            offset, archivo = _consultar_sesion(request.http, request.resumable_uri, size)
+            if offset is not None:
+                request.resumable_progress = offset
+            elif archivo is not None:
+                terminado["file"] = archivo
+
+    def _siguiente_chunk():
+        if "file" in terminado:
+            return None, terminado["file"]
+        return request.next_chunk()
+
+    control = control_drive()
+    while file is None:
+        _, file = control.ejecutar(_siguiente_chunk, al_reintentar=_resincronizar)
+        if file is None:
+            estado.actualizar(clave, request.resumable_uri, request.resumable_progress, destino_sesion)
+    estado.eliminar(clave)
+
+    if not file_id and destino_sesion != parent_id:
+        print(f"    → {file_path.name} se completó en la carpeta de la ejecución anterior; se mueve a esta")
+        file = control.ejecutar(service.files().update(
+            fileId=file['id'],
+            addParents=parent_id,
+            removeParents=destino_sesion,
+            fields='id, mimeType, md5Checksum',
+        ).execute)
+
+    if 'md5Checksum' not in file:
+        file = control.ejecutar(service.files().get(fileId=file['id'], fields='id, mimeType, md5Checksum').execute)
+    if file.get('md5Checksum') != md5_local:
+        raise RuntimeError(
+            f"Checksum distinto tras subir {file_path.name}: "
+            f"local {md5_local}, Drive {file.get('md5Checksum')}"
+        )
+
+    espejo = _get_espejo(service)
+    if espejo is not None:
+        espejo.registrar(file['id'], file_path.name, parent_id, file.get('mimeType', ''), md5_local)
     
     return {
         "id": file['id'],
@@ -138,23 +526,414 @@ def subir_archivo_a_drive(file_path: Path, parent_id: str) -> dict[str, str]:
     return _subir_archivo(service, file_path, parent_id)
 
 
-def _subir_directorio_recursivo(service, local_dir: Path, parent_id: str) -> None:
+def _listar_archivos_remotos(service, parent_ids: set[str]) -> dict[tuple[str, str], list[dict]]:
+    """
+    Lista (en un lote HTTP) los archivos que ya existen en cada carpeta destino.
+    Si todas las carpetas están en el espejo local se leen de ahí.
+
+    Returns:
+        Diccionario (parent_id, nombre) -> lista de {"id", "md5Checksum"}
+    """
+    remotos: dict[tuple[str, str], list[dict]] = {}
+    espejo = _get_espejo(service)
+    if espejo is not None and all(espejo.contiene(pid) for pid in parent_ids):
+        for parent_id in parent_ids:
+            for f in espejo.listar(parent_id, carpetas=False):
+                remotos.setdefault((parent_id, f['name']), []).append(f)
+        return remotos
+
+    def _peticion(parent_id: str, page_token: str | None = None):
+        return service.files().list(
+            q=f"'{parent_id}' in parents and mimeType!='{_FOLDER_MIME}' and trashed=false",
+            spaces='drive',
+            fields='nextPageToken, files(id, name, md5Checksum)',
+            pageSize=1000,
+            pageToken=page_token,
+        )
+
+    respuestas = ejecutar_lote(service, {pid: _peticion(pid) for pid in parent_ids})
+    for parent_id, (resp, error) in respuestas.items():
+        if error is not None:
+            raise error
+        while True:
+            for f in resp.get('files', []):
+                remotos.setdefault((parent_id, f['name']), []).append(f)
+            if not resp.get('nextPageToken'):
+                break
+            resp = control_drive().ejecutar(_peticion(parent_id, resp['nextPageToken']).execute)
+    return remotos
+
+
+def _dir_paquete() -> Path:
+    """Carpeta temporal nueva para el paquete de evidencias de un directorio."""
+    global _paquetes_dir
+    if _paquetes_dir is None:
+        _paquetes_dir = tempfile.TemporaryDirectory(prefix="drive_evidencias_")
+    return Path(tempfile.mkdtemp(dir=_paquetes_dir.name))
+
+
+def _recolectar_subidas(service, local_dir: Path, parent_id: str, tareas: list[tuple[Path, str]]) -> None:
+    """
+    Recorre un directorio local creando las subcarpetas en Drive y acumula
+    en `tareas` los pares (archivo, carpeta_destino) pendientes de subir.
+    Con DRIVE_EMPAQUETAR_EVIDENCIAS las capturas pequeñas de cada directorio
+    se reemplazan por un único tar más su manifiesto.
+    """
+    items = sorted(local_dir.iterdir())
+    subdirs = [item for item in items if item.is_dir()]
+    archivos = [item for item in items if item.is_file()]
+
+    if config.DRIVE_EMPAQUETAR_EVIDENCIAS:
+        paquete = evidence_bundle.empaquetar(local_dir, _dir_paquete(), config.DRIVE_EMPAQUETAR_MAX_MB)
+        if paquete:
+            tar, manifiesto, empaquetados = paquete
+            archivos = [a for a in archivos if a not in empaquetados] + [tar, manifiesto]
+    tareas.extend((archivo, parent_id) for archivo in archivos)
+
+    # Las subcarpetas hermanas se resuelven juntas; sus hijos, después
+    ids = _buscar_o_crear_carpetas(service, [d.name for d in subdirs], parent_id) if subdirs else {}
+    for subdir in subdirs:
+        _recolectar_subidas(service, subdir, ids[subdir.name], tareas)
+
+
+def _archivo_existente(service, parent_id: str, md5: str):
+    """
+    comprobar() para ejecutar_lote: tras un error transitorio al copiar un
+    archivo, busca si la copia con ese contenido ya está en `parent_id`.
+    """
+    def _comprobar(nombre: str) -> dict | None:
+        resp = control_drive().ejecutar(service.files().list(
+            q=f"name='{_escapar(nombre)}' and '{parent_id}' in parents and trashed=false",
+            spaces='drive',
+            fields='files(id, mimeType, md5Checksum)',
+        ).execute)
+        return next((f for f in resp.get('files', []) if f.get('md5Checksum') == md5), None)
+    return _comprobar
+
+
+def _buscar_en_otras_ejecuciones(service, nombre: str, md5: str) -> str | None:
+    """
+    ID de un archivo ya subido con el mismo nombre y MD5 en cualquier carpeta
+    (típicamente la carpeta [run_ts] de una ejecución anterior que falló).
+    """
+    espejo = _get_espejo(service)
+    if espejo is not None:
+        return espejo.buscar_contenido(nombre, md5)
+    resp = control_drive().ejecutar(service.files().list(
+        q=f"name='{_escapar(nombre)}' and mimeType!='{_FOLDER_MIME}' and trashed=false",
+        spaces='drive',
+        fields='files(id, md5Checksum)',
+        pageSize=100,
+    ).execute)
+    return next((f['id'] for f in resp.get('files', []) if f.get('md5Checksum') == md5), None)
+
+
+def _copiar_de_otra_ejecucion(service, file_path: Path, parent_id: str, md5_local: str) -> dict | None:
+    """
+    Copia en Drive (sin transferir bytes) un archivo idéntico subido por otra
+    ejecución a `parent_id`. Devuelve la copia, o None si no hay original o
+    la copia falla (el llamador sube el archivo como siempre).
+    """
+    origen = _buscar_en_otras_ejecuciones(service, file_path.name, md5_local)
+    if origen is None:
+        return None
+    peticion = service.files().copy(
+        fileId=origen,
+        body={'name': file_path.name, 'parents': [parent_id]},
+        fields='id, mimeType, md5Checksum',
+    )
+    copia, error = ejecutar_lote(
+        service, {file_path.name: peticion}, comprobar=_archivo_existente(service, parent_id, md5_local)
+    )[file_path.name]
+    if error is not None or copia.get('md5Checksum') != md5_local:
+        print(f"    [aviso] No se pudo copiar {file_path.name} desde Drive, se sube: {error or 'checksum distinto'}")
+        return None
+
+    espejo = _get_espejo(service)
+    if espejo is not None:
+        espejo.registrar(copia['id'], file_path.name, parent_id, copia.get('mimeType', ''), md5_local)
+    return copia
+
+
+def _subir_tarea(file_path: Path, parent_id: str, existentes: list[dict]) -> dict[str, str]:
+    """
+    Sube un archivo desde un hilo del pool usando el servicio propio del hilo.
+    Si en la carpeta destino ya hay un archivo con el mismo nombre y el mismo
+    MD5 no se vuelve a subir; si el contenido cambió se reemplaza en su lugar.
+
+    Cada reintento crea una carpeta [run_ts] nueva, así que con
+    DRIVE_SYNC_INCREMENTAL los archivos grandes que faltan en ella se buscan
+    también en las demás ejecuciones y, si ya estaban subidos, se copian en
+    Drive en lugar de volver a subirlos.
+    """
+    md5_local = _md5_archivo(file_path)
+    for remoto in existentes:
+        if remoto.get('md5Checksum') == md5_local:
+            print(f"    = Sin cambios, se omite: {file_path.name}")
+            return {
+                "id": remoto['id'],
+                "url": f"https://drive.google.com/file/d/{remoto['id']}/view",
+                "omitido": True,
+            }
+
+    service = _get_service()
+    grande = file_path.stat().st_size >= config.DRIVE_LARGE_FILE_MB * 1024 * 1024
+    if config.DRIVE_SYNC_INCREMENTAL and not existentes and grande:
+        copia = _copiar_de_otra_ejecucion(service, file_path, parent_id, md5_local)
+        if copia is not None:
+            print(f"    = Ya subido en otra ejecución, copiado en Drive: {file_path.name}")
+            return {
+                "id": copia['id'],
+                "url": f"https://drive.google.com/file/d/{copia['id']}/view",
+                "omitido": True,
+            }
+
+    file_id = existentes[0]['id'] if existentes else None
+    print(f"    → {'Actualizando' if file_id else 'Subiendo'}: {file_path.name}")
+    return _subir_archivo(service, file_path, parent_id, file_id=file_id, md5_local=md5_local)
+
+
+class _ColaSubidas:
+    """
+    Dos pools acotados compartidos por todas las subidas que se le envían:
+    uno para archivos pequeños (evidencias, IPE) y otro para archivos grandes
+    (logs .gz), de modo que las evidencias no queden en cola detrás de un log
+    de cientos de MB. Se le pueden enviar tareas en varias tandas (una por
+    carpeta de proceso) y se espera a todas juntas al final.
+    """
+
+    def __init__(self):
+        self._umbral = config.DRIVE_LARGE_FILE_MB * 1024 * 1024
+        self._pool_pequenos = ThreadPoolExecutor(
+            max_workers=max(1, config.DRIVE_UPLOAD_WORKERS), thread_name_prefix="drive-pequenos"
+        )
+        self._pool_grandes = ThreadPoolExecutor(
+            max_workers=max(1, config.DRIVE_LARGE_UPLOAD_WORKERS), thread_name_prefix="drive-grandes"
+        )
+        self._futuros: dict[Future, tuple[Path, int]] = {}
+        self._lock = threading.Lock()
+        self._inicio: float | None = None
+
+    def enviar(
+        self,
+        tareas: list[tuple[Path, str]],
+        remotos: dict[tuple[str, str], list[dict]] | None = None,
+    ) -> None:
+        """
+        Pone en cola una tanda de subidas.
+
+        Args:
+            tareas: Lista de pares (archivo local, ID de carpeta destino)
+            remotos: Archivos ya presentes en Drive por (carpeta, nombre), para
+                     la sincronización incremental (None = subir todo)
+        """
+        remotos = remotos or {}
+        tamanos = {path: path.stat().st_size for path, _ in tareas}
+        # Los grandes se encolan primero para que arranquen cuanto antes
+        ordenadas = sorted(tareas, key=lambda t: tamanos[t[0]] < self._umbral)
+        grandes = sum(1 for p, _ in tareas if tamanos[p] >= self._umbral)
+        print(
+            f"  → {len(tareas) - grandes} archivo(s) pequeño(s) con {config.DRIVE_UPLOAD_WORKERS} hilo(s), "
+            f"{grandes} grande(s) con {config.DRIVE_LARGE_UPLOAD_WORKERS} hilo(s)"
+        )
+
+        with self._lock:
+            if self._inicio is None:
+                self._inicio = time.perf_counter()
+            for path, parent_id in ordenadas:
+                pool = self._pool_grandes if tamanos[path] >= self._umbral else self._pool_pequenos
+                futuro = pool.submit(_subir_tarea, path, parent_id, remotos.get((parent_id, path.name), []))
+                self._futuros[futuro] = (path, tamanos[path])
+
+    def esperar(self) -> dict[Path, dict[str, str]]:
+        """
+        Espera a que terminen todas las subidas enviadas y cierra los pools.
+
+        Returns:
+            Diccionario archivo local -> {"id", "url"} del archivo en Drive
+
+        Raises:
+            RuntimeError: si alguna subida falló (las demás se completan igual).
+        """
+        with self._lock:
+            futuros = dict(self._futuros)
+
+        resultados: dict[Path, dict[str, str]] = {}
+        errores: list[tuple[Path, Exception]] = []
+        for futuro in as_completed(futuros):
+            path, _ = futuros[futuro]
+            try:
+                resultados[path] = futuro.result()
+            except Exception as e:
+                errores.append((path, e))
+                print(f"    [error] No se pudo subir {path.name}: {e}")
+        self._pool_pequenos.shutdown()
+        self._pool_grandes.shutdown()
+
+        if futuros:
+            duracion = time.perf_counter() - self._inicio
+            subidos = [p for p, r in resultados.items() if not r.get("omitido")]
+            tamanos = dict(futuros.values())
+            total_mb = sum(tamanos[p] for p in subidos) / (1024 * 1024)
+            velocidad = total_mb / duracion if duracion > 0 else 0.0
+            print(f"  → Subidos {len(subidos)} archivo(s), {total_mb:.1f} MB en {duracion:.1f}s ({velocidad:.2f} MB/s)")
+            if len(subidos) < len(resultados):
+                print(f"  → Omitidos {len(resultados) - len(subidos)} archivo(s) sin cambios respecto a Drive")
+
+        if errores:
+            nombres = ", ".join(p.name for p, _ in errores)
+            raise RuntimeError(f"Fallaron {len(errores)} subida(s) a Drive: {nombres}")
+
+        return resultados
+
+
+def _subir_en_paralelo(
+    tareas: list[tuple[Path, str]],
+    remotos: dict[tuple[str, str], list[dict]] | None = None,
+) -> dict[Path, dict[str, str]]:
+    """
+    Sube una tanda de archivos con su propia _ColaSubidas y espera a que terminen.
+
+    Returns:
+        Diccionario archivo local -> {"id", "url"} del archivo en Drive
+
+    Raises:
+        RuntimeError: si alguna subida falló (las demás se completan igual).
+    """
+    if not tareas:
+        return {}
+    cola = _ColaSubidas()
+    cola.enviar(tareas, remotos)
+    return cola.esperar()
+
+
+def _tareas_de_directorio(service, local_dir: Path, parent_id: str):
+    """
+    Crea en Drive la estructura de carpetas de `local_dir` y devuelve las
+    tareas de subida junto con los archivos remotos ya existentes (solo con
+    DRIVE_SYNC_INCREMENTAL; si no, None).
+    """
+    tareas: list[tuple[Path, str]] = []
+    _recolectar_subidas(service, local_dir, parent_id, tareas)
+
+    remotos = None
+    if config.DRIVE_SYNC_INCREMENTAL and tareas:
+        remotos = _listar_archivos_remotos(service, {pid for _, pid in tareas})
+    return tareas, remotos
+
+
+def _subir_directorio_recursivo(service, local_dir: Path, parent_id: str) -> dict[Path, dict[str, str]]:
     """
     Sube recursivamente todo el contenido de un directorio local a Drive.
+    Primero crea la estructura de carpetas y luego sube los archivos en paralelo.
+    Con DRIVE_SYNC_INCREMENTAL solo se suben archivos nuevos o modificados.
     
     Args:
         service: Servicio de Drive
         local_dir: Path local del directorio
         parent_id: ID de la carpeta padre en Drive
+
+    Returns:
+        Diccionario archivo local -> {"id", "url"} del archivo en Drive
+    """
+    tareas, remotos = _tareas_de_directorio(service, local_dir, parent_id)
+    return _subir_en_paralelo(tareas, remotos)
+
+
+def extraer_evidencia(carpeta_id: str, nombre: str, destino: Path) -> Path:
     """
-    for item in local_dir.iterdir():
-        if item.is_file():
-            print(f"    → Subiendo: {item.name}")
-            _subir_archivo(service, item, parent_id)
-        elif item.is_dir():
-            # Crear subcarpeta y subir recursivamente
-            subfolder_id = _buscar_o_crear_carpeta(service, item.name, parent_id)
-            _subir_directorio_recursivo(service, item, subfolder_id)
+    Descarga una sola captura de un paquete de evidencias subido a Drive,
+    usando el manifiesto para pedir únicamente su rango de bytes del tar.
+
+    Args:
+        carpeta_id: ID de la carpeta de proceso en Drive (ej: mongod-audit-log)
+        nombre:     Nombre original de la captura (ej: "..._04_filtro_audit_log.png")
+        destino:    Carpeta local donde guardar la captura
+
+    Returns:
+        Path local de la captura extraída
+
+    Raises:
+        FileNotFoundError: si la carpeta no tiene paquete o la captura no está en él.
+        ValueError: si los bytes descargados no coinciden con el SHA-256 del manifiesto.
+    """
+    service = _get_service()
+    control = control_drive()
+
+    def _buscar_archivo(nombre_archivo: str) -> str:
+        resp = control.ejecutar(service.files().list(
+            q=f"name='{_escapar(nombre_archivo)}' and '{carpeta_id}' in parents and trashed=false",
+            spaces='drive',
+            fields='files(id)',
+            pageSize=1,
+        ).execute)
+        items = resp.get('files', [])
+        if not items:
+            raise FileNotFoundError(f"No existe {nombre_archivo} en la carpeta de Drive {carpeta_id}")
+        return items[0]['id']
+
+    # El manifiesto se llama como la carpeta de proceso
+    carpeta = control.ejecutar(service.files().get(fileId=carpeta_id, fields='name').execute)
+    manifiesto_id = _buscar_archivo(evidence_bundle.nombre_manifiesto(carpeta['name']))
+    manifiesto = json.loads(control.ejecutar(service.files().get_media(fileId=manifiesto_id).execute))
+    entrada = next((e for e in manifiesto.get("evidencias", []) if e["nombre"] == nombre), None)
+    if entrada is None:
+        raise FileNotFoundError(f"La captura {nombre} no está en el paquete de {carpeta['name']}/")
+
+    tar_id = _buscar_archivo(manifiesto["archivo"])
+    request = service.files().get_media(fileId=tar_id)
+    request.headers["Range"] = f"bytes={entrada['offset']}-{entrada['offset'] + entrada['tamano'] - 1}"
+    contenido = control.ejecutar(request.execute)
+    evidence_bundle.verificar(contenido, entrada)
+
+    destino.mkdir(parents=True, exist_ok=True)
+    salida = destino / nombre
+    salida.write_bytes(contenido)
+    print(f"  ✓ Evidencia extraída de {manifiesto['archivo']}: {salida}")
+    return salida
+
+
+def _info_carpeta(folder_id: str) -> dict[str, str]:
+    """ID y URL navegable de una carpeta de Drive."""
+    return {"id": folder_id, "url": f"https://drive.google.com/drive/folders/{folder_id}"}
+
+
+def _resolver_carpeta_ejecucion(service, run_ts: str, start: date, end: date) -> str:
+    """Resuelve o crea [PADRE]/[AÑO]/[TRIMESTRE]/MONGODB/[run_ts] y devuelve su ID."""
+    anno, trimestre = _determinar_anno_trimestre(start, end)
+    print(f"  → Periodo: {anno} - {trimestre}")
+
+    # El tramo AÑO/TRIMESTRE/MONGODB suele venir de caché
+    return _resolver_ruta(
+        service, [anno, trimestre, "MONGODB", run_ts], config.DRIVE_PARENT_FOLDER_ID
+    )
+
+
+def listar_ejecuciones() -> list[str]:
+    """
+    Ejecuciones que ya están en Drive, leídas del espejo local tras
+    sincronizarlo (una sola llamada incremental a la Changes API).
+
+    Returns:
+        Rutas "AÑO/TRIMESTRE/run_ts" ordenadas, ej: ["2026/1Q/20260303_235200"]
+    """
+    if not config.DRIVE_PARENT_FOLDER_ID:
+        print("  [aviso] DRIVE_PARENT_FOLDER_ID no configurado.")
+        return []
+    espejo = _get_espejo(_get_service())
+    if espejo is None:
+        raise RuntimeError("El espejo de Drive no está disponible (DRIVE_ESPEJO desactivado o sin sincronizar)")
+
+    ejecuciones = []
+    for anno in espejo.listar(config.DRIVE_PARENT_FOLDER_ID, carpetas=True):
+        for trimestre in espejo.listar(anno['id'], carpetas=True):
+            mongodb = espejo.buscar(trimestre['id'], "MONGODB", carpeta=True)
+            if mongodb:
+                ejecuciones.extend(
+                    f"{anno['name']}/{trimestre['name']}/{run['name']}"
+                    for run in espejo.listar(mongodb, carpetas=True)
+                )
+    return sorted(ejecuciones)
 
 
 def subir_resultados_a_drive(
@@ -189,44 +968,175 @@ def subir_resultados_a_drive(
     
     try:
         service = _get_service()
-        
-        # Determinar año y trimestre
-        anno, trimestre = _determinar_anno_trimestre(start, end)
-        print(f"  → Periodo: {anno} - {trimestre}")
-        
-        # Navegar/crear estructura de carpetas
-        carpeta_anno = _buscar_o_crear_carpeta(service, anno, config.DRIVE_PARENT_FOLDER_ID)
-        carpeta_trimestre = _buscar_o_crear_carpeta(service, trimestre, carpeta_anno)
-        carpeta_mongodb = _buscar_o_crear_carpeta(service, "MONGODB", carpeta_trimestre)
-        carpeta_ejecucion = _buscar_o_crear_carpeta(service, run_ts, carpeta_mongodb)
+        carpeta_ejecucion = _resolver_carpeta_ejecucion(service, run_ts, start, end)
         
         # Subir contenido de resultados_dir (mongod-audit-log/ y mongod/)
         print(f"  → Subiendo archivos desde: {resultados_dir}")
-        _subir_directorio_recursivo(service, resultados_dir, carpeta_ejecucion)
+        try:
+            _subir_directorio_recursivo(service, resultados_dir, carpeta_ejecucion)
+        except Exception as e:
+            # Las carpetas ya existen: se devuelven sus URLs para el IPE aunque falten archivos
+            print(f"  [error] Subida a Drive incompleta: {e}")
+            print(f"  → Los archivos locales están disponibles en: {resultados_dir}")
+        else:
+            print("  ✓ Resultados subidos exitosamente a Drive")
         
-        # Construir URLs de las carpetas específicas
+        # Construir URLs de las carpetas específicas (ya están en el memo tras la subida)
         carpeta_audit_id = _buscar_o_crear_carpeta(service, "mongod-audit-log", carpeta_ejecucion)
         carpeta_mongod_id = _buscar_o_crear_carpeta(service, "mongod", carpeta_ejecucion)
         
         info = {
-            "mongod-audit-log": {
-                "id": carpeta_audit_id,
-                "url": f"https://drive.google.com/drive/folders/{carpeta_audit_id}",
-            },
-            "mongod": {
-                "id": carpeta_mongod_id,
-                "url": f"https://drive.google.com/drive/folders/{carpeta_mongod_id}",
-            },
-            "execution_folder": {
-                "id": carpeta_ejecucion,
-                "url": f"https://drive.google.com/drive/folders/{carpeta_ejecucion}",
-            },
+            "mongod-audit-log": _info_carpeta(carpeta_audit_id),
+            "mongod": _info_carpeta(carpeta_mongod_id),
+            "execution_folder": _info_carpeta(carpeta_ejecucion),
         }
         
-        print("  ✓ Resultados subidos exitosamente a Drive")
+        lotes = estadisticas_lotes()
+        print(f"  → Metadatos: {lotes['peticiones']} llamada(s) a Drive en {lotes['lotes']} petición(es) HTTP")
+        print(f"  → Cuota: {control_drive().resumen()}")
         return info
         
     except Exception as e:
         print(f"  [error] No se pudo subir a Drive: {e}")
         print(f"  → Los archivos locales están disponibles en: {resultados_dir}")
         return {}
+
+    finally:
+        _get_cache().guardar()
+
+
+class SubidaEnSegundoPlano:
+    """
+    Sube a Drive los resultados de una ejecución en segundo plano.
+
+    Al crearse, un hilo de fondo resuelve o crea todo el árbol de carpetas
+    ([run_ts]/mongod-audit-log, [run_ts]/mongod...) mientras el navegador hace
+    login, de modo que las URLs de Drive se conocen antes de escribir los IPE.
+    Cada carpeta de proceso se encola en cuanto está completa (logs, capturas
+    e IPE) y todos sus archivos van a una única _ColaSubidas compartida, así
+    que la subida de un proceso se solapa con la descarga del siguiente.
+
+    Uso:
+        subida = SubidaEnSegundoPlano(run_ts, start, end, ["mongod-audit-log", "mongod"])
+        urls = subida.carpetas_drive()    # espera al árbol; URLs para el IPE
+        subida.encolar(carpeta_audit)     # tras descargar el audit log y generar su IPE
+        subida.encolar(carpeta_general)
+        drive_urls = subida.finalizar()   # mismo formato que subir_resultados_a_drive
+    """
+
+    def __init__(self, run_ts: str, start: date, end: date, carpetas: list[str]):
+        self._run_ts = run_ts
+        self._start = start
+        self._end = end
+        self._carpetas = carpetas
+        self._cola: queue.Queue[Path | None] = queue.Queue()
+        self._ids: dict[str, str] = {}
+        self._carpeta_ejecucion: str | None = None
+        self._arbol_listo = threading.Event()
+        self._subidas: _ColaSubidas | None = None
+        self._hilo: threading.Thread | None = None
+        self._resultado: dict[str, dict[str, str]] | None = None
+
+        if not config.DRIVE_PARENT_FOLDER_ID:
+            print("  [aviso] DRIVE_PARENT_FOLDER_ID no configurado. Omitiendo subida a Drive.")
+            self._arbol_listo.set()
+            return
+        self._subidas = _ColaSubidas()
+        self._hilo = threading.Thread(target=self._consumir, name="drive-subida", daemon=True)
+        self._hilo.start()
+
+    def carpetas_drive(self, timeout: float | None = _ESPERA_ARBOL_SEG) -> dict[str, dict[str, str]]:
+        """
+        Espera (como mucho `timeout` segundos) a que el árbol de carpetas esté
+        creado en Drive.
+
+        Returns:
+            {"<carpeta>": {"id", "url"}, ..., "execution_folder": {"id", "url"}}
+            o {} si no se pudo resolver la carpeta de ejecución o no estuvo
+            lista a tiempo.
+        """
+        if not self._arbol_listo.wait(timeout):
+            print(f"  [drive] [aviso] Las carpetas de Drive no están listas tras {timeout:.0f}s; se continúa sin sus URLs")
+            return {}
+        if self._carpeta_ejecucion is None:
+            return {}
+        return {
+            **{nombre: _info_carpeta(folder_id) for nombre, folder_id in self._ids.items()},
+            "execution_folder": _info_carpeta(self._carpeta_ejecucion),
+        }
+
+    def encolar(self, carpeta: Path) -> None:
+        """Pone una carpeta de resultados ya completa en la cola de subida."""
+        if self._hilo is not None:
+            print(f"  [drive] En cola para subir: {carpeta.name}/")
+            self._cola.put(carpeta)
+
+    def finalizar(self) -> dict[str, dict[str, str]]:
+        """
+        Espera a que terminen las subidas pendientes. Se puede llamar más de
+        una vez (p. ej. desde el `finally` de main tras un error): solo la
+        primera espera.
+
+        Returns:
+            Lo mismo que carpetas_drive(): las URLs se devuelven aunque falle
+            la subida de algún archivo.
+        """
+        if self._hilo is None:
+            return {}
+        if self._resultado is not None:
+            return self._resultado
+        self._cola.put(None)
+        self._hilo.join()
+        try:
+            self._subidas.esperar()
+        except Exception as e:
+            print(f"  [drive] [error] Subida a Drive incompleta: {e}")
+        else:
+            if self._carpeta_ejecucion is not None:
+                print("  [drive] ✓ Resultados subidos a Drive")
+        _get_cache().guardar()
+
+        info = self.carpetas_drive()
+        if info:
+            lotes = estadisticas_lotes()
+            print(f"  [drive] Metadatos: {lotes['peticiones']} llamada(s) a Drive en {lotes['lotes']} petición(es) HTTP")
+            print(f"  [drive] Cuota: {control_drive().resumen()}")
+        self._resultado = info
+        return info
+
+    def _preparar_arbol(self) -> None:
+        """Resuelve la carpeta de ejecución y crea sus subcarpetas en un solo lote."""
+        try:
+            service = _get_service()
+            print("\n  [drive] Preparando carpetas de la ejecución en Google Drive...")
+            self._carpeta_ejecucion = _resolver_carpeta_ejecucion(
+                service, self._run_ts, self._start, self._end
+            )
+            self._ids = _buscar_o_crear_carpetas(service, self._carpetas, self._carpeta_ejecucion)
+            print("  [drive] ✓ Carpetas listas en Drive")
+        except Exception as e:
+            self._carpeta_ejecucion = None
+            print(f"  [drive] [error] No se pudieron preparar las carpetas en Drive: {e}")
+        finally:
+            self._arbol_listo.set()
+
+    def _consumir(self) -> None:
+        """Bucle del hilo de fondo: prepara el árbol y envía cada carpeta encolada a los pools."""
+        self._preparar_arbol()
+        while (carpeta := self._cola.get()) is not None:
+            if self._carpeta_ejecucion is None:
+                print(f"  [drive] Se omite {carpeta.name}/: no hay carpeta de ejecución en Drive")
+                print(f"  → Los archivos locales están disponibles en: {carpeta}")
+                continue
+            try:
+                service = _get_service()
+                carpeta_id = self._ids.get(carpeta.name)
+                if carpeta_id is None:
+                    carpeta_id = _buscar_o_crear_carpeta(service, carpeta.name, self._carpeta_ejecucion)
+                    self._ids[carpeta.name] = carpeta_id
+                tareas, remotos = _tareas_de_directorio(service, carpeta, carpeta_id)
+                print(f"  [drive] Subiendo {carpeta.name}/ en segundo plano ({len(tareas)} archivo(s))...")
+                self._subidas.enviar(tareas, remotos)
+            except Exception as e:
+                print(f"  [drive] [error] No se pudo subir {carpeta.name}/ a Drive: {e}")
+                print(f"  → Los archivos locales están disponibles en: {carpeta}")
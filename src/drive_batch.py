@@ -0,0 +1,148 @@
+"""
+Agrupación de peticiones de metadatos de Google Drive en lotes HTTP.
+
+Drive acepta hasta 100 llamadas por petición batch (multipart/mixed). Se usa
+para búsquedas, creaciones y consultas de metadatos que no dependen entre sí;
+las que sí dependen (crear un hijo requiere el ID del padre) se envían en
+lotes sucesivos desde drive.py.
+
+Cada petición HTTP pasa por el control de cuota de Drive; las llamadas de un
+lote que fallan por cuota o error de servidor se reenvían en un lote nuevo.
+Las creaciones no son idempotentes: antes de reenviarlas se comprueba si
+Drive llegó a aplicarlas (parámetro `comprobar`), para no duplicar carpetas.
+"""
+from collections import Counter
+from typing import Callable
+import threading
+
+from googleapiclient.errors import HttpError
+
+from src.rate_limit import clasificar_error, control_drive
+
+# Límite documentado por Drive para una petición batch
+_MAX_POR_LOTE = 100
+
+_lock = threading.Lock()
+_contadores = {"peticiones": 0, "lotes": 0}
+
+
+def ejecutar_lote(
+    service,
+    peticiones: dict[str, object],
+    comprobar: Callable[[str], dict | None] | None = None,
+) -> dict[str, tuple[dict | None, Exception | None]]:
+    """
+    Ejecuta un conjunto de peticiones independientes agrupadas en lotes.
+
+    Args:
+        service:     Servicio de Drive (se usa su http para enviar el lote)
+        peticiones:  Diccionario clave -> HttpRequest sin ejecutar
+        comprobar:   Solo para peticiones no idempotentes (files().create).
+                     Un error transitorio no garantiza que Drive no aplicara
+                     la llamada, así que antes de reenviarla se llama a
+                     comprobar(clave): si devuelve el recurso ya existente se
+                     toma como respuesta y no se reenvía.
+
+    Returns:
+        Diccionario clave -> (respuesta, error). Exactamente uno de los dos es None.
+    """
+    resultados: dict[str, tuple[dict | None, Exception | None]] = {}
+    if not peticiones:
+        return resultados
+
+    # El request_id viaja en la cabecera Content-ID: se usa el índice en vez
+    # de la clave para no depender de que esta sea ASCII.
+    claves = list(peticiones)
+    control = control_drive()
+
+    def _callback(request_id, response, exception):
+        resultados[claves[int(request_id)]] = (response, exception)
+
+    def _ya_aplicada(j: int) -> bool:
+        clave = claves[j]
+        existente = comprobar(clave)
+        if existente is None:
+            return False
+        print(f"  → [drive] '{clave}' ya se había aplicado pese al error; no se reenvía")
+        resultados[clave] = (existente, None)
+        return True
+
+    for i in range(0, len(claves), _MAX_POR_LOTE):
+        pendientes = list(range(i, min(i + _MAX_POR_LOTE, len(claves))))
+        intentos: Counter[str] = Counter()
+        while pendientes:
+            if len(pendientes) == 1 and comprobar is None:
+                # Un lote de una sola llamada no ahorra nada: se envía directa
+                clave = claves[pendientes[0]]
+                try:
+                    resultados[clave] = (control.ejecutar(peticiones[clave].execute), None)
+                except HttpError as e:
+                    resultados[clave] = (None, e)
+                _contar(1)
+                break
+
+            if comprobar is None:
+                batch = service.new_batch_http_request(callback=_callback)
+                for j in pendientes:
+                    batch.add(peticiones[claves[j]], request_id=str(j))
+                control.ejecutar(batch.execute)
+            else:
+                # Sin reintento automático: un fallo de red a mitad del lote
+                # pudo dejar aplicadas algunas llamadas y se comprueban abajo
+                _enviar_una_vez(service, control, peticiones, claves, pendientes, resultados, _callback)
+            _contar(len(pendientes))
+
+            # Reenviar solo las llamadas con errores transitorios, con backoff
+            fallidas = {j: clasificar_error(resultados[claves[j]][1]) for j in pendientes
+                        if resultados[claves[j]][1] is not None}
+            reintentables = [j for j, clase in fallidas.items() if clase]
+            if not reintentables:
+                break
+            clase = fallidas[reintentables[0]]
+            intentos[clase] += 1
+            if not control.esperar_reintento(clase, intentos[clase], resultados[claves[reintentables[0]]][1]):
+                break
+            if comprobar is not None:
+                reintentables = [j for j in reintentables if not _ya_aplicada(j)]
+            pendientes = reintentables
+
+    return resultados
+
+
+def _enviar_una_vez(service, control, peticiones, claves, pendientes, resultados, callback) -> None:
+    """
+    Envía las llamadas pendientes (en lote si son varias) una sola vez. Un
+    error transitorio del envío completo se anota en todas ellas.
+    """
+    control.adquirir()
+    try:
+        if len(pendientes) == 1:
+            clave = claves[pendientes[0]]
+            try:
+                resultados[clave] = (peticiones[clave].execute(), None)
+            except HttpError as e:
+                resultados[clave] = (None, e)
+        else:
+            batch = service.new_batch_http_request(callback=callback)
+            for j in pendientes:
+                batch.add(peticiones[claves[j]], request_id=str(j))
+            batch.execute()
+    except Exception as e:
+        if clasificar_error(e) is None:
+            raise
+        for j in pendientes:
+            resultados[claves[j]] = (None, e)
+        return
+    control.registrar_exito()
+
+
+def _contar(llamadas: int) -> None:
+    with _lock:
+        _contadores["peticiones"] += llamadas
+        _contadores["lotes"] += 1
+
+
+def estadisticas() -> dict[str, int]:
+    """Llamadas lógicas a Drive y peticiones HTTP reales usadas por los lotes."""
+    with _lock:
+        return dict(_contadores)
@@ -0,0 +1,101 @@
+"""
+Caché de IDs de carpetas de Google Drive.
+
+Guarda en disco el mapeo (parent_id, nombre) -> folder_id para no repetir en
+cada ejecución las búsquedas de [AÑO]/[TRIMESTRE]/MONGODB, y mantiene un memo
+en memoria con las carpetas resueltas o creadas durante la ejecución actual.
+
+Las entradas en disco no se consideran confiables hasta validarlas contra
+Drive (la carpeta pudo borrarse o moverse a la papelera); las del memo sí.
+"""
+from pathlib import Path
+import json
+import os
+import threading
+import time
+
+
+class CacheCarpetas:
+    """Caché (parent_id, nombre) -> folder_id con persistencia en JSON."""
+
+    def __init__(self, path: Path, ttl_dias: int = 30, max_entradas: int = 500):
+        self._path = path
+        self._ttl_seg = ttl_dias * 24 * 3600
+        self._max_entradas = max_entradas
+        self._lock = threading.Lock()
+        self._memo: dict[str, str] = {}
+        self._disco: dict[str, dict] = self._cargar()
+        self._modificada = False
+
+    @staticmethod
+    def _clave(parent_id: str, nombre: str) -> str:
+        return f"{parent_id}/{nombre}"
+
+    def _cargar(self) -> dict[str, dict]:
+        """Lee el archivo de caché descartando entradas corruptas o expiradas."""
+        try:
+            data = json.loads(self._path.read_text(encoding="utf-8"))
+        except FileNotFoundError:
+            return {}
+        except (OSError, ValueError) as e:
+            print(f"  [aviso] Caché de carpetas de Drive ilegible, se ignora: {e}")
+            return {}
+
+        entradas = data.get("carpetas", {}) if isinstance(data, dict) else {}
+        ahora = time.time()
+        return {
+            clave: entrada
+            for clave, entrada in entradas.items()
+            if isinstance(entrada, dict)
+            and entrada.get("id")
+            and ahora - float(entrada.get("ts", 0)) < self._ttl_seg
+        }
+
+    def en_memo(self, parent_id: str, nombre: str) -> str | None:
+        """ID ya resuelto o creado en esta ejecución (confiable)."""
+        with self._lock:
+            return self._memo.get(self._clave(parent_id, nombre))
+
+    def en_disco(self, parent_id: str, nombre: str) -> str | None:
+        """ID guardado por una ejecución anterior (pendiente de validar)."""
+        with self._lock:
+            entrada = self._disco.get(self._clave(parent_id, nombre))
+            return entrada["id"] if entrada else None
+
+    def registrar(self, parent_id: str, nombre: str, folder_id: str) -> None:
+        """Registra una carpeta resuelta en el memo y en la caché en disco."""
+        clave = self._clave(parent_id, nombre)
+        with self._lock:
+            self._memo[clave] = folder_id
+            self._disco[clave] = {"id": folder_id, "ts": time.time()}
+            self._modificada = True
+
+    def invalidar(self, parent_id: str, nombre: str) -> None:
+        """Elimina una entrada que Drive reportó como inexistente o en papelera."""
+        clave = self._clave(parent_id, nombre)
+        with self._lock:
+            self._memo.pop(clave, None)
+            if self._disco.pop(clave, None) is not None:
+                self._modificada = True
+
+    def guardar(self) -> None:
+        """
+        Persiste la caché si cambió. Si supera max_entradas descarta las
+        entradas más antiguas. Escribe a un temporal y lo renombra para no
+        dejar el archivo a medias si el proceso muere.
+        """
+        with self._lock:
+            if not self._modificada:
+                return
+            entradas = sorted(self._disco.items(), key=lambda kv: kv[1].get("ts", 0), reverse=True)
+            self._disco = dict(entradas[: self._max_entradas])
+            contenido = json.dumps({"carpetas": self._disco}, ensure_ascii=False, indent=1)
+            self._modificada = False
+
+        try:
+            self._path.parent.mkdir(parents=True, exist_ok=True)
+            tmp = self._path.with_suffix(self._path.suffix + ".tmp")
+            tmp.write_text(contenido, encoding="utf-8")
+            os.replace(tmp, self._path)
+        except OSError as e:
+            print(f"  [aviso] No se pudo guardar la caché de carpetas de Drive: {e}")
@@ -0,0 +1,258 @@
+"""
+Espejo local (SQLite) del árbol de resultados en Google Drive.
+
+Guarda id, nombre, padre, tipo y md5 de todo lo que cuelga de
+DRIVE_PARENT_FOLDER_ID y lo mantiene al día de forma incremental con la
+Changes API: en cada ejecución se piden solo los cambios desde el último
+`startPageToken` guardado. Con el espejo sincronizado, encontrar una carpeta
+o archivo (y su ID) es una consulta local indexada por (padre, nombre).
+
+El espejo solo sirve para encontrar: que algo no esté en él no prueba que no
+exista en Drive (otra ejecución pudo crearlo después de la sincronización),
+así que drive.py lo busca en vivo antes de crear nada.
+
+La primera vez (o si cambia la carpeta raíz) se hace un recorrido completo
+del árbol, listando las carpetas de cada nivel en lotes HTTP.
+"""
+from pathlib import Path
+import sqlite3
+import threading
+
+from src.drive_batch import ejecutar_lote
+from src.rate_limit import control_drive
+
+_FOLDER_MIME = "application/vnd.google-apps.folder"
+_CAMPOS_ARCHIVO = "id, name, parents, mimeType, md5Checksum, trashed"
+
+_ESQUEMA = """
+CREATE TABLE IF NOT EXISTS archivos (
+    id     TEXT PRIMARY KEY,
+    nombre TEXT NOT NULL,
+    padre  TEXT NOT NULL,
+    mime   TEXT NOT NULL,
+    md5    TEXT
+);
+CREATE INDEX IF NOT EXISTS idx_archivos_padre_nombre ON archivos (padre, nombre);
+CREATE TABLE IF NOT EXISTS meta (
+    clave TEXT PRIMARY KEY,
+    valor TEXT NOT NULL
+);
+"""
+
+
+class EspejoDrive:
+    """Réplica local del subárbol de Drive bajo `raiz_id`."""
+
+    def __init__(self, path: Path, raiz_id: str):
+        path.parent.mkdir(parents=True, exist_ok=True)
+        self._raiz_id = raiz_id
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(str(path), check_same_thread=False)
+        self._conn.row_factory = sqlite3.Row
+        self._conn.executescript(_ESQUEMA)
+        self.sincronizado = False
+
+    # ── Sincronización ────────────────────────────────────────────────────────
+
+    def sincronizar(self, service) -> None:
+        """Aplica los cambios pendientes, o hace la carga completa si no hay token."""
+        token = self._meta("page_token")
+        if token and self._meta("raiz") == self._raiz_id:
+            aplicados = self._aplicar_cambios(service, token)
+            print(f"  → Espejo de Drive actualizado ({aplicados} cambio(s) desde la última ejecución)")
+        else:
+            print("  → Espejo de Drive vacío: recorriendo el árbol completo (solo la primera vez)...")
+            total = self._cargar_completo(service)
+            print(f"  → Espejo de Drive creado con {total} elemento(s)")
+        self.sincronizado = True
+
+    def _cargar_completo(self, service) -> int:
+        control = control_drive()
+        # El token se pide antes del recorrido para no perder cambios que ocurran durante él
+        token = control.ejecutar(service.changes().getStartPageToken().execute)["startPageToken"]
+
+        with self._lock, self._conn:
+            self._conn.execute("DELETE FROM archivos")
+        total = self._recorrer(service, [self._raiz_id])
+
+        with self._lock, self._conn:
+            self._guardar_meta("raiz", self._raiz_id)
+            self._guardar_meta("page_token", token)
+        return total
+
+    def _recorrer(self, service, carpetas: list[str]) -> int:
+        """Lista recursivamente el contenido de `carpetas`, un nivel por lote HTTP."""
+        total = 0
+        pendientes = list(carpetas)
+        while pendientes:
+            nivel, pendientes = pendientes, []
+            respuestas = ejecutar_lote(service, {pid: self._peticion_hijos(service, pid) for pid in nivel})
+            for pid, (resp, error) in respuestas.items():
+                if error is not None:
+                    raise error
+                while True:
+                    for f in resp.get("files", []):
+                        self._guardar(f, pid)
+                        total += 1
+                        if f["mimeType"] == _FOLDER_MIME:
+                            pendientes.append(f["id"])
+                    if not resp.get("nextPageToken"):
+                        break
+                    resp = control_drive().ejecutar(
+                        self._peticion_hijos(service, pid, resp["nextPageToken"]).execute
+                    )
+        return total
+
+    @staticmethod
+    def _peticion_hijos(service, parent_id: str, page_token: str | None = None):
+        return service.files().list(
+            q=f"'{parent_id}' in parents and trashed=false",
+            spaces="drive",
+            fields=f"nextPageToken, files({_CAMPOS_ARCHIVO})",
+            pageSize=1000,
+            pageToken=page_token,
+        )
+
+    def _aplicar_cambios(self, service, token: str) -> int:
+        """
+        Recorre changes().list desde `token` y actualiza solo lo que afecta al
+        subárbol. La Changes API no filtra por carpeta y devuelve los cambios
+        de todo el Drive del usuario: se descartan en memoria, sin tocar
+        SQLite, los que ni son del subárbol ni cuelgan de él.
+        """
+        control = control_drive()
+        aplicados = 0
+        with self._lock:
+            subarbol = {fila["id"] for fila in self._conn.execute("SELECT id FROM archivos")}
+        subarbol.add(self._raiz_id)
+        while token:
+            resp = control.ejecutar(service.changes().list(
+                pageToken=token,
+                spaces="drive",
+                includeRemoved=True,
+                pageSize=1000,
+                fields=f"nextPageToken, newStartPageToken, changes(fileId, removed, file({_CAMPOS_ARCHIVO}))",
+            ).execute)
+
+            for cambio in resp.get("changes", []):
+                padres = (cambio.get("file") or {}).get("parents") or []
+                if cambio["fileId"] not in subarbol and not subarbol.intersection(padres):
+                    continue
+                if self._aplicar_cambio(service, cambio):
+                    aplicados += 1
+                    # Lo que se crea en este mismo recorrido puede ser padre de cambios posteriores
+                    if self._existe(cambio["fileId"]):
+                        subarbol.add(cambio["fileId"])
+
+            if resp.get("newStartPageToken"):
+                with self._lock, self._conn:
+                    self._guardar_meta("page_token", resp["newStartPageToken"])
+                break
+            token = resp.get("nextPageToken")
+        return aplicados
+
+    def _aplicar_cambio(self, service, cambio: dict) -> bool:
+        file_id = cambio["fileId"]
+        archivo = cambio.get("file") or {}
+        conocido = self._existe(file_id)
+
+        if cambio.get("removed") or archivo.get("trashed"):
+            if conocido:
+                self.eliminar(file_id)
+                return True
+            return False
+
+        padre = (archivo.get("parents") or [None])[0]
+        if padre == self._raiz_id or (padre and self._existe(padre)):
+            self._guardar(archivo, padre)
+            if archivo.get("mimeType") == _FOLDER_MIME and not conocido:
+                # Carpeta movida dentro del subárbol: su contenido no genera cambios propios
+                self._recorrer(service, [file_id])
+            return True
+        if conocido:
+            # Se movió fuera del subárbol
+            self.eliminar(file_id)
+            return True
+        return False
+
+    # ── Consultas y registro ──────────────────────────────────────────────────
+
+    def buscar(self, padre: str, nombre: str, carpeta: bool | None = None) -> str | None:
+        """ID del elemento `nombre` dentro de `padre` (opcionalmente solo carpetas/archivos)."""
+        sql = "SELECT id FROM archivos WHERE padre = ? AND nombre = ?"
+        args: list = [padre, nombre]
+        if carpeta is not None:
+            sql += " AND mime = ?" if carpeta else " AND mime != ?"
+            args.append(_FOLDER_MIME)
+        with self._lock:
+            fila = self._conn.execute(sql + " LIMIT 1", args).fetchone()
+        return fila["id"] if fila else None
+
+    def listar(self, padre: str, carpetas: bool | None = None) -> list[dict]:
+        """Hijos de `padre` con el mismo formato que devuelve files().list."""
+        sql = "SELECT id, nombre, mime, md5 FROM archivos WHERE padre = ?"
+        args: list = [padre]
+        if carpetas is not None:
+            sql += " AND mime = ?" if carpetas else " AND mime != ?"
+            args.append(_FOLDER_MIME)
+        with self._lock:
+            filas = self._conn.execute(sql + " ORDER BY nombre", args).fetchall()
+        return [
+            {"id": f["id"], "name": f["nombre"], "mimeType": f["mime"], "md5Checksum": f["md5"]}
+            for f in filas
+        ]
+
+    def buscar_contenido(self, nombre: str, md5: str) -> str | None:
+        """ID de cualquier archivo del subárbol con ese nombre y ese md5."""
+        with self._lock:
+            fila = self._conn.execute(
+                "SELECT id FROM archivos WHERE nombre = ? AND md5 = ? LIMIT 1", (nombre, md5)
+            ).fetchone()
+        return fila["id"] if fila else None
+
+    def contiene(self, file_id: str) -> bool:
+        """True si `file_id` es la raíz o está dentro del subárbol replicado."""
+        return file_id == self._raiz_id or self._existe(file_id)
+
+    def registrar(self, file_id: str, nombre: str, padre: str, mime: str = _FOLDER_MIME, md5: str | None = None) -> None:
+        """Añade al espejo algo creado o subido en esta ejecución."""
+        self._guardar({"id": file_id, "name": nombre, "mimeType": mime, "md5Checksum": md5}, padre)
+
+    def eliminar(self, file_id: str) -> None:
+        """Quita un elemento y todo lo que cuelga de él."""
+        with self._lock, self._conn:
+            self._conn.execute(
+                """WITH RECURSIVE sub(id) AS (
+                       SELECT ?
+                       UNION ALL
+                       SELECT a.id FROM archivos a JOIN sub ON a.padre = sub.id
+                   )
+                   DELETE FROM archivos WHERE id IN (SELECT id FROM sub)""",
+                (file_id,),
+            )
+
+    def cerrar(self) -> None:
+        with self._lock:
+            self._conn.close()
+
+    # ── Internos ──────────────────────────────────────────────────────────────
+
+    def _existe(self, file_id: str) -> bool:
+        with self._lock:
+            return self._conn.execute("SELECT 1 FROM archivos WHERE id = ?", (file_id,)).fetchone() is not None
+
+    def _guardar(self, archivo: dict, padre: str) -> None:
+        with self._lock, self._conn:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO archivos (id, nombre, padre, mime, md5) VALUES (?, ?, ?, ?, ?)",
+                (archivo["id"], archivo["name"], padre, archivo.get("mimeType", ""), archivo.get("md5Checksum")),
+            )
+
+    def _meta(self, clave: str) -> str | None:
+        with self._lock:
+            fila = self._conn.execute("SELECT valor FROM meta WHERE clave = ?", (clave,)).fetchone()
+        return fila["valor"] if fila else None
+
+    def _guardar_meta(self, clave: str, valor: str) -> None:
+        """Se llama con el lock y la transacción ya abiertos."""
+        self._conn.execute("INSERT OR REPLACE INTO meta (clave, valor) VALUES (?, ?)", (clave, valor))
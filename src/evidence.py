@@ -129,15 +129,13 @@ def _minimizar_chrome() -> int:
     return hwnd or 0
 
 
-def capturar_propiedades_archivo(output_dir: Path, archivo: Path, nombre_base: str) -> None:
+def _mostrar_en_explorador(archivo: Path) -> tuple[int, int]:
     """
-    Abre Explorer en la carpeta de descarga con el archivo seleccionado,
-    luego abre Propiedades y captura la pantalla.
+    Minimiza Chrome y abre Explorer en la carpeta del archivo, con el archivo
+    seleccionado y en primer plano.
 
-    Args:
-        output_dir:   Carpeta donde se guardará la captura.
-        archivo:      Path al archivo (en su ruta de descarga original).
-        nombre_base:  Prefijo para el nombre de la captura.
+    Returns:
+        (hwnd_chrome, hwnd_explorer) para cerrarlos con _cerrar_explorador.
     """
     # Minimizar Chrome para que no tape Explorer ni Propiedades
     hwnd_chrome = _minimizar_chrome()
@@ -150,6 +148,51 @@ def capturar_propiedades_archivo(output_dir: Path, archivo: Path, nombre_base: s
     hwnd_explorer = _hwnd_explorador_carpeta(archivo.parent)
     _forzar_foco(hwnd_explorer)
     _time.sleep(0.5)
+    return hwnd_chrome, hwnd_explorer
+
+
+def _cerrar_explorador(hwnd_chrome: int, hwnd_explorer: int) -> None:
+    """Cierra la ventana de Explorer y restaura Chrome."""
+    if hwnd_explorer:
+        _user32.PostMessageW(hwnd_explorer, 0x0010, 0, 0)  # WM_CLOSE
+    _time.sleep(0.3)
+
+    # Restaurar Chrome
+    if hwnd_chrome:
+        _user32.ShowWindow(hwnd_chrome, 9)  # SW_RESTORE
+
+
+def capturar_archivo_descargado(output_dir: Path, archivo: Path, nombre: str) -> Path:
+    """
+    Captura Explorer con el archivo seleccionado en su carpeta de descarga.
+    Es la evidencia de descarga cuando el archivo no lo bajó el navegador y
+    no hay notificación de Chrome que capturar.
+
+    Args:
+        output_dir: Carpeta donde se guardará la captura.
+        archivo:    Path al archivo (en su ruta de descarga original).
+        nombre:     Nombre descriptivo de la captura.
+
+    Returns:
+        Path al archivo de imagen generado.
+    """
+    hwnd_chrome, hwnd_explorer = _mostrar_en_explorador(archivo)
+    captura = capturar(output_dir, nombre)
+    _cerrar_explorador(hwnd_chrome, hwnd_explorer)
+    return captura
+
+
+def capturar_propiedades_archivo(output_dir: Path, archivo: Path, nombre_base: str) -> None:
+    """
+    Abre Explorer en la carpeta de descarga con el archivo seleccionado,
+    luego abre Propiedades y captura la pantalla.
+
+    Args:
+        output_dir:   Carpeta donde se guardará la captura.
+        archivo:      Path al archivo (en su ruta de descarga original).
+        nombre_base:  Prefijo para el nombre de la captura.
+    """
+    hwnd_chrome, hwnd_explorer = _mostrar_en_explorador(archivo)
 
     # Alt+Enter abre Propiedades del archivo seleccionado por /select
     pyautogui.hotkey("alt", "return")
@@ -172,10 +215,4 @@ def capturar_propiedades_archivo(output_dir: Path, archivo: Path, nombre_base: s
     if hwnd_props:
         _user32.PostMessageW(hwnd_props, 0x0010, 0, 0)  # WM_CLOSE
     _time.sleep(0.3)
-    if hwnd_explorer:
-        _user32.PostMessageW(hwnd_explorer, 0x0010, 0, 0)  # WM_CLOSE
-    _time.sleep(0.3)
-
-    # Restaurar Chrome
-    if hwnd_chrome:
-        _user32.ShowWindow(hwnd_chrome, 9)  # SW_RESTORE
+    _cerrar_explorador(hwnd_chrome, hwnd_explorer)
@@ -0,0 +1,108 @@
+"""
+Empaquetado de evidencias pequeñas para subirlas a Drive en una sola llamada.
+
+Las capturas PNG de cada carpeta de proceso (mongod-audit-log/, mongod/) se
+suben como dos archivos en lugar de uno por captura:
+
+    evidencias_<carpeta>.tar             capturas sin comprimir (el PNG ya lo está)
+    evidencias_<carpeta>.manifest.json   nombre, offset, tamaño y SHA-256 de cada una
+
+Con el manifiesto se puede descargar una sola captura del tar mediante una
+petición HTTP Range, sin bajar el archivo completo. Los logs .gz y el IPE se
+siguen subiendo tal cual.
+
+Ni el tar ni el manifiesto llevan la hora de empaquetado, y las cabeceras
+del tar no guardan mtime, propietario ni permisos de cada captura: con las
+mismas capturas salen idénticos byte a byte en cualquier máquina, así que la
+sincronización incremental por MD5 no los vuelve a subir.
+"""
+from pathlib import Path
+import hashlib
+import json
+import tarfile
+
+# Solo se empaquetan capturas de evidencia
+_EXTENSIONES = {".png"}
+
+
+def _sha256(path: Path) -> str:
+    h = hashlib.sha256()
+    with open(path, "rb") as f:
+        while chunk := f.read(1024 * 1024):
+            h.update(chunk)
+    return h.hexdigest()
+
+
+def _normalizar(info: tarfile.TarInfo) -> tarfile.TarInfo:
+    """Quita del miembro del tar lo que depende de la máquina o de la copia local."""
+    info.mtime = 0
+    info.uid = info.gid = 0
+    info.uname = info.gname = ""
+    info.mode = 0o644
+    return info
+
+
+def nombre_manifiesto(carpeta: str) -> str:
+    """Nombre del manifiesto JSON asociado a una carpeta de proceso."""
+    return f"evidencias_{carpeta}.manifest.json"
+
+
+def empaquetar(carpeta: Path, destino_dir: Path, max_mb: float) -> tuple[Path, Path, list[Path]] | None:
+    """
+    Empaqueta las capturas pequeñas de `carpeta` en un tar con su manifiesto.
+
+    Args:
+        carpeta:     Carpeta local de un proceso (ej: resultados/mongod)
+        destino_dir: Carpeta temporal donde dejar el tar y el manifiesto
+        max_mb:      Solo se empaquetan archivos por debajo de este tamaño
+
+    Returns:
+        (tar, manifiesto, archivos empaquetados), o None si hay menos de dos
+        capturas (empaquetar una sola no ahorra ninguna llamada).
+    """
+    umbral = max_mb * 1024 * 1024
+    archivos = [
+        f for f in sorted(carpeta.iterdir())
+        if f.is_file() and f.suffix.lower() in _EXTENSIONES and f.stat().st_size < umbral
+    ]
+    if len(archivos) < 2:
+        return None
+
+    destino_dir.mkdir(parents=True, exist_ok=True)
+    tar_path = destino_dir / f"evidencias_{carpeta.name}.tar"
+    with tarfile.open(tar_path, "w") as tar:
+        for archivo in archivos:
+            tar.add(archivo, arcname=archivo.name, filter=_normalizar)
+
+    # offset_data es la posición del contenido dentro del tar (tras la cabecera)
+    with tarfile.open(tar_path, "r") as tar:
+        offsets = {m.name: (m.offset_data, m.size) for m in tar.getmembers()}
+
+    manifiesto = {
+        "archivo": tar_path.name,
+        "evidencias": [
+            {
+                "nombre": archivo.name,
+                "offset": offsets[archivo.name][0],
+                "tamano": offsets[archivo.name][1],
+                "sha256": _sha256(archivo),
+            }
+            for archivo in archivos
+        ],
+    }
+    manifiesto_path = destino_dir / nombre_manifiesto(carpeta.name)
+    manifiesto_path.write_text(json.dumps(manifiesto, ensure_ascii=False, indent=1), encoding="utf-8")
+
+    print(f"  → {len(archivos)} evidencia(s) de {carpeta.name}/ empaquetadas en {tar_path.name}")
+    return tar_path, manifiesto_path, archivos
+
+
+def verificar(contenido: bytes, entrada: dict) -> None:
+    """
+    Comprueba que los bytes extraídos coinciden con el SHA-256 del manifiesto.
+
+    Raises:
+        ValueError: si la evidencia está corrupta o incompleta.
+    """
+    if len(contenido) != entrada["tamano"] or hashlib.sha256(contenido).hexdigest() != entrada["sha256"]:
+        raise ValueError(f"La evidencia {entrada['nombre']} no coincide con el manifiesto")
@@ -1,84 +1,182 @@
 """
 Lectura del OTP de MongoDB Atlas desde Gmail via Google API.
 
-Busca el correo más reciente de mongodb-account@mongodb.com con el código
-de verificación y extrae los 6 dígitos.
+Flujo principal (incremental):
+  1. Antes de pulsar "Send Code" se guarda el historyId actual del buzón
+     (marcar_buzon).
+  2. Tras el envío se consulta users.history.list desde esa marca cada
+     OTP_INTERVALO_MIN_SEG durante los primeros OTP_VENTANA_RAPIDA_SEG (un
+     intervalo que creciera desde el principio dejaría los sondeos en una
+     rejilla gruesa justo cuando suele llegar el correo); después el
+     intervalo crece hasta OTP_INTERVALO_MAX_SEG.
+  3. Cada mensaje nuevo se descarga una sola vez (format="full") y se
+     comprueban remitente, asunto y los 6 dígitos.
+
+Si no hay marca (o Gmail ya no acepta ese historyId) se usa la búsqueda
+clásica con messages.list sobre el correo más reciente de
+mongodb-account@mongodb.com.
 """
 import re
 import time
 import base64
 from pathlib import Path
 
-from google.oauth2.credentials import Credentials
-from google.auth.transport.requests import Request
-from googleapiclient.discovery import build
+from googleapiclient.errors import HttpError
 
 import config
+from src.google_client import obtener_servicio
 
 _SCOPES = ["https://www.googleapis.com/auth/gmail.readonly"]
-_SENDER = "mongodb-account@mongodb.com"
+# Remitente de los correos con el código (también lo filtra src.imap_otp)
+REMITENTE_OTP = "mongodb-account@mongodb.com"
 _SUBJECT_RE = re.compile(r"MongoDB verification code", re.IGNORECASE)
 _OTP_RE = re.compile(r"\b(\d{6})\b")
 
 
 def _get_service():
-    creds = Credentials.from_authorized_user_file(str(config.GMAIL_TOKEN_PATH), _SCOPES)
-    if creds.expired and creds.refresh_token:
-        creds.refresh(Request())
-        config.GMAIL_TOKEN_PATH.write_text(creds.to_json())
-    return build("gmail", "v1", credentials=creds)
+    return obtener_servicio("gmail", "v1", _SCOPES)
 
 
-def _extract_otp_from_message(service, msg_id: str) -> str | None:
-    msg = service.users().messages().get(
-        userId="me", id=msg_id, format="full"
-    ).execute()
-
-    headers = {h["name"]: h["value"] for h in msg["payload"]["headers"]}
-    subject = headers.get("Subject", "")
-    if not _SUBJECT_RE.search(subject):
+def extraer_otp(asunto: str, textos: list[str]) -> str | None:
+    """
+    Devuelve el código de 6 dígitos si `asunto` es el del correo de
+    verificación de MongoDB, buscándolo primero en el asunto y luego en los
+    textos del cuerpo. Lo comparten todos los backends de OTP.
+    """
+    if not _SUBJECT_RE.search(asunto):
         return None
+    for texto in [asunto, *textos]:
+        match = _OTP_RE.search(texto)
+        if match:
+            return match.group(1)
+    return None
 
-    match = _OTP_RE.search(subject)
-    if match:
-        return match.group(1)
 
-    parts = msg["payload"].get("parts", [msg["payload"]])
-    for part in parts:
-        data = part.get("body", {}).get("data", "")
+def _textos_de_partes(payload: dict) -> list[str]:
+    """Decodifica el cuerpo de todas las partes del mensaje (también las anidadas)."""
+    textos = []
+    pendientes = [payload]
+    while pendientes:
+        parte = pendientes.pop(0)
+        pendientes.extend(parte.get("parts", []))
+        data = parte.get("body", {}).get("data", "")
         if data:
-            text = base64.urlsafe_b64decode(data).decode("utf-8", errors="ignore")
-            match = _OTP_RE.search(text)
-            if match:
-                return match.group(1)
+            textos.append(base64.urlsafe_b64decode(data).decode("utf-8", errors="ignore"))
+    return textos
 
-    return None
+
+def _otp_de_mensaje(msg: dict, after_ts: float | None = None) -> str | None:
+    """
+    Extrae el OTP de un mensaje ya descargado con format="full", descartando
+    los de otro remitente o llegados antes de `after_ts`.
+    """
+    headers = {h["name"].lower(): h["value"] for h in msg["payload"].get("headers", [])}
+    if REMITENTE_OTP not in headers.get("from", "").lower():
+        return None
+    if after_ts and int(msg.get("internalDate", "0")) < int(after_ts * 1000):
+        print(f"  → [gmail] Mensaje {msg['id']} ignorado (anterior al envío del código)")
+        return None
+    return extraer_otp(headers.get("subject", ""), _textos_de_partes(msg["payload"]))
+
+
+def _get_mensaje(service, msg_id: str) -> dict:
+    return service.users().messages().get(userId="me", id=msg_id, format="full").execute()
 
 
-def obtener_otp(timeout_seg: int = 60, intervalo_seg: int = 5, after_ts: float | None = None) -> str:
+def marcar_buzon() -> str | None:
     """
-    Espera hasta `timeout_seg` segundos a que llegue el correo de OTP de MongoDB
-    y devuelve el código de 6 dígitos.
+    Devuelve el historyId actual del buzón. Debe llamarse justo antes de
+    pulsar "Send Code": todo lo que llegue después aparece en history.list.
 
-    Raises:
-        TimeoutError: si no llega el correo en el tiempo indicado.
+    Returns:
+        historyId, o None si no se pudo leer (se usará la búsqueda clásica).
     """
-    import datetime as _dt
+    try:
+        perfil = _get_service().users().getProfile(userId="me").execute()
+        return perfil["historyId"]
+    except Exception as e:
+        print(f"  [aviso] No se pudo leer el historyId de Gmail, se usará la búsqueda clásica: {e}")
+        return None
 
-    service = _get_service()
-    print(f"  → Esperando OTP en correo (hasta {timeout_seg}s)...")
-    if after_ts:
-        ts_legible = _dt.datetime.fromtimestamp(after_ts).strftime("%H:%M:%S")
-        print(f"  → Solo se aceptan correos llegados después de: {ts_legible}")
 
-    # Evita agarrar códigos antiguos: espera mínimo 5s y filtra por timestamp
-    print("  → [gmail] Esperando 5s para que el correo tenga tiempo de llegar...")
-    time.sleep(5)
+def _esperar_por_historial(
+    service, history_id: str, deadline: float, after_ts: float | None
+) -> str | None:
+    """
+    Consulta history.list desde `history_id` hasta encontrar el OTP o llegar
+    a `deadline`. Devuelve None si Gmail rechaza la marca (historyId caducado).
+    """
+    intervalo = config.OTP_INTERVALO_MIN_SEG
+    fin_ventana = (after_ts or time.time()) + config.OTP_VENTANA_RAPIDA_SEG
+    vistos: set[str] = set()
+    consultas = 0
+    while time.time() < deadline:
+        consultas += 1
+        nuevos = []
+        page_token = None
+        try:
+            while True:
+                resp = service.users().history().list(
+                    userId="me",
+                    startHistoryId=history_id,
+                    historyTypes="messageAdded",
+                    pageToken=page_token,
+                ).execute()
+                for h in resp.get("history", []):
+                    for agregado in h.get("messagesAdded", []):
+                        msg_id = agregado["message"]["id"]
+                        if msg_id not in vistos:
+                            vistos.add(msg_id)
+                            nuevos.append(msg_id)
+                page_token = resp.get("nextPageToken")
+                if not page_token:
+                    break
+        except HttpError as e:
+            if e.resp.status == 404:
+                print("  → [gmail] historyId caducado, se usa la búsqueda clásica")
+                return None
+            raise
+        # El siguiente sondeo parte del último historyId visto
+        history_id = resp.get("historyId", history_id)
+
+        for msg_id in nuevos:
+            try:
+                msg = _get_mensaje(service, msg_id)
+            except HttpError as e:
+                # El historial también lista mensajes que ya se borraron
+                if e.resp.status == 404:
+                    print(f"  → [gmail] Mensaje {msg_id} ya no existe, se omite")
+                    continue
+                raise
+            otp = _otp_de_mensaje(msg, after_ts)
+            if otp:
+                print(f"  → [gmail] OTP encontrado tras {consultas} consulta(s) al historial")
+                return otp
+
+        time.sleep(min(intervalo, max(0.0, deadline - time.time())))
+        if time.time() >= fin_ventana:
+            intervalo = min(config.OTP_INTERVALO_MAX_SEG, intervalo * 1.5)
+
+    raise TimeoutError(
+        f"No se recibió el correo de OTP de MongoDB a tiempo "
+        f"({consultas} consulta(s) al historial de Gmail)."
+    )
+
+
+def _esperar_por_busqueda(
+    service, deadline: float, timeout_seg: int, intervalo_seg: int, after_ts: float | None
+) -> str:
+    """
+    Búsqueda clásica: messages.list con query por remitente y asunto.
+    Consulta desde el primer momento con intervalo adaptativo (de
+    OTP_INTERVALO_MIN_SEG hasta `intervalo_seg`); los códigos antiguos se
+    descartan por timestamp, no esperando antes de buscar.
+    """
+    intervalo = config.OTP_INTERVALO_MIN_SEG
     after_clause = f" after:{int(after_ts)}" if after_ts else ""
-    query = f"from:{_SENDER} subject:\"MongoDB verification code\" newer_than:2m{after_clause}"
+    query = f"from:{REMITENTE_OTP} subject:\"MongoDB verification code\" newer_than:2m{after_clause}"
     print(f"  → [gmail] Query de búsqueda: {query!r}")
 
-    deadline = time.time() + timeout_seg
     intento = 0
     while time.time() < deadline:
         intento += 1
@@ -95,32 +193,59 @@ def obtener_otp(timeout_seg: int = 60, intervalo_seg: int = 5, after_ts: float |
         print(f"  → [gmail] Mensajes encontrados: {len(messages)}")
 
         for msg in messages:
-            # Evita códigos antiguos: revisa timestamp del mensaje
-            if after_ts:
-                msg_meta = service.users().messages().get(
-                    userId="me", id=msg["id"], format="metadata"
-                ).execute()
-                internal_date_ms = int(msg_meta.get("internalDate", "0"))
-                msg_ts_legible = _dt.datetime.fromtimestamp(internal_date_ms / 1000).strftime("%H:%M:%S")
-                umbral_legible = _dt.datetime.fromtimestamp(after_ts).strftime("%H:%M:%S")
-                if internal_date_ms < int(after_ts * 1000):
-                    print(f"  → [gmail] Mensaje {msg['id']} ignorado (llegó {msg_ts_legible}, umbral {umbral_legible})")
-                    continue
-                print(f"  → [gmail] Mensaje {msg['id']} válido (llegó {msg_ts_legible})")
-
-            otp = _extract_otp_from_message(service, msg["id"])
+            # Una sola descarga por mensaje: trae internalDate, cabeceras y cuerpo
+            otp = _otp_de_mensaje(_get_mensaje(service, msg["id"]), after_ts)
             if otp:
-                print(f"  → OTP obtenido: {otp}")
                 return otp
-            else:
-                print(f"  → [gmail] Mensaje {msg['id']} no contenía OTP de 6 dígitos")
+            print(f"  → [gmail] Mensaje {msg['id']} no contenía OTP de 6 dígitos")
 
         # Si no hubo match, espera y sigue
-        espera = max(intervalo_seg, 5)
-        print(f"  → [gmail] Sin OTP aún. Reintentando en {espera}s...")
+        espera = min(intervalo, max(0.0, deadline - time.time()))
+        print(f"  → [gmail] Sin OTP aún. Reintentando en {espera:.1f}s...")
         time.sleep(espera)
+        intervalo = min(intervalo_seg, intervalo * 1.5)
 
     raise TimeoutError(
         f"No se recibió el correo de OTP de MongoDB en {timeout_seg} segundos "
         f"(intentos realizados: {intento})."
     )
+
+
+def obtener_otp(
+    timeout_seg: int = 60,
+    intervalo_seg: int = 5,
+    after_ts: float | None = None,
+    history_id: str | None = None,
+) -> str:
+    """
+    Espera hasta `timeout_seg` segundos a que llegue el correo de OTP de MongoDB
+    y devuelve el código de 6 dígitos.
+
+    Args:
+        timeout_seg:   Tiempo máximo de espera
+        intervalo_seg: Intervalo de la búsqueda clásica (sin history_id)
+        after_ts:      Timestamp del envío del código; se ignoran correos anteriores
+        history_id:    Marca obtenida con marcar_buzon() antes de pulsar "Send Code"
+
+    Raises:
+        TimeoutError: si no llega el correo en el tiempo indicado.
+    """
+    import datetime as _dt
+
+    service = _get_service()
+    print(f"  → Esperando OTP en correo (hasta {timeout_seg}s)...")
+    if after_ts:
+        ts_legible = _dt.datetime.fromtimestamp(after_ts).strftime("%H:%M:%S")
+        print(f"  → Solo se aceptan correos llegados después de: {ts_legible}")
+
+    inicio = time.time()
+    deadline = inicio + timeout_seg
+    otp = None
+    if history_id:
+        otp = _esperar_por_historial(service, history_id, deadline, after_ts)
+    if otp is None:
+        otp = _esperar_por_busqueda(service, deadline, timeout_seg, intervalo_seg, after_ts)
+
+    referencia = after_ts or inicio
+    print(f"  → OTP obtenido: {otp} ({time.time() - referencia:.1f}s desde el envío del código)")
+    return otp
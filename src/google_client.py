@@ -0,0 +1,190 @@
+"""
+Fábrica compartida de clientes de Google API (Drive y Gmail).
+
+- Las credenciales de token.json se cargan una sola vez y se reutilizan en
+  memoria. Un hilo de fondo las refresca GOOGLE_TOKEN_MARGEN_SEG antes de
+  que caduquen, así ninguna llamada del camino crítico (p. ej. leer el OTP)
+  espera a un refresco OAuth.
+- token.json se lee y escribe con un bloqueo de archivo: si otro proceso del
+  bot ya lo refrescó, se adopta su token en lugar de pedir otro.
+- Las credenciales llevan su propio bloqueo: el hilo de fondo solo las
+  modifica con él, y los clientes lo toman al firmar cada petición, así nunca
+  leen un token a medio actualizar ni refrescan a la vez que el hilo.
+- Los documentos de discovery son los estáticos que trae
+  google-api-python-client: construir un cliente no hace ninguna petición.
+- Cada hilo tiene su propia conexión HTTP keep-alive (httplib2 no es
+  thread-safe) y un cliente por API reutilizado entre llamadas.
+"""
+from datetime import datetime, timezone
+import json
+import threading
+import time
+
+import google_auth_httplib2
+from google.oauth2.credentials import Credentials
+from google.auth.transport.requests import Request
+from googleapiclient.discovery import build
+from googleapiclient.http import build_http
+
+import config
+from src.locks import bloqueo_archivo, escribir_atomico
+
+
+class _Credenciales(Credentials):
+    """Credentials cuyo uso y refresco se serializan con un bloqueo propio."""
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.bloqueo = threading.RLock()
+
+    def before_request(self, request, method, url, headers):
+        with self.bloqueo:
+            super().before_request(request, method, url, headers)
+
+    def refresh(self, request):
+        with self.bloqueo:
+            super().refresh(request)
+
+
+_creds_lock = threading.Lock()
+_credenciales: _Credenciales | None = None
+_renovador: threading.Thread | None = None
+
+# Por hilo: conexión HTTP autorizada y clientes ya construidos por (api, versión)
+_hilo_local = threading.local()
+
+_metricas_lock = threading.Lock()
+_metricas: dict[str, dict[str, float]] = {}
+
+
+def _leer_token() -> _Credenciales:
+    """Carga token.json; sin scopes explícitos se usan los que quedaron grabados."""
+    return _Credenciales.from_authorized_user_file(str(config.GMAIL_TOKEN_PATH))
+
+
+def _segundos_restantes(creds: Credentials) -> float:
+    """Segundos hasta la caducidad del access token (0 si no tiene o ya caducó)."""
+    if not creds.token or creds.expiry is None:
+        return 0.0
+    # google-auth guarda `expiry` como UTC sin zona horaria
+    ahora = datetime.now(timezone.utc).replace(tzinfo=None)
+    return max(0.0, (creds.expiry - ahora).total_seconds())
+
+
+def _refrescar(creds: _Credenciales) -> None:
+    """
+    Refresca `creds` en el sitio bajo el bloqueo de token.json y el de las
+    credenciales. Si otro proceso ya dejó en el archivo un token con más
+    vigencia, se adopta ese.
+    """
+    with bloqueo_archivo(config.GMAIL_TOKEN_PATH), creds.bloqueo:
+        try:
+            en_disco = _leer_token()
+        except (OSError, ValueError):
+            en_disco = None
+        if en_disco is not None and _segundos_restantes(en_disco) > max(
+            _segundos_restantes(creds), config.GOOGLE_TOKEN_MARGEN_SEG
+        ):
+            creds.token = en_disco.token
+            creds.expiry = en_disco.expiry
+            return
+
+        inicio = time.perf_counter()
+        creds.refresh(Request())
+        # Se conservan los campos del archivo que Credentials no serializa
+        datos = json.loads(config.GMAIL_TOKEN_PATH.read_text()) if config.GMAIL_TOKEN_PATH.exists() else {}
+        datos.update(json.loads(creds.to_json()))
+        escribir_atomico(config.GMAIL_TOKEN_PATH, json.dumps(datos))
+        print(f"  [google] Token OAuth refrescado en {(time.perf_counter() - inicio) * 1000:.0f} ms")
+
+
+def _renovar_en_segundo_plano() -> None:
+    """Hilo daemon: refresca el token antes de que caduque, indefinidamente."""
+    while True:
+        espera = _segundos_restantes(_credenciales) - config.GOOGLE_TOKEN_MARGEN_SEG
+        if espera > 0:
+            time.sleep(espera)
+        try:
+            _refrescar(_credenciales)
+        except Exception as e:
+            print(f"  [aviso] No se pudo refrescar el token OAuth en segundo plano: {e}")
+            time.sleep(30)
+
+
+def obtener_credenciales() -> Credentials:
+    """
+    Devuelve las credenciales compartidas. La primera llamada las carga (y
+    refresca si hace falta) y arranca el hilo que las mantiene vigentes.
+    """
+    global _credenciales, _renovador
+    with _creds_lock:
+        if _credenciales is None:
+            with bloqueo_archivo(config.GMAIL_TOKEN_PATH):
+                _credenciales = _leer_token()
+        if _segundos_restantes(_credenciales) <= config.GOOGLE_TOKEN_MARGEN_SEG and _credenciales.refresh_token:
+            _refrescar(_credenciales)
+        if _renovador is None and _credenciales.refresh_token:
+            _renovador = threading.Thread(target=_renovar_en_segundo_plano, name="google-token", daemon=True)
+            _renovador.start()
+        return _credenciales
+
+
+def _registrar_latencia(clave: str, ms: float, construido: bool) -> None:
+    with _metricas_lock:
+        m = _metricas.setdefault(clave, {"primera_ms": ms, "repetida_ms": 0.0, "llamadas": 0, "construcciones": 0})
+        m["llamadas"] += 1
+        if construido:
+            m["construcciones"] += 1
+        else:
+            m["repetida_ms"] = ms
+
+
+def obtener_servicio(api: str, version: str, scopes: list[str] | None = None):
+    """
+    Devuelve el cliente de `api` para el hilo actual, construyéndolo la
+    primera vez sobre la conexión keep-alive del hilo.
+
+    Args:
+        api:     Nombre de la API ("drive", "gmail")
+        version: Versión de la API ("v3", "v1")
+        scopes:  Scopes que necesita el llamador; si token.json no los
+                 incluye se avisa (hay que regenerarlo con generate_token.py)
+    """
+    inicio = time.perf_counter()
+    clave = f"{api} {version}"
+
+    servicios = getattr(_hilo_local, "servicios", None)
+    if servicios is None:
+        servicios = _hilo_local.servicios = {}
+
+    service = servicios.get(clave)
+    construido = service is None
+    if construido:
+        creds = obtener_credenciales()
+        if scopes and creds.scopes and not creds.has_scopes(scopes):
+            print(f"  [aviso] {config.GMAIL_TOKEN_PATH} no incluye los permisos de {api}. "
+                  "Elimínalo y ejecuta generate_token.py de nuevo.")
+
+        http = getattr(_hilo_local, "http", None)
+        if http is None:
+            http = _hilo_local.http = google_auth_httplib2.AuthorizedHttp(creds, http=build_http())
+
+        service = build(api, version, http=http, static_discovery=True, cache_discovery=False)
+        servicios[clave] = service
+        ms = (time.perf_counter() - inicio) * 1000
+        print(f"  [google] Cliente {clave} listo en {ms:.0f} ms ({threading.current_thread().name})")
+    else:
+        ms = (time.perf_counter() - inicio) * 1000
+
+    _registrar_latencia(clave, ms, construido)
+    return service
+
+
+def latencias() -> dict[str, dict[str, float]]:
+    """
+    Latencia de obtención de cada cliente: la primera construcción del proceso
+    y la última reutilización desde caché, junto con el número de llamadas y
+    de clientes construidos (uno por hilo).
+    """
+    with _metricas_lock:
+        return {clave: dict(m) for clave, m in _metricas.items()}
@@ -0,0 +1,251 @@
+"""
+Lectura del OTP de MongoDB Atlas por IMAP IDLE (push).
+
+La conexión se abre y entra en IDLE antes de pulsar "Send Code"; en cuanto
+el servidor avisa de un mensaje nuevo (EXISTS) se descarga solo lo llegado
+desde ese momento y se extrae el código con la misma lógica que el backend
+REST (gmail_otp.extraer_otp).
+
+imaplib no implementa IDLE (hasta Python 3.14), así que el comando se envía
+a mano. Para poder esperar sus avisos con timeout, la conexión (_ConexionImap)
+lee del socket con un búfer propio en lugar del archivo interno de imaplib
+(que queda inutilizable tras un timeout): los comandos normales y el IDLE
+consumen el mismo flujo y no se pierde nada que el servidor mande de más.
+
+Los avisos EXISTS que llegan mientras se ejecuta SEARCH/FETCH los guarda
+imaplib en untagged_responses, y los que llegan al entrar o salir del IDLE se
+anotan aparte: en ambos casos se vuelve a buscar antes de seguir esperando.
+
+Autenticación (IMAP_AUTH):
+    password  IMAP_USER + IMAP_PASSWORD (contraseña de aplicación de Google)
+    xoauth2   token OAuth de token.json; requiere el scope https://mail.google.com/
+"""
+from email import message_from_bytes
+from email.policy import default as politica_email
+import imaplib
+import socket
+import time
+
+import config
+from src.gmail_otp import REMITENTE_OTP, extraer_otp
+from src.google_client import obtener_credenciales
+
+_SCOPE_XOAUTH2 = "https://mail.google.com/"
+
+# RFC 2177: el servidor puede cortar un IDLE de más de 29 min; se renueva antes
+_RENOVAR_IDLE_SEG = 9 * 60
+
+
+class _ConexionImap(imaplib.IMAP4_SSL):
+    """
+    IMAP4_SSL cuyas lecturas pasan por un búfer propio sobre sock.recv().
+    Un timeout del socket deja intacto lo ya recibido, así que se puede
+    esperar una línea con límite de tiempo (esperar_linea) sin romper la
+    conexión.
+    """
+
+    def open(self, host="", port=imaplib.IMAP4_SSL_PORT, timeout=None):
+        self._recibido = b""
+        super().open(host, port, timeout)
+
+    def _recibir(self) -> None:
+        datos = self.sock.recv(65536)
+        if not datos:
+            raise self.abort("socket error: EOF")
+        self._recibido += datos
+
+    def read(self, size):
+        while len(self._recibido) < size:
+            self._recibir()
+        datos, self._recibido = self._recibido[:size], self._recibido[size:]
+        return datos
+
+    def readline(self):
+        while (fin := self._recibido.find(b"\n")) < 0:
+            if len(self._recibido) > imaplib._MAXLINE:
+                raise self.error(f"got more than {imaplib._MAXLINE} bytes")
+            self._recibir()
+        linea, self._recibido = self._recibido[:fin + 1], self._recibido[fin + 1:]
+        return linea
+
+    def esperar_linea(self, espera: float) -> bytes | None:
+        """Siguiente línea (sin CRLF), o None si no llega en `espera` segundos."""
+        original = self.sock.gettimeout()
+        self.sock.settimeout(max(0.001, espera))
+        try:
+            return self._get_line()
+        except socket.timeout:
+            return None
+        finally:
+            self.sock.settimeout(original)
+
+
+class EscuchaImap:
+    """Conexión IMAP en IDLE sobre el buzón donde llega el OTP."""
+
+    def __init__(self):
+        self._conn: _ConexionImap | None = None
+        self._aviso_pendiente = False
+        self._tag_idle: bytes | None = None
+        self._inicio_idle = 0.0
+        self._uid_siguiente = 1
+
+    def abrir(self) -> None:
+        """Conecta, autentica, selecciona la carpeta y entra en IDLE."""
+        inicio = time.perf_counter()
+        self._conn = _ConexionImap(config.IMAP_HOST, config.IMAP_PORT, timeout=30)
+        if config.IMAP_AUTH == "xoauth2":
+            creds = obtener_credenciales()
+            if creds.scopes and not creds.has_scopes([_SCOPE_XOAUTH2]):
+                print(f"  [aviso] {config.GMAIL_TOKEN_PATH} no incluye el scope {_SCOPE_XOAUTH2} para IMAP")
+            cadena = f"user={config.IMAP_USER}\x01auth=Bearer {creds.token}\x01\x01".encode()
+            self._conn.authenticate("XOAUTH2", lambda _: cadena)
+        else:
+            self._conn.login(config.IMAP_USER, config.IMAP_PASSWORD)
+
+        self._conn.select(config.IMAP_CARPETA, readonly=True)
+        uidnext = self._conn.response("UIDNEXT")[1]
+        if uidnext and uidnext[0]:
+            self._uid_siguiente = int(uidnext[0])
+        else:
+            _, data = self._conn.status(config.IMAP_CARPETA, "(UIDNEXT)")
+            self._uid_siguiente = int(data[0].decode().rsplit("UIDNEXT", 1)[1].strip(" )"))
+
+        self._entrar_idle()
+        print(f"  → [imap] Escuchando {config.IMAP_CARPETA} en {config.IMAP_HOST} "
+              f"(listo en {(time.perf_counter() - inicio) * 1000:.0f} ms)")
+
+    def esperar_otp(self, timeout_seg: int, after_ts: float | None = None) -> str:
+        """
+        Espera el aviso del servidor y devuelve el código de 6 dígitos.
+
+        Raises:
+            TimeoutError: si no llega el correo en el tiempo indicado.
+        """
+        deadline = time.time() + timeout_seg
+        while time.time() < deadline:
+            if time.monotonic() - self._inicio_idle > _RENOVAR_IDLE_SEG:
+                self._salir_idle()
+                self._entrar_idle()
+
+            if self._aviso_pendiente:
+                self._aviso_pendiente = False
+            else:
+                linea = self._conn.esperar_linea(min(deadline - time.time(), 30.0))
+                if linea is None or not linea.endswith(b"EXISTS"):
+                    continue
+
+            self._salir_idle()
+            otp = self._buscar_nuevos(after_ts)
+            if otp:
+                referencia = after_ts or deadline - timeout_seg
+                print(f"  → OTP obtenido: {otp} ({time.time() - referencia:.1f}s desde el envío del código)")
+                return otp
+            self._entrar_idle()
+
+        raise TimeoutError(f"No se recibió el correo de OTP de MongoDB en {timeout_seg} segundos (IMAP).")
+
+    def cerrar(self) -> None:
+        if self._conn is None:
+            return
+        try:
+            if self._tag_idle:
+                self._salir_idle()
+            self._conn.logout()
+        except Exception:
+            pass
+        self._conn = None
+
+    # ── IDLE ──────────────────────────────────────────────────────────────────
+
+    def _entrar_idle(self) -> None:
+        self._tag_idle = self._conn._new_tag()
+        self._conn.send(self._tag_idle + b" IDLE\r\n")
+        while True:
+            linea = self._conn.esperar_linea(30.0)
+            if linea is None:
+                raise TimeoutError("El servidor IMAP no confirmó el IDLE")
+            if linea.startswith(b"+"):
+                break
+            if linea.startswith(self._tag_idle):
+                raise imaplib.IMAP4.error(f"IDLE rechazado: {linea.decode(errors='ignore')}")
+            self._anotar_aviso(linea)
+        self._inicio_idle = time.monotonic()
+
+    def _salir_idle(self) -> None:
+        """Envía DONE y consume hasta la respuesta etiquetada del IDLE."""
+        self._conn.send(b"DONE\r\n")
+        while True:
+            linea = self._conn.esperar_linea(30.0)
+            if linea is None:
+                raise TimeoutError("El servidor IMAP no cerró el IDLE")
+            if linea.startswith(self._tag_idle):
+                break
+            self._anotar_aviso(linea)
+        self._tag_idle = None
+
+    def _anotar_aviso(self, linea: bytes) -> None:
+        """Un EXISTS leído fuera de la espera no se descarta: se busca después."""
+        if linea.endswith(b"EXISTS"):
+            self._aviso_pendiente = True
+
+    # ── Mensajes ──────────────────────────────────────────────────────────────
+
+    def _buscar_nuevos(self, after_ts: float | None) -> str | None:
+        """
+        Descarga los mensajes llegados desde la última revisión y busca el OTP.
+        Si durante SEARCH/FETCH el servidor avisa de otro mensaje (EXISTS),
+        se vuelve a buscar antes de regresar al IDLE.
+        """
+        self._conn.untagged_responses.pop("EXISTS", None)
+        while True:
+            _, data = self._conn.uid("SEARCH", None, f"UID {self._uid_siguiente}:*")
+            # "n:*" devuelve siempre el último mensaje aunque su UID sea menor que n
+            uids = [int(u) for u in data[0].split() if int(u) >= self._uid_siguiente]
+            for uid in uids:
+                self._uid_siguiente = max(self._uid_siguiente, uid + 1)
+                _, partes = self._conn.uid("FETCH", str(uid), "(INTERNALDATE BODY.PEEK[])")
+                for parte in partes:
+                    if not isinstance(parte, tuple):
+                        continue
+                    otp = self._otp_de_mensaje(parte[0], parte[1], after_ts)
+                    if otp:
+                        return otp
+            if self._conn.untagged_responses.pop("EXISTS", None) is None:
+                return None
+
+    @staticmethod
+    def _otp_de_mensaje(cabecera: bytes, crudo: bytes, after_ts: float | None) -> str | None:
+        fecha = imaplib.Internaldate2tuple(cabecera)
+        if after_ts and fecha and time.mktime(fecha) < int(after_ts):
+            return None
+        msg = message_from_bytes(crudo, policy=politica_email)
+        if REMITENTE_OTP not in str(msg.get("From", "")).lower():
+            return None
+        textos = [
+            parte.get_content()
+            for parte in msg.walk()
+            if parte.get_content_maintype() == "text"
+        ]
+        return extraer_otp(str(msg.get("Subject", "")), textos)
+
+
+def abrir_escucha() -> EscuchaImap | None:
+    """
+    Abre la escucha IMAP si OTP_BACKEND=imap. Debe llamarse antes de pulsar
+    "Send Code" para no perder el aviso del correo.
+
+    Returns:
+        La escucha en IDLE, o None si el backend no es IMAP o no se pudo
+        conectar (en ese caso se usa la API REST de Gmail).
+    """
+    if config.OTP_BACKEND != "imap":
+        return None
+    escucha = EscuchaImap()
+    try:
+        escucha.abrir()
+    except Exception as e:
+        print(f"  [aviso] No se pudo abrir IMAP IDLE, se usará la API de Gmail: {e}")
+        escucha.cerrar()
+        return None
+    return escucha
@@ -0,0 +1,71 @@
+"""
+Bloqueo de archivos entre procesos.
+
+Varios bots pueden ejecutarse a la vez sobre la misma máquina y compartir
+archivos (token.json, pools en disco...). El bloqueo se toma sobre un
+archivo hermano "<nombre>.lock": msvcrt en Windows, fcntl en el resto.
+"""
+from contextlib import contextmanager
+from pathlib import Path
+import os
+import time
+
+if os.name == "nt":
+    import msvcrt
+else:
+    import fcntl
+
+
+def _intentar_bloqueo(fd: int) -> bool:
+    try:
+        if os.name == "nt":
+            msvcrt.locking(fd, msvcrt.LK_NBLCK, 1)
+        else:
+            fcntl.flock(fd, fcntl.LOCK_EX | fcntl.LOCK_NB)
+        return True
+    except OSError:
+        return False
+
+
+def _liberar(fd: int) -> None:
+    if os.name == "nt":
+        os.lseek(fd, 0, os.SEEK_SET)
+        msvcrt.locking(fd, msvcrt.LK_UNLCK, 1)
+    else:
+        fcntl.flock(fd, fcntl.LOCK_UN)
+
+
+@contextmanager
+def bloqueo_archivo(path: Path, timeout_seg: float = 30.0):
+    """
+    Bloqueo exclusivo entre procesos asociado a `path`.
+
+    Uso:
+        with bloqueo_archivo(config.GMAIL_TOKEN_PATH):
+            ...leer / escribir token.json...
+
+    Raises:
+        TimeoutError: si otro proceso mantiene el bloqueo más de `timeout_seg`.
+    """
+    lock_path = path.with_name(path.name + ".lock")
+    lock_path.parent.mkdir(parents=True, exist_ok=True)
+    fd = os.open(str(lock_path), os.O_RDWR | os.O_CREAT)
+    try:
+        limite = time.monotonic() + timeout_seg
+        while not _intentar_bloqueo(fd):
+            if time.monotonic() > limite:
+                raise TimeoutError(f"No se pudo bloquear {lock_path} en {timeout_seg:.0f}s")
+            time.sleep(0.05)
+        try:
+            yield
+        finally:
+            _liberar(fd)
+    finally:
+        os.close(fd)
+
+
+def escribir_atomico(path: Path, contenido: str) -> None:
+    """Escribe `contenido` en un temporal y lo renombra sobre `path`."""
+    tmp = path.with_name(path.name + ".tmp")
+    tmp.write_text(contenido, encoding="utf-8")
+    os.replace(tmp, path)
@@ -0,0 +1,172 @@
+"""
+Descarga directa de logs por HTTP con la sesión autenticada del navegador.
+
+Con el navegador ya logueado, el mismo .gz que entrega el modal Download
+Logs está disponible por HTTP. DescargadorLogs toma las cookies del
+contexto de Playwright y descarga con un cliente httpx reutilizable
+(keep-alive entre los dos logs de la ejecución):
+
+- El cuerpo se escribe en bloques de ATLAS_DESCARGA_BLOQUE_KB, sin
+  cargar nunca el archivo entero en memoria, a "<nombre>.part"; solo al
+  terminar se renombra al nombre final.
+- Se informa el progreso (MB, % si hay Content-Length y velocidad).
+- Los bytes se guardan tal cual llegan (iter_raw): el .gz no se descomprime
+  aunque el servidor declare Content-Encoding.
+
+La URL sale de la plantilla ATLAS_LOG_URL, así que se puede apuntar a
+cualquier servidor que sirva los logs (p. ej. el local de las pruebas,
+tests/fake_atlas_logs.py). No tiene valor por defecto: hay que copiar la URL
+real de la descarga del modal (la imprime descargar_log, o la pestaña Red de
+Chrome) antes de activar ATLAS_DESCARGA_HTTP. Si no coincide, Atlas responde
+con la página de login o un error y se vuelve al modal.
+
+El nombre del archivo es el que manda el servidor en Content-Disposition,
+el mismo que el modal usa como suggested_filename. Si falta, se usa el
+nombre con el que el modal guarda los logs: "<host>_MONGODB_AUDIT_LOG.log.gz"
+o "<host>_mongodb.log.gz".
+"""
+from datetime import date, datetime, time as dtime
+from pathlib import Path
+from zoneinfo import ZoneInfo
+import os
+import re
+import time
+
+import httpx
+
+import config
+
+_PROGRESO_SEG = 2.0
+
+# El modal usa la zona horaria del contexto del navegador (America/Lima)
+_ZONA = ZoneInfo("America/Lima")
+
+# Final del nombre con que el modal guarda cada proceso (suggested_filename)
+_SUFIJOS_LOG = {
+    "mongodb-audit-log": "MONGODB_AUDIT_LOG.log.gz",
+    "mongodb": "mongodb.log.gz",
+}
+
+
+def url_log(hostname: str, proceso: str, start: date, end: date) -> str:
+    """
+    URL del log para (host, proceso, rango) según ATLAS_LOG_URL, con el
+    mismo rango que se elige en el modal: start 12:00am → end 11:30pm.
+    """
+    inicio = datetime.combine(start, dtime(0, 0), tzinfo=_ZONA)
+    fin = datetime.combine(end, dtime(23, 30), tzinfo=_ZONA)
+    return config.ATLAS_LOG_URL.format(
+        project_id=config.ATLAS_PROJECT_ID,
+        cluster=config.CLUSTER_NAME,
+        hostname=hostname,
+        proceso=proceso,
+        inicio=int(inicio.timestamp()),
+        fin=int(fin.timestamp()),
+    )
+
+
+def nombre_log(hostname: str, proceso: str) -> str:
+    """Nombre con el que el modal guarda el log de `proceso` en `hostname`."""
+    return f"{hostname}_{_SUFIJOS_LOG.get(proceso, proceso + '.log.gz')}"
+
+
+def _nombre_de_respuesta(resp: httpx.Response, por_defecto: str) -> str:
+    """Nombre del archivo según Content-Disposition, o `por_defecto`."""
+    cabecera = resp.headers.get("Content-Disposition", "")
+    m = re.search(r"filename\*?=(?:UTF-8'')?\"?([^\";]+)\"?", cabecera, re.IGNORECASE)
+    return Path(m.group(1)).name if m else por_defecto
+
+
+class DescargadorLogs:
+    """Cliente HTTP con las cookies de la sesión de Atlas."""
+
+    def __init__(self, user_agent: str | None = None, bloque_bytes: int = 1024 * 1024):
+        self._bloque_bytes = bloque_bytes
+        headers = {"User-Agent": user_agent} if user_agent else {}
+        self._http = httpx.Client(
+            headers=headers,
+            follow_redirects=True,
+            timeout=httpx.Timeout(30.0, read=120.0),
+            limits=httpx.Limits(max_connections=4, max_keepalive_connections=4),
+        )
+
+    def usar_cookies(self, cookies: list[dict]) -> None:
+        """Carga las cookies de context.cookies() (reemplaza las anteriores)."""
+        self._http.cookies.clear()
+        for c in cookies:
+            self._http.cookies.set(c["name"], c["value"], domain=c.get("domain", ""), path=c.get("path", "/"))
+
+    def descargar(self, url: str, carpeta: Path, nombre_defecto: str) -> Path:
+        """
+        Descarga `url` en `carpeta` y devuelve la ruta final.
+
+        Raises:
+            RuntimeError: si el servidor no devuelve el log (p. ej. la sesión
+                          no es válida y redirige al login).
+            httpx.HTTPError: errores de red o HTTP.
+        """
+        with self._http.stream("GET", url) as resp:
+            resp.raise_for_status()
+            if "text/html" in resp.headers.get("Content-Type", ""):
+                raise RuntimeError(f"Se esperaba un .gz y llegó HTML (¿sesión caducada?): {resp.url}")
+
+            destino = carpeta / _nombre_de_respuesta(resp, nombre_defecto)
+            parcial = destino.with_name(destino.name + ".part")
+            total = int(resp.headers.get("Content-Length") or 0)
+            escritos = 0
+            inicio = ultimo_aviso = time.perf_counter()
+
+            carpeta.mkdir(parents=True, exist_ok=True)
+            try:
+                with open(parcial, "wb") as f:
+                    for bloque in resp.iter_raw(self._bloque_bytes):
+                        f.write(bloque)
+                        escritos += len(bloque)
+                        ahora = time.perf_counter()
+                        if ahora - ultimo_aviso >= _PROGRESO_SEG:
+                            ultimo_aviso = ahora
+                            print(f"  → [descarga] {self._progreso(escritos, total, ahora - inicio)}")
+            except BaseException:
+                parcial.unlink(missing_ok=True)
+                raise
+
+        if total and escritos != total:
+            parcial.unlink(missing_ok=True)
+            raise RuntimeError(f"Descarga incompleta: {escritos} de {total} bytes")
+        os.replace(parcial, destino)
+        print(f"  ✓ [descarga] {destino.name}: {self._progreso(escritos, total, time.perf_counter() - inicio)}")
+        return destino
+
+    @staticmethod
+    def _progreso(escritos: int, total: int, segundos: float) -> str:
+        mb = escritos / (1024 * 1024)
+        velocidad = mb / segundos if segundos > 0 else 0.0
+        if total:
+            return f"{mb:.1f}/{total / (1024 * 1024):.1f} MB ({100 * escritos / total:.0f}%) a {velocidad:.1f} MB/s"
+        return f"{mb:.1f} MB a {velocidad:.1f} MB/s"
+
+    def cerrar(self) -> None:
+        self._http.close()
+
+
+_descargador: DescargadorLogs | None = None
+
+
+def descargar_con_sesion(context, user_agent: str, url: str, carpeta: Path, nombre_defecto: str) -> Path:
+    """
+    Descarga `url` con las cookies actuales de `context` (BrowserContext de
+    Playwright), reutilizando el cliente HTTP entre llamadas.
+    """
+    global _descargador
+    if _descargador is None:
+        _descargador = DescargadorLogs(user_agent, config.ATLAS_DESCARGA_BLOQUE_KB * 1024)
+    _descargador.usar_cookies(context.cookies())
+    return _descargador.descargar(url, carpeta, nombre_defecto)
+
+
+def cerrar() -> None:
+    """Cierra el cliente HTTP compartido (si se llegó a crear)."""
+    global _descargador
+    if _descargador is not None:
+        _descargador.cerrar()
+        _descargador = None
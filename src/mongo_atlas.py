@@ -4,33 +4,98 @@ Pasos de navegación en MongoDB Atlas.
 Cada función representa un paso discreto del proceso y toma una captura
 de evidencia al finalizar. Se irán implementando en conjunto con el equipo.
 """
-from playwright.sync_api import Page
+from playwright.sync_api import Locator, Page, TimeoutError as PlaywrightTimeoutError, expect
 from datetime import date, datetime
 from pathlib import Path
 import ctypes
 import struct
 import json
+import re
 import shutil
 import time
 import random
 
 import config
-from src import browser
-from src.anticaptcha import resolver_recaptcha
-from src.evidence import capturar, capturar_propiedades_archivo
-from src.gmail_otp import obtener_otp
+from src import browser, log_download, session_store, timing
+from src.anticaptcha import ResolucionAnticipada
+from src.evidence import capturar, capturar_archivo_descargado, capturar_propiedades_archivo
+from src.gmail_otp import marcar_buzon, obtener_otp
+from src.imap_otp import abrir_escucha
+
+
+# Botón de organización del nav superior: solo aparece con la sesión iniciada
+_NAV_ORGANIZACION = "[data-testid='lg-cloud_nav-top_nav-resource_nav-segment-button']"
+
+# Mensajes de error del formulario de login de Atlas
+_ERROR_LOGIN = re.compile(
+    r"invalid (username|email|password)|incorrect (username|email|password)|"
+    r"too many (failed )?(login )?attempts|verification failed|login failed",
+    re.IGNORECASE,
+)
+
+# Tiempo máximo para que Atlas pase a algún estado conocido tras cada acción del login
+_TIMEOUT_ESTADO_MS = 45_000
 
 
 # ── Helpers de humanización ────────────────────────────────────────────────────
 
-def _random_sleep(min_s: float = 0.8, max_s: float = 2.0) -> None:
-    """Pausa aleatoria que simula el tiempo de lectura/reflexión de un humano."""
-    time.sleep(random.uniform(min_s, max_s))
+# Perfiles de ritmo (PERFIL_TIEMPOS). Las esperas funcionales son siempre por
+# condición; el perfil solo controla el ritmo "humano" opcional:
+#   lectura:      pausa (s) antes de acciones que un humano haría tras leer la pantalla
+#   clic:         pausa (s) entre mover el mouse y hacer clic
+#   pasos_mouse:  segmentos del movimiento del mouse hasta el elemento
+#   tecleo_ms:    retardo entre teclas (0 = fill directo)
+#   notificacion: tiempo (s) para que Chrome pinte la burbuja de descarga antes de la
+#                 captura; vive fuera del DOM, así que no hay condición observable
+_PERFILES_TIEMPOS = {
+    "fast": {
+        "lectura": (0.0, 0.0),
+        "clic": (0.0, 0.0),
+        "pasos_mouse": (1, 2),
+        "tecleo_ms": 0,
+        "notificacion": 0.7,
+    },
+    "stealth": {
+        "lectura": (0.4, 1.2),
+        "clic": (0.02, 0.08),
+        "pasos_mouse": (4, 8),
+        "tecleo_ms": 40,
+        "notificacion": 1.5,
+    },
+}
+
+
+def _perfil() -> dict:
+    """Perfil configurado; uno desconocido se trata como stealth (el más conservador)."""
+    return _PERFILES_TIEMPOS.get(config.PERFIL_TIEMPOS, _PERFILES_TIEMPOS["stealth"])
+
+
+def _pausa(page: Page, tipo: str) -> None:
+    """Pausa aleatoria del perfil de ritmo (`lectura` o `clic`); 0 en el perfil fast."""
+    minimo, maximo = _perfil()[tipo]
+    if maximo > 0:
+        page.wait_for_timeout(random.uniform(minimo, maximo) * 1000)
+
+
+def _escribir(locator, texto: str) -> None:
+    """
+    Escribe `texto` en el input (fill o tecla a tecla según el perfil) y
+    espera a que el valor del campo coincida.
+    """
+    tecleo_ms = _perfil()["tecleo_ms"]
+    if tecleo_ms:
+        locator.fill("")
+        locator.press_sequentially(texto, delay=tecleo_ms)
+    else:
+        locator.fill(texto)
+    expect(locator).to_have_value(texto, timeout=2_000)
 
 
 def _fast_fill(page: Page, selector: str, text: str) -> None:
     """Rellena un campo instantáneamente. Anti-Captcha maneja la validación de bot."""
-    page.locator(selector).fill(text)
+    locator = page.locator(selector)
+    locator.fill(text)
+    expect(locator).to_have_value(text, timeout=5_000)
 
 
 def _human_click(page: Page, locator, scroll_first: bool = True) -> None:
@@ -41,7 +106,6 @@ def _human_click(page: Page, locator, scroll_first: bool = True) -> None:
     if scroll_first:
         try:
             locator.scroll_into_view_if_needed(timeout=3000)
-            page.wait_for_timeout(random.randint(60, 150))
         except Exception:
             pass
 
@@ -49,22 +113,47 @@ def _human_click(page: Page, locator, scroll_first: bool = True) -> None:
     if box:
         tx = box["x"] + box["width"] * random.uniform(0.3, 0.7)
         ty = box["y"] + box["height"] * random.uniform(0.3, 0.7)
-        page.mouse.move(tx, ty, steps=random.randint(4, 8))
-        page.wait_for_timeout(random.randint(20, 60))
+        page.mouse.move(tx, ty, steps=random.randint(*_perfil()["pasos_mouse"]))
+        _pausa(page, "clic")
         page.mouse.click(tx, ty)
     else:
         locator.click()
 
 
+def _esperar_estado(page: Page, estados: dict[str, Locator], timeout_ms: float) -> str | None:
+    """
+    Espera a la vez a todos los estados candidatos (un único Locator.or_) y
+    devuelve el nombre del primero visible, o None si no aparece ninguno en
+    `timeout_ms`. La latencia depende de lo que tarde Atlas, no de la suma
+    de timeouts de cada comprobación.
+    """
+    limite = time.monotonic() + timeout_ms / 1000
+    # Solo los elementos visibles: si el primero de un estado está oculto
+    # (plantilla, modal cerrado) no debe tapar a otro que sí se ve
+    visibles = {nombre: locator.locator("visible=true") for nombre, locator in estados.items()}
+    combinado = None
+    for locator in visibles.values():
+        combinado = locator if combinado is None else combinado.or_(locator)
+    while (restante := limite - time.monotonic()) > 0:
+        try:
+            combinado.first.wait_for(state="visible", timeout=restante * 1000)
+        except PlaywrightTimeoutError:
+            return None
+        for nombre, locator in visibles.items():
+            if locator.count():
+                return nombre
+        # El elemento desapareció entre la espera y la comprobación: se vuelve a esperar
+    return None
+
+
 # ── Paso 1: Login ──────────────────────────────────────────────────────────────
 
-def _hacer_login(page: Page, evidencias_dir: Path, logs_dir: Path) -> bool:
+def _rellenar_formulario(page: Page, captcha: ResolucionAnticipada, crono: timing.Cronometro) -> str:
     """
-    Intenta un ciclo completo de login con comportamiento humanizado.
-    Devuelve True si el login fue exitoso.
+    Carga la página de login, rellena email y contraseña con el hook de
+    reCAPTCHA instalado y devuelve el token para el action que usa la página.
     """
-    page.goto(config.MONGO_ATLAS_URL)
-    page.wait_for_load_state("domcontentloaded")
+    page.goto(config.MONGO_ATLAS_URL, wait_until="domcontentloaded")
 
     # Paso 1: Email
     print("  → Ingresando email...")
@@ -74,7 +163,6 @@ def _hacer_login(page: Page, evidencias_dir: Path, logs_dir: Path) -> bool:
     next_btn = page.locator("button:has-text('Next')")
     next_btn.wait_for(state="visible")
     _human_click(page, next_btn)
-    _random_sleep(0.5, 1.0)
 
     # Paso 2: Contraseña — inyectar hook ANTES de escribir para que esté listo
     print("  → Ingresando contraseña...")
@@ -107,19 +195,32 @@ def _hacer_login(page: Page, evidencias_dir: Path, logs_dir: Path) -> bool:
     print("  → Hook de grecaptcha.enterprise.execute instalado")
 
     _fast_fill(page, "#lg-passwordinput-1", config.MONGO_PASSWORD)
+    crono.marca("formulario")
 
     # Paso 3: Capturar el action real que usa la página (si execute ya fue llamado)
     detected_action = page.evaluate("() => window.__CAPTCHA_ACTION__ || null")
-    captcha_action = detected_action or "login"
+    captcha_action = detected_action or captcha.action
     print(f"  → pageAction detectado: {detected_action!r} (usando: {captcha_action!r})")
 
-    # Resolver reCAPTCHA Enterprise v3 con Anti-Captcha
-    print("  → Resolviendo reCAPTCHA Enterprise v3 (Anti-Captcha)...")
-    captcha_token = resolver_recaptcha(
-        page_url=config.MONGO_ATLAS_URL,
-        site_key=config.RECAPTCHA_SITE_KEY,
-        action=captcha_action,
-    )
+    # Token de reCAPTCHA Enterprise v3 resuelto en segundo plano desde el goto
+    return captcha.token(captcha_action)
+
+
+def _hacer_login(page: Page, evidencias_dir: Path, logs_dir: Path) -> bool:
+    """
+    Intenta un ciclo completo de login con comportamiento humanizado.
+    Devuelve True si el login fue exitoso.
+    """
+    # El captcha se resuelve mientras carga la página y se rellena el formulario
+    crono = timing.Cronometro("login")
+    captcha = ResolucionAnticipada(config.MONGO_ATLAS_URL, config.RECAPTCHA_SITE_KEY)
+    try:
+        captcha_token = _rellenar_formulario(page, captcha, crono)
+    finally:
+        # Si el intento falla antes de usar el token, la resolución en curso
+        # se abandona (tras obtenerlo, cancelar no hace nada)
+        captcha.cancelar()
+    crono.marca("espera captcha")
     print("  → Token obtenido, inyectando...")
 
     # Setear el token para que el hook de execute lo devuelva cuando Login haga submit
@@ -173,80 +274,94 @@ def _hacer_login(page: Page, evidencias_dir: Path, logs_dir: Path) -> bool:
     page.route("https://account.mongodb.com/**", _swap_captcha_token)
 
     # Paso 4: Click en Login
-    _random_sleep(0.2, 0.4)
+    _pausa(page, "lectura")
     print("  → Haciendo clic en Login...")
     login_btn = page.locator("button:has-text('Login')")
     login_btn.wait_for(state="visible")
     _human_click(page, login_btn)
 
-    try:
-        login_btn.wait_for(state="hidden", timeout=20_000)
-        print("  → Formulario procesado")
-    except Exception:
-        print("  → Botón Login aún visible, continuando de todas formas...")
+    # Paso 5: Esperar en paralelo a todos los estados posibles tras el envío
+    estados = {
+        "mfa": page.locator("button:has-text('Send Code')"),
+        "snooze": page.locator("button[name='snooze']"),
+        "dashboard": page.locator(_NAV_ORGANIZACION),
+        "error": page.get_by_text(_ERROR_LOGIN),
+    }
+    hook_activo = True
+    while True:
+        estado = _esperar_estado(page, estados, _TIMEOUT_ESTADO_MS)
+        if hook_activo:
+            # Limpiar hook e interceptor en cuanto Atlas respondió al formulario
+            page.evaluate("() => { clearInterval(window.__patchInterval); }")
+            try:
+                page.unroute("https://account.mongodb.com/**", _swap_captcha_token)
+            except Exception:
+                pass
+            hook_activo = False
+            crono.marca("envío formulario")
+
+        if estado == "dashboard":
+            print("  → Dashboard de Atlas visible: login correcto")
+            crono.marca("dashboard")
+            return True
+
+        if estado == "mfa":
+            _completar_mfa(page)
+            crono.marca("MFA")
+            # Tras el OTP la pantalla de MFA ya no es un estado válido
+            del estados["mfa"]
+            continue
+
+        if estado == "snooze":
+            print("  → Pantalla 'Set up another MFA method' detectada. Haciendo clic en 'Remind me later'...")
+            remind_btn = estados.pop("snooze")
+            _human_click(page, remind_btn)
+            remind_btn.wait_for(state="hidden")
+            continue
+
+        if estado == "error":
+            print(f"  ✗ Atlas rechazó el login: {estados['error'].first.inner_text().strip()!r}")
+        else:
+            print(f"  ✗ Ningún estado esperado apareció en {_TIMEOUT_ESTADO_MS // 1000}s")
+        capturar(evidencias_dir, "01_login_fallido", page)
+        return False
 
-    # Limpiar hook e interceptor
-    page.evaluate("() => { clearInterval(window.__patchInterval); }")
-    try:
-        page.unroute("https://account.mongodb.com/**", _swap_captcha_token)
-    except Exception:
-        pass
 
-    _random_sleep(0.4, 0.8)
+def _completar_mfa(page: Page) -> None:
+    """Pulsa "Send Code", espera el OTP por correo y lo rellena."""
+    print("  → Pantalla MFA detectada. Enviando código...")
 
-    # Paso 5: MFA opcional
-    print("  → Verificando si aparece pantalla de MFA...")
-    mfa_detectado = False
-    try:
-        page.wait_for_selector("button:has-text('Send Code')", timeout=8000)
-        mfa_detectado = True
-    except Exception:
-        print("  → Sin pantalla MFA, continuando...")
-
-    if mfa_detectado:
-        print("  → Pantalla MFA detectada. Enviando código...")
-
-        send_btn = page.locator("button:has-text('Send Code')")
-        send_ts = time.time()
-        _human_click(page, send_btn)
-        print(f"  → Código solicitado. Timestamp de envío: {send_ts:.3f}")
-
-        # Cualquier excepción aquí (incluido TimeoutError del correo) es un
-        # error real dentro del flujo MFA — NO debe silenciarse.
-        otp = obtener_otp(timeout_seg=config.OTP_TIMEOUT_SEG, after_ts=send_ts)
-
-        print(f"  → Rellenando OTP: {otp}")
-        inputs = page.query_selector_all("[data-testid='autoAdvanceInput']")
-        print(f"  → Inputs OTP encontrados: {len(inputs)}")
-        for i, digito in enumerate(otp):
-            inputs[i].click()
-            inputs[i].type(digito)
-            page.wait_for_timeout(50)
-
-        print("  → OTP ingresado, esperando redirección...")
-        _random_sleep(1.0, 2.0)
-
-    # Paso 5b: Descartar popup "Set up another MFA method" si aparece
-    try:
-        remind_btn = page.locator("button[name='snooze']")
-        remind_btn.wait_for(state="visible", timeout=5_000)
-        print("  → Pantalla 'Set up another MFA method' detectada. Haciendo clic en 'Remind me later'...")
-        _human_click(page, remind_btn)
-        _random_sleep(0.5, 1.0)
-    except Exception:
-        pass
-
-    # Paso 6: Validar login buscando el botón de organización en el nav
-    print("  → Validando login exitoso...")
-    try:
-        page.wait_for_selector(
-            "[data-testid='lg-cloud_nav-top_nav-resource_nav-segment-button']",
-            timeout=15_000,
-        )
-        return True
-    except Exception:
-        capturar(evidencias_dir, "01_login_fallido", page)
-        return False
+    send_btn = page.locator("button:has-text('Send Code')")
+    # La escucha IMAP o la marca del buzón se preparan antes del envío:
+    # solo se leerán los correos posteriores
+    escucha = abrir_escucha()
+    history_id = marcar_buzon() if escucha is None else None
+    send_ts = time.time()
+    _human_click(page, send_btn)
+    print(f"  → Código solicitado. Timestamp de envío: {send_ts:.3f}")
+
+    # Cualquier excepción aquí (incluido TimeoutError del correo) es un
+    # error real dentro del flujo MFA — NO debe silenciarse.
+    otp = None
+    if escucha is not None:
+        try:
+            otp = escucha.esperar_otp(config.OTP_TIMEOUT_SEG, after_ts=send_ts)
+        except TimeoutError:
+            raise
+        except Exception as e:
+            print(f"  [aviso] Falló la escucha IMAP, se usa la API de Gmail: {e}")
+        finally:
+            escucha.cerrar()
+    if otp is None:
+        otp = obtener_otp(timeout_seg=config.OTP_TIMEOUT_SEG, after_ts=send_ts, history_id=history_id)
+
+    print(f"  → Rellenando OTP: {otp}")
+    inputs = page.locator("[data-testid='autoAdvanceInput']")
+    print(f"  → Inputs OTP encontrados: {inputs.count()}")
+    for i, digito in enumerate(otp):
+        _escribir(inputs.nth(i), digito)
+
+    print("  → OTP ingresado, esperando redirección...")
 
 
 def _hacer_login_google(page: Page, evidencias_dir: Path, logs_dir: Path) -> bool:
@@ -254,39 +369,44 @@ def _hacer_login_google(page: Page, evidencias_dir: Path, logs_dir: Path) -> boo
     Login via SSO de Google: navega a Atlas, pulsa el botón de Google
     y espera la redirección al dashboard (la sesión de Chrome ya está activa).
     """
-    page.goto(config.MONGO_ATLAS_URL)
+    page.goto(config.MONGO_ATLAS_URL, wait_until="domcontentloaded")
 
     print("  → Buscando botón de Google...")
-    google_btn = None
-    for i in range(6):  # hasta ~30s
-        try:
-            google_btn = page.wait_for_selector("button[data-lgid='lg-button']:has-text('Google')", timeout=5000)
-            break
-        except Exception:
-            page.wait_for_timeout(1000)
-    if not google_btn:
+    google_btn = page.locator("button[data-lgid='lg-button']:has-text('Google')")
+    dashboard = page.locator(_NAV_ORGANIZACION)
+    estado = _esperar_estado(page, {"google": google_btn, "dashboard": dashboard}, 30_000)
+    if estado == "dashboard":
+        print("  → Atlas redirigió directamente al dashboard")
+        return True
+    if estado is None:
         capturar(evidencias_dir, "01_login_google_no_encontrado", page)
         return False
-    google_btn.click()
+    google_btn.first.click()
 
     print("  → Esperando redirección al dashboard...")
-    try:
-        page.wait_for_url("**/cloud.mongodb.com/**", timeout=config.PAGE_TIMEOUT)
+    estados = {"dashboard": dashboard, "error": page.get_by_text(_ERROR_LOGIN)}
+    if _esperar_estado(page, estados, config.PAGE_TIMEOUT) == "dashboard":
         return True
-    except Exception:
-        pass
+    capturar(evidencias_dir, "01_login_google_fallido", page)
+    return False
+
+
+def _sesion_valida(page: Page) -> bool:
+    """
+    Abre Atlas con la sesión cargada y comprueba si aparece el nav del
+    dashboard (sesión viva) o el formulario de login (sesión caducada).
+    """
+    print("  → Comprobando si la sesión guardada sigue activa...")
     try:
-        page.wait_for_selector(
-            "[data-testid='lg-cloud_nav-top_nav-resource_nav-segment-button']",
-            timeout=10000,
-        )
-        return True
-    except Exception:
-        capturar(evidencias_dir, "01_login_google_fallido", page)
+        page.goto(config.MONGO_ATLAS_URL)
+        estados = {"dashboard": page.locator(_NAV_ORGANIZACION), "login": page.locator("#username")}
+        return _esperar_estado(page, estados, 15_000) == "dashboard"
+    except Exception as e:
+        print(f"  → No se pudo validar la sesión guardada: {e}")
         return False
 
 
-def login(page: Page, evidencias_dir: Path, logs_dir: Path, max_reintentos: int = 2) -> Page:
+def login(page: Page, evidencias_dir: Path, logs_dir: Path, max_reintentos: int | None = None) -> Page:
     """
     Navega a MongoDB Atlas e inicia sesión. Si el login falla, reintenta.
     
@@ -296,14 +416,25 @@ def login(page: Page, evidencias_dir: Path, logs_dir: Path, max_reintentos: int
     3. MFA: Send Code → leer OTP del correo → rellenar 6 dígitos
     4. Validar presencia del botón de organización en el nav
     5. Si falla: captura evidencia y reintenta hasta max_reintentos
+       (ATLAS_LOGIN_REINTENTOS por defecto) en un contexto nuevo del mismo navegador
     """
     print("[1/N] Accediendo a MongoDB Atlas...")
+    max_reintentos = max_reintentos or config.ATLAS_LOGIN_REINTENTOS
+
+    if config.ATLAS_SESION_REUTILIZAR and browser.sesion_cargada():
+        reutilizada = _sesion_valida(page)
+        print(f"  [sesión] {session_store.registrar_uso(reutilizada)}")
+        if reutilizada:
+            print("  ✓ Sesión anterior aún válida: se omite el login")
+            return page
+        # Las cookies caducadas siguen en el contexto: el login parte de uno limpio
+        session_store.descartar()
+        page = browser.reciclar_contexto()
 
     for intento in range(1, max_reintentos + 1):
         if intento > 1:
-            print(f"  → Reintento {intento}/{max_reintentos} con navegador nuevo...")
-            browser.close()
-            page = browser.launch()
+            print(f"  → Reintento {intento}/{max_reintentos} con contexto nuevo...")
+            page = browser.reciclar_contexto()
 
         if config.USE_GOOGLE_LOGIN:
             exito = _hacer_login_google(page, evidencias_dir, logs_dir)
@@ -312,6 +443,7 @@ def login(page: Page, evidencias_dir: Path, logs_dir: Path, max_reintentos: int
 
         if exito:
             print("  ✓ Login completado")
+            session_store.guardar(page.context)
             return page
 
         print(f"  ✗ Login fallido en intento {intento}.")
@@ -323,45 +455,91 @@ def login(page: Page, evidencias_dir: Path, logs_dir: Path, max_reintentos: int
 
 # ── Paso 2: Navegar al cluster ─────────────────────────────────────────────────
 
-def ir_al_cluster(page: Page, evidencias_dir: Path) -> None:
-    """
-    Desde el dashboard:
-    1. Cambia a la organización Interseguro
-    2. Entra al proyecto PortalSistemas
-    3. Navega a Clusters en el menú lateral
-    4. Localiza el cluster vis-data-prd
-    5. Abre el menú ... y hace clic en Download Logs
-    """
-    print("[2/N] Cambiando a organización Interseguro...")
-
-    page.click("[data-testid='lg-cloud_nav-top_nav-resource_nav-segment-button']")
+def _ir_por_clics(page: Page, crono: timing.Cronometro) -> None:
+    """Organización Interseguro → proyecto PortalSistemas → Clusters en el menú lateral."""
+    print("  → Cambiando a organización Interseguro...")
+    # Cada paso espera a que aparezca el elemento del siguiente, no a la carga de la página
+    proyecto_link = page.locator(f"a[href*='{config.ATLAS_PROJECT_ID}']").first
+    page.click(_NAV_ORGANIZACION)
     page.click("a[aria-label='Interseguro']")
-    page.wait_for_load_state("domcontentloaded")
+    proyecto_link.wait_for(state="visible")
     print("  ✓ Organización Interseguro seleccionada")
+    crono.marca("organización")
 
     print("  → Entrando al proyecto PortalSistemas...")
-    page.click("a[href*='66ba761f5acbaa376da8f5b3']")
-    page.wait_for_load_state("domcontentloaded")
+    clusters_nav = page.locator("[data-testid='lg-cloud_nav-side_nav-clusters']")
+    proyecto_link.click()
+    clusters_nav.wait_for(state="visible")
     print("  ✓ Proyecto PortalSistemas abierto")
+    crono.marca("proyecto")
 
     print("  → Navegando a Clusters...")
-    page.click("[data-testid='lg-cloud_nav-side_nav-clusters']")
-    page.wait_for_load_state("domcontentloaded")
+    clusters_nav.click()
+    print("  ✓ Sección Clusters abierta")
+
+
+def _ir_por_enlace(page: Page) -> None:
+    """
+    Abre directamente la lista de clusters del proyecto (ATLAS_CLUSTERS_URL);
+    Atlas cambia de organización solo al abrir un proyecto de otra.
+    """
+    url = config.ATLAS_CLUSTERS_URL.format(project_id=config.ATLAS_PROJECT_ID)
+    print(f"  → Abriendo lista de clusters por enlace directo: {url}")
+    page.goto(url, wait_until="domcontentloaded")
+    page.locator(_selector_cluster()).first.wait_for(state="visible", timeout=20_000)
     print("  ✓ Sección Clusters abierta")
 
-    print("  → Localizando cluster vis-data-prd...")
+
+def _selector_cluster() -> str:
+    return f"[data-testid='cluster-name-detail-link'][href*='{config.CLUSTER_NAME}']"
+
+
+def ir_al_cluster(page: Page, evidencias_dir: Path) -> str:
+    """
+    Desde el dashboard llega al modal Download Logs del cluster:
+    1. Abre la lista de clusters del proyecto PortalSistemas: por enlace
+       directo (ATLAS_NAVEGACION=enlace) o, si falla o está desactivado,
+       por clics (organización → proyecto → Clusters)
+    2. Localiza el cluster vis-data-prd
+    3. Abre el menú ... y hace clic en Download Logs
+
+    Returns:
+        Ruta usada: "enlace" o "clics".
+    """
+    print("[2/N] Navegando al cluster...")
+    crono = timing.Cronometro("ir_al_cluster")
+    inicio = time.perf_counter()
+
+    ruta = "clics"
+    if config.ATLAS_NAVEGACION == "enlace":
+        try:
+            _ir_por_enlace(page)
+            ruta = "enlace"
+            crono.marca("enlace directo")
+        except Exception as e:
+            print(f"  [aviso] Falló la navegación por enlace directo ({e}); se navega por clics")
+            crono.marca("enlace directo (fallido)")
+    if ruta == "clics":
+        _ir_por_clics(page, crono)
+
+    print(f"  → Localizando cluster {config.CLUSTER_NAME}...")
     cluster_row = page.locator(
-        "css=[data-testid='cluster-name-detail-link'][href*='vis-data-prd']"
+        f"css={_selector_cluster()}"
         " >> xpath=ancestor::div[contains(@class,'e15qq9hb5')]"
     ).first
     dropdown_btn = cluster_row.locator("[data-testid='Dropdown_toggleButton']").first
     dropdown_btn.click()
     print("  ✓ Menú del cluster abierto")
+    crono.marca("lista de clusters")
 
     print("  → Haciendo clic en Download Logs...")
     page.click("a.dropdown-component-link:has-text('Download Logs')")
-    page.wait_for_load_state("domcontentloaded")
+    page.locator("select[name='processes']").wait_for(state="visible")
     print("  ✓ Sección Download Logs abierta")
+    crono.marca("modal Download Logs")
+
+    print(f"  ✓ Navegación por {ruta} completada en {time.perf_counter() - inicio:.1f}s")
+    return ruta
 
 
 # ── Paso 3: Ir a la sección de descarga de logs (fusionado en ir_al_cluster) ───
@@ -374,7 +552,7 @@ def ir_a_logs(page: Page, evidencias_dir: Path) -> None:
     pass
 
 
-# ── Paso 4: Configurar filtro de fechas y descargar ────────────────────────────
+# ── Pasos 4 y 6: Configurar filtro de fechas y descargar ──────────────────────
 
 # Mapeo tipo_log → valor del <select name="processes">
 _PROCESS_VALUE = {
@@ -389,23 +567,21 @@ _DATE_FMT = "%a %b %d %Y"
 def _set_date_input(page: Page, selector: str, valor: str) -> None:
     """
     Escribe en un input de fecha del modal.
-    1. Click en el campo para enfocarlo.
-    2. Ctrl+A + Delete para limpiar.
-    3. type() carácter a carácter.
-    4. Si queda vacío, JS fallback.
-    5. NO presiona Tab (lo borra en este datepicker); confirma con Escape.
+    1. Escribe el valor (fill o tecla a tecla según el perfil) y espera a que
+       el campo lo muestre.
+    2. Si el datepicker lo reformatea se acepta; si lo deja vacío, JS fallback
+       y se espera a que el campo tenga valor.
+    3. NO presiona Tab (lo borra en este datepicker); confirma con Escape.
     """
     inp = page.locator(selector)
     inp.click()
-    page.wait_for_timeout(200)
-    page.keyboard.press("Control+a")
-    page.keyboard.press("Delete")
-    page.wait_for_timeout(100)
-    inp.type(valor)
-    page.wait_for_timeout(200)
-
-    actual = inp.input_value()
-    if not actual:
+    try:
+        _escribir(inp, valor)
+    except AssertionError:
+        if inp.input_value():
+            print(f"  → El datepicker reformateó la fecha: {inp.input_value()!r}")
+            page.keyboard.press("Escape")
+            return
         page.evaluate(
             """([sel, val]) => {
                 const el = document.querySelector(sel);
@@ -419,39 +595,82 @@ def _set_date_input(page: Page, selector: str, valor: str) -> None:
             }""",
             [selector, valor],
         )
-        page.wait_for_timeout(100)
+        expect(inp).not_to_have_value("", timeout=5_000)
 
     page.keyboard.press("Escape")
-    page.wait_for_timeout(100)
+
+
+def _patron_hora(valor: str) -> re.Pattern:
+    """
+    Patrón que acepta `valor` ("12:00am", "11:30pm", "9:30") tal como lo
+    reformatea el time picker: mayúsculas, espacio antes de AM/PM, cero inicial.
+    """
+    m = re.fullmatch(r"\s*(\d{1,2}):(\d{2})\s*([ap]m)?\s*", valor, re.IGNORECASE)
+    if not m:
+        return re.compile(rf"^\s*{re.escape(valor.strip())}\s*$", re.IGNORECASE)
+    hora, minutos, sufijo = m.groups()
+    return re.compile(rf"^\s*0?{int(hora)}:{minutos}\s*{sufijo or ''}\s*$", re.IGNORECASE)
 
 
 def _set_time_input(page: Page, container_selector: str, valor: str) -> None:
-    """Limpia y escribe en un input de hora del modal."""
+    """
+    Limpia y escribe en un input de hora del modal. Si el time picker
+    reformatea el valor ("12:00am" → "12:00 AM") se acepta mientras sea la
+    misma hora.
+    """
     inp = page.locator(f"{container_selector} [data-testid='time-picker-input']")
     inp.click()
-    inp.fill("")
-    inp.type(valor)
+    try:
+        _escribir(inp, valor)
+    except AssertionError:
+        expect(inp).to_have_value(_patron_hora(valor), timeout=2_000)
+        print(f"  → El time picker reformateó la hora: {inp.input_value()!r}")
     inp.press("Enter")
 
 
+def _descargar_por_http(page: Page, proceso: str, start: date, end: date, carpeta: Path) -> Path | None:
+    """
+    Descarga el log directamente por HTTP con las cookies de la sesión
+    (ATLAS_DESCARGA_HTTP). Devuelve None si falla, para usar el modal.
+    """
+    url = log_download.url_log(config.LOG_SERVER, proceso, start, end)
+    print(f"  → Descargando por HTTP con la sesión del navegador: {url}")
+    try:
+        return log_download.descargar_con_sesion(
+            page.context,
+            page.evaluate("() => navigator.userAgent"),
+            url,
+            carpeta,
+            log_download.nombre_log(config.LOG_SERVER, proceso),
+        )
+    except Exception as e:
+        print(f"  [aviso] Falló la descarga HTTP ({e}); se descarga desde el modal")
+        return None
+
+
 def descargar_log(
     page: Page,
     evidencias_dir: Path,
     tipo_log: str,
     start: date,
     end: date,
+    paso: int = 4,
 ) -> list[Path]:
     """
     En el modal Download Logs:
     1. Selecciona el proceso (audit o general)
     2. Selecciona Custom Time
     3. Ingresa fecha/hora de inicio (12:00am) y fin (11:30pm)
-    4. Hace clic en Download Logs
+    4. Hace clic en Download Logs, o con ATLAS_DESCARGA_HTTP descarga el mismo
+       rango por HTTP con la sesión (el modal se rellena igual para la evidencia;
+       la captura 05 muestra entonces el archivo en Descargas, sin notificación
+       de Chrome)
 
     Args:
         tipo_log: "audit" o "general"
         start:    Fecha de inicio del rango.
         end:      Fecha de fin del rango.
+        paso:     Número de paso de main.py para el log (4 audit, 6 general).
     
     Returns:
         Lista de Paths de las capturas generadas (para usar en IPE).
@@ -460,7 +679,8 @@ def descargar_log(
     if process_value is None:
         raise ValueError(f"tipo_log inválido: {tipo_log!r}. Usa 'audit' o 'general'.")
 
-    print(f"[4/N] Descargando {tipo_log} log ({start} → {end})...")
+    print(f"[{paso}/N] Descargando {tipo_log} log ({start} → {end})...")
+    crono = timing.Cronometro(f"descarga {tipo_log}")
 
     # 1. Seleccionar proceso
     print(f"  → Seleccionando proceso: {process_value}...")
@@ -486,15 +706,9 @@ def descargar_log(
     _set_date_input(page, "input[name='endDate']", end_str)
     _set_time_input(page, ".js-end-time-container", "11:30pm")
 
+    crono.marca("filtros")
     cap1 = capturar(evidencias_dir, f"04_filtro_{tipo_log}_log", page)
 
-    # 5. Descargar
-    print("  → Haciendo clic en Download Logs...")
-    with page.expect_download() as dl_info:
-        page.click("button[data-testid='download-logs-modal']")
-
-    descarga = dl_info.value
-    nombre = descarga.suggested_filename
     # Obtener la carpeta Descargas real de Windows (independiente del idioma).
     # FOLDERID_Downloads GUID: {374DE290-123F-4565-9164-39C4925E467B}
     _guid = struct.pack("<IHH8s", 0x374DE290, 0x123F, 0x4565,
@@ -503,13 +717,38 @@ def descargar_log(
     ctypes.windll.shell32.SHGetKnownFolderPath(_guid, 0, None, ctypes.byref(_buf))
     downloads_win = Path(_buf.value) if _buf.value else Path.home() / "Downloads"
     downloads_win.mkdir(parents=True, exist_ok=True)
-    tmp_path = downloads_win / nombre
-    descarga.save_as(str(tmp_path))
-    print(f"  ✓ Descarga guardada: {tmp_path}")
 
-    # Captura post-descarga con la notificación de Chrome visible
-    time.sleep(1.5)
-    cap2 = capturar(evidencias_dir, f"05_descarga_completada_{tipo_log}_log", page)
+    # 5. Descargar: por HTTP con la sesión del navegador o, si no, desde el modal
+    capturas = [cap1]
+    tmp_path = None
+    if config.ATLAS_DESCARGA_HTTP:
+        tmp_path = _descargar_por_http(page, process_value, start, end, downloads_win)
+    if tmp_path is not None:
+        crono.marca("descarga HTTP")
+        # Sin clic en el modal no hay notificación de Chrome: la captura 05
+        # muestra el archivo descargado en Descargas, así el IPE sigue teniendo
+        # sus tres imágenes
+        capturas.append(capturar_archivo_descargado(
+            evidencias_dir, tmp_path, f"05_descarga_completada_{tipo_log}_log"
+        ))
+    else:
+        print("  → Haciendo clic en Download Logs...")
+        with page.expect_download() as dl_info:
+            page.click("button[data-testid='download-logs-modal']")
+
+        descarga = dl_info.value
+        # La URL real sirve para contrastar ATLAS_LOG_URL antes de usar la descarga HTTP
+        print(f"  → URL de la descarga del modal: {descarga.url}")
+        tmp_path = downloads_win / descarga.suggested_filename
+        descarga.save_as(str(tmp_path))
+        print(f"  ✓ Descarga guardada: {tmp_path}")
+        crono.marca("descarga")
+
+        # Captura post-descarga con la notificación de Chrome visible. save_as ya
+        # esperó a que la descarga terminara; la burbuja de Chrome no está en el
+        # DOM, así que solo queda darle al navegador tiempo de pintarla.
+        page.wait_for_timeout(_perfil()["notificacion"] * 1000)
+        capturas.append(capturar(evidencias_dir, f"05_descarga_completada_{tipo_log}_log", page))
 
     # Captura de Propiedades mostrando la ruta de Descargas de Windows
     capturar_propiedades_archivo(evidencias_dir, tmp_path, f"06_{tipo_log}_log")
@@ -517,11 +756,13 @@ def descargar_log(
     if not cap3.exists():
         # Buscar el archivo más reciente que coincida con el patrón
         capturas_props = sorted(evidencias_dir.glob(f"*_06_{tipo_log}_log_propiedades_archivo.png"))
-        cap3 = capturas_props[-1] if capturas_props else cap2
+        cap3 = capturas_props[-1] if capturas_props else capturas[-1]
+    capturas.append(cap3)
 
     # Mover el archivo a la carpeta de resultados
-    destino = evidencias_dir / nombre
+    destino = evidencias_dir / tmp_path.name
     shutil.move(str(tmp_path), str(destino))
     print(f"  ✓ Archivo movido a: {destino}")
+    crono.marca("evidencias")
     
-    return [cap1, cap2, cap3]
+    return capturas
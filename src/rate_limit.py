@@ -0,0 +1,196 @@
+"""
+Control de cuota para las llamadas a Google Drive.
+
+Combina un token bucket adaptativo (baja la tasa a la mitad ante un error de
+cuota y la recupera poco a poco con cada éxito) con reintentos con backoff
+exponencial y jitter completo, con un presupuesto de reintentos distinto por
+clase de error:
+
+    cuota     403 userRateLimitExceeded / rateLimitExceeded, 429
+    servidor  500, 502, 503, 504
+    red       timeouts, conexiones cortadas, errores TLS
+
+Cualquier otro error (404, 400, permisos...) se propaga sin reintentar.
+"""
+from collections import Counter
+from typing import Callable, TypeVar
+import json
+import random
+import socket
+import ssl
+import threading
+import time
+
+import httplib2
+from googleapiclient.errors import HttpError
+
+import config
+
+T = TypeVar("T")
+
+_RAZONES_CUOTA = {"userRateLimitExceeded", "rateLimitExceeded"}
+_ESTADOS_SERVIDOR = {500, 502, 503, 504}
+
+
+def _razon_http(error: HttpError) -> str:
+    """Extrae el campo `reason` del cuerpo JSON de un HttpError de Google."""
+    try:
+        cuerpo = json.loads(error.content.decode("utf-8") if isinstance(error.content, bytes) else error.content)
+        errores = cuerpo.get("error", {}).get("errors", [])
+        return errores[0].get("reason", "") if errores else ""
+    except (ValueError, AttributeError):
+        return ""
+
+
+def clasificar_error(error: Exception) -> str | None:
+    """Devuelve 'cuota', 'servidor', 'red' o None si el error no es reintentable."""
+    if isinstance(error, HttpError):
+        estado = error.resp.status
+        if estado == 429 or (estado == 403 and _razon_http(error) in _RAZONES_CUOTA):
+            return "cuota"
+        if estado in _ESTADOS_SERVIDOR:
+            return "servidor"
+        return None
+    if isinstance(error, (socket.timeout, TimeoutError, ConnectionError, ssl.SSLError, httplib2.HttpLib2Error)):
+        return "red"
+    return None
+
+
+class ControlCuota:
+    """Token bucket adaptativo + reintentos con backoff, compartido entre hilos."""
+
+    def __init__(
+        self,
+        nombre: str,
+        tasa_max: float,
+        rafaga: int,
+        presupuestos: dict[str, int],
+        espera_base: float = 1.0,
+        espera_max: float = 64.0,
+    ):
+        self.nombre = nombre
+        self._tasa_max = max(0.1, tasa_max)
+        self._tasa_min = min(0.5, self._tasa_max)
+        self._tasa = self._tasa_max
+        self._rafaga = max(1, rafaga)
+        self._tokens = float(self._rafaga)
+        self._ultimo = time.monotonic()
+        self._presupuestos = presupuestos
+        self._espera_base = espera_base
+        self._espera_max = espera_max
+
+        self._lock = threading.Lock()
+        self._inicio: float | None = None
+        self._peticiones = 0
+        self._reintentos: Counter[str] = Counter()
+        self._agotados: Counter[str] = Counter()
+
+    def adquirir(self) -> None:
+        """Bloquea hasta que haya un token disponible para enviar una petición."""
+        while True:
+            with self._lock:
+                ahora = time.monotonic()
+                if self._inicio is None:
+                    self._inicio = ahora
+                self._tokens = min(self._rafaga, self._tokens + (ahora - self._ultimo) * self._tasa)
+                self._ultimo = ahora
+                if self._tokens >= 1:
+                    self._tokens -= 1
+                    self._peticiones += 1
+                    return
+                espera = (1 - self._tokens) / self._tasa
+            time.sleep(espera)
+
+    def registrar_exito(self) -> None:
+        """Incremento aditivo de la tasa tras una petición correcta."""
+        with self._lock:
+            self._tasa = min(self._tasa_max, self._tasa + self._tasa_max * 0.05)
+
+    def esperar_reintento(self, clase: str, intento: int, error: Exception | None = None) -> bool:
+        """
+        Duerme el backoff correspondiente al `intento`-ésimo reintento de `clase`.
+
+        Returns:
+            False si se agotó el presupuesto de esa clase (no hay que reintentar).
+        """
+        with self._lock:
+            if intento > self._presupuestos.get(clase, 0):
+                self._agotados[clase] += 1
+                return False
+            self._reintentos[clase] += 1
+            if clase == "cuota":
+                # Decremento multiplicativo: la cuota es por usuario y compartida entre hilos
+                self._tasa = max(self._tasa_min, self._tasa / 2)
+                self._tokens = min(self._tokens, 0.0)
+
+        espera = random.uniform(0, min(self._espera_max, self._espera_base * 2 ** (intento - 1)))
+        if isinstance(error, HttpError):
+            retry_after = error.resp.get("retry-after")
+            if retry_after and retry_after.isdigit():
+                espera = max(espera, float(retry_after))
+        print(f"    [{self.nombre}] Error de {clase} ({error}); reintento {intento} en {espera:.1f}s")
+        time.sleep(espera)
+        return True
+
+    def ejecutar(self, fn: Callable[[], T], al_reintentar: Callable[[], None] | None = None) -> T:
+        """
+        Ejecuta `fn` respetando la tasa y reintentando los errores transitorios.
+
+        Args:
+            fn:            Llamada a ejecutar (ej: request.execute)
+            al_reintentar: Acción opcional antes de cada reintento (ej: resincronizar
+                           el offset de una subida reanudable)
+        """
+        intentos: Counter[str] = Counter()
+        while True:
+            self.adquirir()
+            try:
+                resultado = fn()
+            except Exception as e:
+                clase = clasificar_error(e)
+                if clase is None:
+                    raise
+                intentos[clase] += 1
+                if not self.esperar_reintento(clase, intentos[clase], e):
+                    raise
+                if al_reintentar is not None:
+                    al_reintentar()
+                continue
+            self.registrar_exito()
+            return resultado
+
+    def resumen(self) -> str:
+        """Peticiones, tasa efectiva y contadores de reintentos para el log."""
+        with self._lock:
+            duracion = time.monotonic() - self._inicio if self._inicio else 0.0
+            tasa_real = self._peticiones / duracion if duracion > 0 else 0.0
+            reintentos = ", ".join(f"{c}={n}" for c, n in sorted(self._reintentos.items())) or "ninguno"
+            texto = (
+                f"{self._peticiones} petición(es) HTTP, {tasa_real:.1f} req/s efectivas "
+                f"(límite actual {self._tasa:.1f} req/s), reintentos: {reintentos}"
+            )
+            if self._agotados:
+                texto += ", agotados: " + ", ".join(f"{c}={n}" for c, n in sorted(self._agotados.items()))
+            return texto
+
+
+_control_drive: ControlCuota | None = None
+_control_lock = threading.Lock()
+
+
+def control_drive() -> ControlCuota:
+    """Instancia compartida del control de cuota para todas las llamadas a Drive."""
+    global _control_drive
+    with _control_lock:
+        if _control_drive is None:
+            _control_drive = ControlCuota(
+                "drive",
+                tasa_max=config.DRIVE_MAX_RPS,
+                rafaga=config.DRIVE_RAFAGA,
+                presupuestos={
+                    "cuota": config.DRIVE_REINTENTOS_CUOTA,
+                    "servidor": config.DRIVE_REINTENTOS_SERVIDOR,
+                    "red": config.DRIVE_REINTENTOS_RED,
+                },
+            )
+        return _control_drive
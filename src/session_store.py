@@ -0,0 +1,133 @@
+"""
+Sesión autenticada de MongoDB Atlas reutilizable entre ejecuciones.
+
+Tras cada login correcto se guarda el storage_state de Playwright (cookies y
+localStorage) cifrado con DPAPI de Windows (CryptProtectData, ligado al
+usuario de Windows que ejecuta el bot). La siguiente ejecución lo carga en
+el contexto del navegador y, si la sesión sigue viva, se salta el login
+completo (captcha, MFA y popup de snooze).
+
+También lleva la cuenta de cuántas ejecuciones reutilizaron la sesión.
+"""
+from ctypes import wintypes
+from pathlib import Path
+import ctypes
+import json
+import os
+import time
+
+import config
+from src.locks import escribir_atomico
+
+# Entropía adicional: otro programa del mismo usuario no puede descifrar sin ella
+_ENTROPIA = b"BotExtraccionMongo/atlas-sesion"
+_CRYPTPROTECT_UI_FORBIDDEN = 0x1
+
+
+class _DataBlob(ctypes.Structure):
+    _fields_ = [("cbData", wintypes.DWORD), ("pbData", ctypes.POINTER(ctypes.c_char))]
+
+
+def _blob(datos: bytes) -> tuple[_DataBlob, ctypes.Array]:
+    buffer = ctypes.create_string_buffer(datos, len(datos))
+    return _DataBlob(len(datos), ctypes.cast(buffer, ctypes.POINTER(ctypes.c_char))), buffer
+
+
+def _dpapi(datos: bytes, cifrar: bool) -> bytes:
+    """CryptProtectData / CryptUnprotectData sobre `datos`."""
+    crypt32 = ctypes.windll.crypt32
+    entrada, _buf_entrada = _blob(datos)
+    entropia, _buf_entropia = _blob(_ENTROPIA)
+    salida = _DataBlob()
+    if cifrar:
+        ok = crypt32.CryptProtectData(
+            ctypes.byref(entrada), "atlas-sesion", ctypes.byref(entropia),
+            None, None, _CRYPTPROTECT_UI_FORBIDDEN, ctypes.byref(salida),
+        )
+    else:
+        ok = crypt32.CryptUnprotectData(
+            ctypes.byref(entrada), None, ctypes.byref(entropia),
+            None, None, _CRYPTPROTECT_UI_FORBIDDEN, ctypes.byref(salida),
+        )
+    if not ok:
+        raise ctypes.WinError()
+    try:
+        return ctypes.string_at(salida.pbData, salida.cbData)
+    finally:
+        ctypes.windll.kernel32.LocalFree(salida.pbData)
+
+
+def _disponible() -> bool:
+    """La sesión solo se persiste cifrada; sin DPAPI (fuera de Windows) no se guarda."""
+    return config.ATLAS_SESION_REUTILIZAR and os.name == "nt"
+
+
+def cargar() -> dict | None:
+    """
+    Devuelve el storage_state guardado, o None si no hay, caducó
+    (ATLAS_SESION_MAX_HORAS) o no se puede descifrar.
+    """
+    if not _disponible():
+        return None
+    path = config.ATLAS_SESION_PATH
+    try:
+        edad_h = (time.time() - path.stat().st_mtime) / 3600
+        if edad_h > config.ATLAS_SESION_MAX_HORAS:
+            print(f"  [sesión] Sesión guardada con {edad_h:.1f} h, demasiado antigua: se descarta")
+            return None
+        return json.loads(_dpapi(path.read_bytes(), cifrar=False))
+    except FileNotFoundError:
+        return None
+    except (OSError, ValueError) as e:
+        print(f"  [aviso] No se pudo leer la sesión guardada: {e}")
+        return None
+
+
+def guardar(context) -> None:
+    """Cifra y guarda el storage_state del contexto tras un login correcto."""
+    if not _disponible():
+        return
+    try:
+        cifrado = _dpapi(json.dumps(context.storage_state()).encode("utf-8"), cifrar=True)
+        path = config.ATLAS_SESION_PATH
+        path.parent.mkdir(parents=True, exist_ok=True)
+        tmp = path.with_name(path.name + ".tmp")
+        tmp.write_bytes(cifrado)
+        os.replace(tmp, path)
+        print("  [sesión] Sesión de Atlas guardada (cifrada con DPAPI)")
+    except Exception as e:
+        print(f"  [aviso] No se pudo guardar la sesión de Atlas: {e}")
+
+
+def descartar() -> None:
+    """Borra la sesión guardada (p. ej. si ya no es válida)."""
+    try:
+        config.ATLAS_SESION_PATH.unlink()
+    except FileNotFoundError:
+        pass
+
+
+def _path_estadisticas() -> Path:
+    return config.ATLAS_SESION_PATH.with_name("atlas_sesion_stats.json")
+
+
+def registrar_uso(reutilizada: bool) -> str:
+    """
+    Acumula si esta ejecución reutilizó la sesión guardada que cargó (solo
+    cuentan las ejecuciones que tenían una) y devuelve el resumen para el
+    log, ej: "sesión reutilizada en 7/10 ejecuciones (70%)".
+    """
+    path = _path_estadisticas()
+    try:
+        stats = json.loads(path.read_text(encoding="utf-8"))
+    except (OSError, ValueError):
+        stats = {"ejecuciones": 0, "reutilizadas": 0}
+    stats["ejecuciones"] += 1
+    stats["reutilizadas"] += int(reutilizada)
+    try:
+        path.parent.mkdir(parents=True, exist_ok=True)
+        escribir_atomico(path, json.dumps(stats))
+    except OSError as e:
+        print(f"  [aviso] No se pudieron guardar las estadísticas de sesión: {e}")
+    tasa = 100 * stats["reutilizadas"] / stats["ejecuciones"]
+    return f"sesión reutilizada en {stats['reutilizadas']}/{stats['ejecuciones']} ejecuciones ({tasa:.0f}%)"
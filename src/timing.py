@@ -0,0 +1,66 @@
+"""
+Tiempos por paso de una ejecución.
+
+Cada paso medido se acumula en memoria y al final se imprime un resumen en
+run.log, para comparar ejecuciones (p. ej. con PERFIL_TIEMPOS fast y stealth).
+
+    with timing.paso("login"):
+        page = atlas.login(page, logs_dir, logs_dir)
+    ...
+    print(timing.resumen())
+
+Dentro de un paso largo, Cronometro registra tramos consecutivos:
+
+    crono = timing.Cronometro("login")
+    ...rellenar formulario...
+    crono.marca("formulario")     # → "login/formulario"
+"""
+from contextlib import contextmanager
+import time
+
+_pasos: list[tuple[str, float]] = []
+
+
+def registrar(nombre: str, segundos: float) -> None:
+    """Añade un paso medido por el llamador."""
+    _pasos.append((nombre, segundos))
+
+
+@contextmanager
+def paso(nombre: str):
+    """Mide el bloque como un paso (también si termina con excepción)."""
+    inicio = time.perf_counter()
+    try:
+        yield
+    finally:
+        registrar(nombre, time.perf_counter() - inicio)
+
+
+class Cronometro:
+    """Registra tramos consecutivos de un paso con el prefijo dado."""
+
+    def __init__(self, prefijo: str):
+        self.prefijo = prefijo
+        self._ultimo = time.perf_counter()
+
+    def marca(self, tramo: str) -> None:
+        """Registra el tiempo transcurrido desde la marca anterior."""
+        ahora = time.perf_counter()
+        registrar(f"{self.prefijo}/{tramo}", ahora - self._ultimo)
+        self._ultimo = ahora
+
+
+def pasos() -> list[tuple[str, float]]:
+    return list(_pasos)
+
+
+def resumen() -> str:
+    """Tabla de pasos con su duración y el total."""
+    if not _pasos:
+        return "  (sin pasos medidos)"
+    ancho = max(len(nombre) for nombre, _ in _pasos)
+    lineas = [f"  {nombre:<{ancho}}  {seg:7.2f}s" for nombre, seg in _pasos]
+    # Los tramos "paso/tramo" ya están dentro de su paso: no suman al total
+    total = sum(seg for nombre, seg in _pasos if "/" not in nombre)
+    lineas.append(f"  {'TOTAL':<{ancho}}  {total:7.2f}s")
+    return "\n".join(lineas)
@@ -0,0 +1,84 @@
+"""
+Estado persistente de las subidas reanudables a Google Drive.
+
+Guarda en disco la URI de sesión de cada subida reanudable y el último byte
+confirmado por Drive, para que una ejecución que se reinicia tras una caída
+continúe la subida de un log grande desde el último chunk en lugar de
+empezar desde cero.
+
+Las sesiones de subida de Drive caducan a la semana; las entradas más
+antiguas que eso se descartan al cargar.
+"""
+from pathlib import Path
+import json
+import os
+import threading
+import time
+
+# Drive invalida las URIs de sesión reanudable pasada una semana
+_VIGENCIA_SEG = 6 * 24 * 3600
+
+
+class EstadoSubidas:
+    """Mapa clave de subida -> {uri, offset, destino, ts} persistido en JSON."""
+
+    def __init__(self, path: Path):
+        self._path = path
+        self._lock = threading.Lock()
+        self._sesiones: dict[str, dict] = self._cargar()
+
+    def _cargar(self) -> dict[str, dict]:
+        try:
+            data = json.loads(self._path.read_text(encoding="utf-8"))
+        except FileNotFoundError:
+            return {}
+        except (OSError, ValueError) as e:
+            print(f"  [aviso] Estado de subidas ilegible, se ignora: {e}")
+            return {}
+
+        ahora = time.time()
+        sesiones = data.get("sesiones", {}) if isinstance(data, dict) else {}
+        return {
+            clave: s
+            for clave, s in sesiones.items()
+            if isinstance(s, dict) and s.get("uri") and ahora - float(s.get("ts", 0)) < _VIGENCIA_SEG
+        }
+
+    @staticmethod
+    def clave(destino: str, nombre: str, md5: str, size: int) -> str:
+        """
+        Identifica una subida por destino, nombre y contenido: si el archivo
+        local cambió, la sesión no sirve. El destino es el archivo a reemplazar
+        o la ruta lógica de la carpeta (ej: "mongod"), no su ID: cada ejecución
+        crea su propia carpeta [run_ts] y la clave tiene que sobrevivir a eso.
+        """
+        return f"{destino}/{nombre}/{md5}/{size}"
+
+    def obtener(self, clave: str) -> dict | None:
+        with self._lock:
+            sesion = self._sesiones.get(clave)
+            return dict(sesion) if sesion else None
+
+    def actualizar(self, clave: str, uri: str, offset: int, destino: str | None = None) -> None:
+        """
+        Registra el último byte confirmado por Drive y persiste el estado.
+        `destino` es el ID de la carpeta en la que se creará el archivo.
+        """
+        with self._lock:
+            self._sesiones[clave] = {"uri": uri, "offset": offset, "destino": destino, "ts": time.time()}
+            self._escribir()
+
+    def eliminar(self, clave: str) -> None:
+        with self._lock:
+            if self._sesiones.pop(clave, None) is not None:
+                self._escribir()
+
+    def _escribir(self) -> None:
+        """Escritura atómica (temporal + rename); se llama con el lock tomado."""
+        try:
+            self._path.parent.mkdir(parents=True, exist_ok=True)
+            tmp = self._path.with_suffix(self._path.suffix + ".tmp")
+            tmp.write_text(json.dumps({"sesiones": self._sesiones}, indent=1), encoding="utf-8")
+            os.replace(tmp, self._path)
+        except OSError as e:
+            print(f"  [aviso] No se pudo guardar el estado de subidas: {e}")
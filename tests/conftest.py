@@ -0,0 +1,37 @@
+"""
+Configuración común de las pruebas.
+
+config.py vive en la raíz del repositorio: se añade al sys.path para que
+`import config` y `import src...` funcionen al ejecutar pytest desde la raíz.
+"""
+from pathlib import Path
+import sys
+
+import pytest
+
+RAIZ = Path(__file__).resolve().parent.parent
+if str(RAIZ) not in sys.path:
+    sys.path.insert(0, str(RAIZ))
+
+from src import drive, rate_limit  # noqa: E402
+from src.drive_cache import CacheCarpetas  # noqa: E402
+from tests.fake_drive import ServidorDrive  # noqa: E402
+
+
+@pytest.fixture
+def servidor_drive(tmp_path, monkeypatch):
+    """
+    Drive local con el estado de drive.py aislado: caché y estado de subidas
+    en tmp_path, sin espejo y con reintentos rápidos.
+    """
+    monkeypatch.setattr(drive.config, "DRIVE_ESPEJO", False)
+    monkeypatch.setattr(drive.config, "DRIVE_UPLOAD_STATE_PATH", tmp_path / "subidas.json")
+    monkeypatch.setattr(drive, "_cache", CacheCarpetas(tmp_path / "carpetas.json"))
+    monkeypatch.setattr(drive, "_estado_subidas", None)
+    monkeypatch.setattr(rate_limit, "_control_drive", rate_limit.ControlCuota(
+        "drive", tasa_max=1000, rafaga=1000,
+        presupuestos={"cuota": 2, "servidor": 2, "red": 1},
+        espera_base=0.01, espera_max=0.05,
+    ))
+    with ServidorDrive() as servidor:
+        yield servidor
@@ -0,0 +1,95 @@
+"""
+Servidor local que imita la API JSON de Anti-Captcha (createTask / getTaskResult).
+
+Cada tarea queda lista `duracion(task)` segundos después de crearse; hasta
+entonces getTaskResult responde "processing". Se cuentan las peticiones por
+método y se guardan las tareas creadas.
+
+    with ServidorAnticaptcha(duracion=lambda task: 2.0) as api:
+        cliente = ClienteAnticaptcha("clave", base_url=api.url)
+"""
+from collections import Counter
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Callable
+import itertools
+import json
+import threading
+import time
+
+
+class ServidorAnticaptcha:
+    def __init__(self, duracion: Callable[[dict], float] = lambda task: 1.0):
+        self.duracion = duracion
+        self.tareas: dict[int, dict] = {}
+        self.peticiones: Counter[str] = Counter()
+        self._ids = itertools.count(1000)
+        self._lock = threading.Lock()
+        self._http = ThreadingHTTPServer(("127.0.0.1", 0), _manejador(self))
+        self._http.daemon_threads = True
+        self._hilo = threading.Thread(target=self._http.serve_forever, daemon=True)
+
+    @property
+    def url(self) -> str:
+        return f"http://127.0.0.1:{self._http.server_port}"
+
+    def __enter__(self) -> "ServidorAnticaptcha":
+        self._hilo.start()
+        return self
+
+    def __exit__(self, *exc) -> None:
+        self._http.shutdown()
+        self._http.server_close()
+
+    def despachar(self, metodo: str, cuerpo: dict) -> dict:
+        with self._lock:
+            self.peticiones[metodo] += 1
+            if not cuerpo.get("clientKey"):
+                return {"errorId": 1, "errorCode": "ERROR_KEY_DOES_NOT_EXIST",
+                        "errorDescription": "Account authorization key not found"}
+
+            if metodo == "createTask":
+                task_id = next(self._ids)
+                task = cuerpo["task"]
+                self.tareas[task_id] = {
+                    "task": task,
+                    "creada": time.time(),
+                    "lista": time.time() + self.duracion(task),
+                    "consultas": 0,
+                }
+                return {"errorId": 0, "taskId": task_id}
+
+            if metodo == "getTaskResult":
+                tarea = self.tareas.get(cuerpo.get("taskId"))
+                if tarea is None:
+                    return {"errorId": 16, "errorCode": "ERROR_NO_SUCH_CAPCHA_ID",
+                            "errorDescription": "Task you are requesting does not exist"}
+                tarea["consultas"] += 1
+                if time.time() < tarea["lista"]:
+                    return {"errorId": 0, "status": "processing"}
+                return {
+                    "errorId": 0,
+                    "status": "ready",
+                    "solution": {"gRecaptchaResponse": f"token-{cuerpo['taskId']}"},
+                }
+        return {"errorId": 1, "errorCode": "ERROR_NO_SUCH_METHOD", "errorDescription": metodo}
+
+
+def _manejador(api: ServidorAnticaptcha):
+    class Manejador(BaseHTTPRequestHandler):
+        protocol_version = "HTTP/1.1"
+        timeout = 10
+
+        def log_message(self, *args):
+            pass
+
+        def do_POST(self):
+            largo = int(self.headers.get("Content-Length", 0))
+            datos = api.despachar(self.path.strip("/"), json.loads(self.rfile.read(largo) or b"{}"))
+            cuerpo = json.dumps(datos).encode()
+            self.send_response(200)
+            self.send_header("Content-Type", "application/json")
+            self.send_header("Content-Length", str(len(cuerpo)))
+            self.end_headers()
+            self.wfile.write(cuerpo)
+
+    return Manejador
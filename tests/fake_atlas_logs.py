@@ -0,0 +1,103 @@
+"""
+Servidor local que sirve logs .gz como la descarga de Atlas, para probar
+log_download sin pasar por el modal.
+
+- GET /v2/<proyecto>/logs/<host>/<proceso>.gz?startDate=&endDate=
+  Con la cookie de sesión, el .gz con Content-Disposition (el nombre que el
+  modal usa como suggested_filename). Sin ella, redirige a la página de login
+  (HTML), como hace Atlas con una sesión caducada.
+
+Opciones para las pruebas: sin_nombre (sin Content-Disposition),
+con_encoding (declara Content-Encoding: gzip) y cortar_en (cierra la
+conexión tras esos bytes).
+
+    with ServidorLogs({"mongodb-audit-log": datos}) as atlas:
+        url = atlas.url + "v2/{project_id}/logs/{hostname}/{proceso}.gz?startDate={inicio}&endDate={fin}"
+"""
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlsplit
+import re
+import threading
+
+COOKIE = ("mmsa-prod", "sesion-de-prueba")
+_LOGIN = b"<html><body><form id='login'><input id='username'></form></body></html>"
+
+
+class ServidorLogs:
+    def __init__(self, logs: dict[str, bytes]):
+        self.logs = logs
+        self.sin_nombre = False
+        self.con_encoding = False
+        self.cortar_en: int | None = None
+        self.peticiones: list[dict] = []
+        self.conexiones: set[int] = set()
+        self._http = ThreadingHTTPServer(("127.0.0.1", 0), _manejador(self))
+        self._http.daemon_threads = True
+        self._hilo = threading.Thread(target=self._http.serve_forever, daemon=True)
+
+    @property
+    def url(self) -> str:
+        return f"http://127.0.0.1:{self._http.server_port}/"
+
+    def __enter__(self) -> "ServidorLogs":
+        self._hilo.start()
+        return self
+
+    def __exit__(self, *exc) -> None:
+        self._http.shutdown()
+        self._http.server_close()
+
+
+def _manejador(atlas: ServidorLogs):
+    class Manejador(BaseHTTPRequestHandler):
+        protocol_version = "HTTP/1.1"
+        timeout = 10
+
+        def log_message(self, *args):
+            pass
+
+        def _responder(self, estado: int, cuerpo: bytes, cabeceras: dict[str, str]) -> None:
+            self.send_response(estado)
+            for nombre, valor in cabeceras.items():
+                self.send_header(nombre, valor)
+            self.send_header("Content-Length", str(len(cuerpo)))
+            self.end_headers()
+            if atlas.cortar_en is not None and len(cuerpo) > atlas.cortar_en:
+                self.wfile.write(cuerpo[:atlas.cortar_en])
+                self.close_connection = True
+                return
+            self.wfile.write(cuerpo)
+
+        def do_GET(self):
+            partes = urlsplit(self.path)
+            atlas.conexiones.add(self.client_address[1])
+            if partes.path == "/login":
+                self._responder(200, _LOGIN, {"Content-Type": "text/html; charset=utf-8"})
+                return
+
+            m = re.fullmatch(r"/v2/([^/]+)/logs/([^/]+)/([^/]+)\.gz", partes.path)
+            if not m or m.group(3) not in atlas.logs:
+                self._responder(404, b"no encontrado", {"Content-Type": "text/plain"})
+                return
+
+            cookies = dict(
+                c.strip().split("=", 1) for c in self.headers.get("Cookie", "").split(";") if "=" in c
+            )
+            if cookies.get(COOKIE[0]) != COOKIE[1]:
+                self.send_response(302)
+                self.send_header("Location", "/login")
+                self.send_header("Content-Length", "0")
+                self.end_headers()
+                return
+
+            query = {k: v[0] for k, v in parse_qs(partes.query).items()}
+            atlas.peticiones.append({"proyecto": m.group(1), "host": m.group(2), "proceso": m.group(3), **query})
+            cabeceras = {"Content-Type": "application/gzip"}
+            if not atlas.sin_nombre:
+                sufijo = "MONGODB_AUDIT_LOG.log.gz" if m.group(3) == "mongodb-audit-log" else "mongodb.log.gz"
+                cabeceras["Content-Disposition"] = f'attachment; filename="{m.group(2)}_{sufijo}"'
+            if atlas.con_encoding:
+                cabeceras["Content-Encoding"] = "gzip"
+            self._responder(200, atlas.logs[m.group(3)], cabeceras)
+
+    return Manejador
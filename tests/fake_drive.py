@@ -0,0 +1,303 @@
+"""
+Servidor local que imita la parte de la API de Drive v3 que usa el bot.
+
+Atiende, en memoria y de forma determinista:
+
+- GET/POST /drive/v3/files            (listar con el subconjunto de `q` que se usa, crear)
+- GET/PATCH /drive/v3/files/<id>      (metadatos o contenido con alt=media y
+                                       Range, addParents/removeParents)
+- POST /drive/v3/files/<id>/copy
+- GET /drive/v3/changes[/startPageToken]  (un cambio por alta o modificación,
+                                          de todo el Drive, como la API real)
+- POST /batch/drive/v3                (multipart/mixed, como new_batch_http_request)
+- POST/PUT /upload/drive/v3/files     (subida reanudable, incluida la consulta
+                                       "bytes */total" del estado de la sesión)
+
+Fallos programables para las pruebas:
+
+- fallar_tras_crear:  nombres cuya creación se aplica pero responde 503 una vez
+                      (el cliente no sabe si se creó).
+- cortar_subida_tras: tras recibir ese número de chunks, el servidor rechaza
+                      los siguientes con 503 (sin guardarlos) hasta que se
+                      ponga a None.
+
+    with ServidorDrive() as drive:
+        service = drive.servicio()
+        ...
+        drive.peticiones   # Counter por tipo de llamada
+"""
+from collections import Counter
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlsplit
+import hashlib
+import itertools
+import json
+import re
+import threading
+
+from googleapiclient import discovery_cache
+from googleapiclient.discovery import build_from_document
+from googleapiclient.http import build_http
+
+FOLDER_MIME = "application/vnd.google-apps.folder"
+
+
+class ServidorDrive:
+    def __init__(self):
+        self.archivos: dict[str, dict] = {}
+        self.contenidos: dict[str, bytes] = {}
+        self.sesiones: dict[str, dict] = {}
+        self.cambios: list[str] = []
+        self.peticiones: Counter[str] = Counter()
+        self.bytes_recibidos = 0
+        self.fallar_tras_crear: set[str] = set()
+        self.cortar_subida_tras: int | None = None
+        self._chunks = 0
+        self._ids = itertools.count(1)
+        self._lock = threading.Lock()
+        self._http = ThreadingHTTPServer(("127.0.0.1", 0), _manejador(self))
+        self._hilo = threading.Thread(target=self._http.serve_forever, daemon=True)
+
+    @property
+    def url(self) -> str:
+        return f"http://127.0.0.1:{self._http.server_port}/"
+
+    def __enter__(self) -> "ServidorDrive":
+        self._hilo.start()
+        return self
+
+    def __exit__(self, *exc) -> None:
+        self._http.shutdown()
+        self._http.server_close()
+
+    def servicio(self):
+        """Servicio de googleapiclient apuntando a este servidor."""
+        # Con rootUrl apuntando aquí, también el batch y las subidas vienen
+        # a este servidor (client_options solo cambia la ruta base)
+        documento = json.loads(discovery_cache.get_static_doc("drive", "v3"))
+        documento["rootUrl"] = self.url
+        documento["baseUrl"] = self.url + documento["servicePath"]
+        return build_from_document(documento, http=build_http())
+
+    def carpeta(self, nombre: str, padre: str | None = None) -> str:
+        """Crea una carpeta directamente (preparación de las pruebas)."""
+        return self._crear({"name": nombre, "mimeType": FOLDER_MIME, "parents": [padre] if padre else []})["id"]
+
+    def archivo(self, nombre: str, padre: str, contenido: bytes) -> str:
+        """Crea un archivo ya subido (preparación de las pruebas)."""
+        return self._crear({"name": nombre, "parents": [padre]}, contenido)["id"]
+
+    def hijos(self, padre: str, nombre: str | None = None) -> list[dict]:
+        return [
+            f for f in self.archivos.values()
+            if padre in f["parents"] and (nombre is None or f["name"] == nombre)
+        ]
+
+    # ---- Operaciones ----
+
+    def _crear(self, meta: dict, contenido: bytes | None = None) -> dict:
+        with self._lock:
+            fid = f"id{next(self._ids)}"
+            archivo = {
+                "id": fid,
+                "name": meta.get("name", "sin_nombre"),
+                "mimeType": meta.get("mimeType", "application/octet-stream"),
+                "parents": list(meta.get("parents", [])),
+                "trashed": False,
+            }
+            if contenido is not None:
+                archivo["md5Checksum"] = hashlib.md5(contenido).hexdigest()
+                archivo["size"] = str(len(contenido))
+                self.contenidos[fid] = contenido
+            self.archivos[fid] = archivo
+            self.cambios.append(fid)
+            return dict(archivo)
+
+    def _listar(self, q: str) -> list[dict]:
+        condiciones = []
+        for m in re.finditer(r"name\s*=\s*'((?:\\.|[^'])*)'", q):
+            nombre = re.sub(r"\\(.)", r"\1", m.group(1))
+            condiciones.append(lambda f, n=nombre: f["name"] == n)
+        for m in re.finditer(r"'([^']+)'\s+in\s+parents", q):
+            condiciones.append(lambda f, p=m.group(1): p in f["parents"])
+        for m in re.finditer(r"mimeType\s*(!?=)\s*'([^']+)'", q):
+            if m.group(1) == "=":
+                condiciones.append(lambda f, t=m.group(2): f["mimeType"] == t)
+            else:
+                condiciones.append(lambda f, t=m.group(2): f["mimeType"] != t)
+        if "trashed=false" in q.replace(" ", ""):
+            condiciones.append(lambda f: not f["trashed"])
+        with self._lock:
+            return [dict(f) for f in self.archivos.values() if all(c(f) for c in condiciones)]
+
+    def despachar(self, metodo: str, ruta: str, cabeceras, cuerpo: bytes) -> tuple[int, dict, dict | bytes | None]:
+        """Atiende una llamada de la API. Devuelve (estado, cabeceras, json o bytes)."""
+        partes = urlsplit(ruta)
+        query = {k: v[0] for k, v in parse_qs(partes.query).items()}
+        camino = partes.path.rstrip("/")
+
+        if camino == "/drive/v3/files" and metodo == "GET":
+            self.peticiones["list"] += 1
+            return 200, {}, {"files": self._listar(query.get("q", ""))}
+
+        if camino == "/drive/v3/files" and metodo == "POST":
+            self.peticiones["create"] += 1
+            meta = json.loads(cuerpo or b"{}")
+            archivo = self._crear(meta)
+            if meta.get("name") in self.fallar_tras_crear:
+                self.fallar_tras_crear.discard(meta["name"])
+                return 503, {}, {"error": {"code": 503, "message": "Backend Error"}}
+            return 200, {}, archivo
+
+        if camino == "/drive/v3/changes/startPageToken":
+            with self._lock:
+                return 200, {}, {"startPageToken": str(len(self.cambios) + 1)}
+
+        if camino == "/drive/v3/changes":
+            self.peticiones["changes"] += 1
+            with self._lock:
+                desde = int(query["pageToken"]) - 1
+                cambios = [
+                    {"fileId": fid, "removed": False, "file": dict(self.archivos[fid])}
+                    for fid in self.cambios[desde:]
+                ]
+                return 200, {}, {"changes": cambios, "newStartPageToken": str(len(self.cambios) + 1)}
+
+        m = re.fullmatch(r"/drive/v3/files/([^/]+)(/copy)?", camino)
+        if m and m.group(1) in self.archivos:
+            fid = m.group(1)
+            if m.group(2) and metodo == "POST":
+                self.peticiones["copy"] += 1
+                original = self.archivos[fid]
+                meta = {**original, **json.loads(cuerpo or b"{}")}
+                return 200, {}, self._crear(meta, self.contenidos.get(fid, b""))
+            if metodo == "PATCH":
+                self.peticiones["update"] += 1
+                with self._lock:
+                    archivo = self.archivos[fid]
+                    quitar = set(filter(None, query.get("removeParents", "").split(",")))
+                    archivo["parents"] = [p for p in archivo["parents"] if p not in quitar]
+                    archivo["parents"] += [p for p in query.get("addParents", "").split(",") if p]
+                    archivo.update({k: v for k, v in json.loads(cuerpo or b"{}").items() if k != "parents"})
+                    self.cambios.append(fid)
+                    return 200, {}, dict(archivo)
+            if metodo == "GET" and query.get("alt") == "media":
+                self.peticiones["get_media"] += 1
+                contenido = self.contenidos.get(fid, b"")
+                m = re.fullmatch(r"bytes=(\d+)-(\d+)", cabeceras.get("Range", "") if cabeceras else "")
+                if m:
+                    return 206, {}, contenido[int(m.group(1)):int(m.group(2)) + 1]
+                return 200, {}, contenido
+            if metodo == "GET":
+                self.peticiones["get"] += 1
+                return 200, {}, dict(self.archivos[fid])
+        return 404, {}, {"error": {"code": 404, "message": f"No encontrado: {camino}"}}
+
+    def subida(self, metodo: str, ruta: str, cabeceras, cuerpo: bytes) -> tuple[int, dict, dict | None]:
+        """Subida reanudable: sesión nueva, chunk o consulta de estado."""
+        query = {k: v[0] for k, v in parse_qs(urlsplit(ruta).query).items()}
+        if metodo == "POST":
+            self.peticiones["upload_start"] += 1
+            with self._lock:
+                sid = f"s{next(self._ids)}"
+                self.sesiones[sid] = {
+                    "meta": json.loads(cuerpo or b"{}"),
+                    "total": int(cabeceras.get("X-Upload-Content-Length", 0)),
+                    "datos": bytearray(),
+                }
+            return 200, {"Location": f"{self.url}upload/drive/v3/files?uploadType=resumable&upload_id={sid}"}, {}
+
+        sesion = self.sesiones.get(query.get("upload_id", ""))
+        if sesion is None:
+            return 404, {}, {"error": {"code": 404, "message": "Sesión desconocida"}}
+        rango = cabeceras.get("Content-Range", "")
+        if rango.startswith("bytes */"):
+            self.peticiones["upload_status"] += 1
+        else:
+            self.peticiones["upload_chunk"] += 1
+            if self.cortar_subida_tras is not None and self._chunks >= self.cortar_subida_tras:
+                return 503, {}, {"error": {"code": 503, "message": "Backend Error"}}
+            m = re.fullmatch(r"bytes (\d+)-(\d+)/(\d+|\*)", rango)
+            if m and int(m.group(1)) == len(sesion["datos"]):
+                sesion["datos"] += cuerpo
+                self.bytes_recibidos += len(cuerpo)
+                self._chunks += 1
+
+        recibido = len(sesion["datos"])
+        if recibido >= sesion["total"]:
+            if "archivo" not in sesion:
+                sesion["archivo"] = self._crear(sesion["meta"], bytes(sesion["datos"]))
+            return 200, {}, sesion["archivo"]
+        cabeceras_resp = {"Range": f"bytes=0-{recibido - 1}"} if recibido else {}
+        return 308, cabeceras_resp, None
+
+    def lote(self, cabeceras, cuerpo: bytes) -> tuple[bytes, str]:
+        """Atiende un multipart/mixed de batch y devuelve (cuerpo, content-type)."""
+        self.peticiones["batch"] += 1
+        limite = re.search(r'boundary="?([^";]+)"?', cabeceras.get("Content-Type", "")).group(1)
+        salida = []
+        for parte in cuerpo.split(b"--" + limite.encode())[1:]:
+            if parte.startswith(b"--"):
+                break
+            # googleapiclient separa las líneas con \n y no con \r\n
+            cab_parte, http = re.split(rb"\r?\n\r?\n", parte.lstrip(b"\r\n"), maxsplit=1)
+            content_id = re.search(rb"Content-ID: <([^>]+)>", cab_parte).group(1).decode()
+            inicio, resto = re.split(rb"\r?\n", http, maxsplit=1)
+            metodo, ruta, _ = inicio.decode().split(" ", 2)
+            cuerpo_http = re.split(rb"\r?\n\r?\n", resto, maxsplit=1)[1].rstrip(b"\r\n")
+            estado, _, datos = self.despachar(metodo, ruta, {}, cuerpo_http)
+            json_resp = json.dumps(datos or {}).encode()
+            salida.append(
+                f"--LIMITE\r\nContent-Type: application/http\r\nContent-ID: <response-{content_id}>\r\n\r\n"
+                f"HTTP/1.1 {estado} X\r\nContent-Type: application/json\r\n"
+                f"Content-Length: {len(json_resp)}\r\n\r\n".encode() + json_resp + b"\r\n"
+            )
+        return b"".join(salida) + b"--LIMITE--\r\n", "multipart/mixed; boundary=LIMITE"
+
+
+def _manejador(drive: ServidorDrive):
+    class Manejador(BaseHTTPRequestHandler):
+        protocol_version = "HTTP/1.1"
+        timeout = 10
+
+        def log_message(self, *args):
+            pass
+
+        def _atender(self, metodo: str) -> None:
+            cuerpo = self.rfile.read(int(self.headers.get("Content-Length") or 0))
+            if self.path.startswith("/batch/"):
+                datos, tipo = drive.lote(self.headers, cuerpo)
+                self._responder(200, {"Content-Type": tipo}, datos)
+                return
+            if self.path.startswith("/upload/"):
+                resp = drive.subida(metodo, self.path, self.headers, cuerpo)
+            else:
+                resp = drive.despachar(metodo, self.path, self.headers, cuerpo)
+            estado, cabeceras, datos = resp
+            if isinstance(datos, bytes):
+                self._responder(estado, {"Content-Type": "application/octet-stream", **cabeceras}, datos)
+                return
+            cuerpo_resp = json.dumps(datos).encode() if datos is not None else b""
+            self._responder(estado, {"Content-Type": "application/json", **cabeceras}, cuerpo_resp)
+
+        def _responder(self, estado: int, cabeceras: dict, cuerpo: bytes) -> None:
+            self.send_response(estado)
+            for k, v in cabeceras.items():
+                self.send_header(k, v)
+            self.send_header("Content-Length", str(len(cuerpo)))
+            self.end_headers()
+            self.wfile.write(cuerpo)
+
+        def do_GET(self):
+            self._atender("GET")
+
+        def do_POST(self):
+            self._atender("POST")
+
+        def do_PUT(self):
+            self._atender("PUT")
+
+        def do_PATCH(self):
+            self._atender("PATCH")
+
+    return Manejador
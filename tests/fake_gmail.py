@@ -0,0 +1,164 @@
+"""
+Servidor local que imita la parte de la API de Gmail v1 que usa gmail_otp.
+
+Atiende, en memoria:
+
+- GET /gmail/v1/users/me/profile          (historyId actual)
+- GET /gmail/v1/users/me/history          (messagesAdded desde startHistoryId)
+- GET /gmail/v1/users/me/messages         (los últimos mensajes, más nuevo primero)
+- GET /gmail/v1/users/me/messages/<id>    (format=full; 404 si se borró)
+
+    with ServidorGmail() as gmail:
+        service = gmail.servicio()
+        gmail.entregar("123456", retraso=1.5)   # llega dentro de 1,5 s
+"""
+from collections import Counter
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlsplit
+import base64
+import itertools
+import json
+import re
+import threading
+import time
+
+from googleapiclient import discovery_cache
+from googleapiclient.discovery import build_from_document
+from googleapiclient.http import build_http
+
+REMITENTE = "MongoDB <mongodb-account@mongodb.com>"
+ASUNTO = "MongoDB verification code"
+
+
+class ServidorGmail:
+    def __init__(self):
+        self.mensajes: list[dict] = []
+        self.history_id = 1000
+        self.peticiones: Counter[str] = Counter()
+        self._ids = itertools.count(1)
+        self._lock = threading.Lock()
+        self._temporizadores: list[threading.Timer] = []
+        self._http = ThreadingHTTPServer(("127.0.0.1", 0), _manejador(self))
+        self._hilo = threading.Thread(target=self._http.serve_forever, daemon=True)
+
+    @property
+    def url(self) -> str:
+        return f"http://127.0.0.1:{self._http.server_port}/"
+
+    def __enter__(self) -> "ServidorGmail":
+        self._hilo.start()
+        return self
+
+    def __exit__(self, *exc) -> None:
+        for t in self._temporizadores:
+            t.cancel()
+        self._http.shutdown()
+        self._http.server_close()
+
+    def servicio(self):
+        """Servicio de googleapiclient apuntando a este servidor."""
+        documento = json.loads(discovery_cache.get_static_doc("gmail", "v1"))
+        documento["rootUrl"] = self.url
+        documento["baseUrl"] = self.url + documento["servicePath"]
+        return build_from_document(documento, http=build_http())
+
+    def entregar(
+        self,
+        otp: str,
+        retraso: float = 0.0,
+        remitente: str = REMITENTE,
+        asunto: str = ASUNTO,
+        borrado: bool = False,
+    ) -> None:
+        """Añade el correo con el código ahora o dentro de `retraso` segundos."""
+        if retraso <= 0:
+            self._agregar(otp, remitente, asunto, borrado)
+            return
+        t = threading.Timer(retraso, self._agregar, (otp, remitente, asunto, borrado))
+        t.daemon = True
+        self._temporizadores.append(t)
+        t.start()
+
+    def _agregar(self, otp: str, remitente: str, asunto: str, borrado: bool) -> None:
+        with self._lock:
+            self.history_id += 1
+            self.mensajes.append({
+                "id": f"m{next(self._ids)}",
+                "historyId": self.history_id,
+                "internalDate": str(int(time.time() * 1000)),
+                "remitente": remitente,
+                "asunto": asunto,
+                "cuerpo": f"Your verification code is {otp}.",
+                "borrado": borrado,
+            })
+
+    def despachar(self, ruta: str) -> tuple[int, dict]:
+        partes = urlsplit(ruta)
+        query = {k: v[0] for k, v in parse_qs(partes.query).items()}
+        camino = partes.path.rstrip("/")
+        with self._lock:
+            if camino == "/gmail/v1/users/me/profile":
+                self.peticiones["profile"] += 1
+                return 200, {"emailAddress": "bot@example.com", "historyId": str(self.history_id)}
+
+            if camino == "/gmail/v1/users/me/history":
+                self.peticiones["history"] += 1
+                desde = int(query.get("startHistoryId", 0))
+                nuevos = [m for m in self.mensajes if m["historyId"] > desde]
+                return 200, {
+                    "history": [
+                        {"id": str(m["historyId"]), "messagesAdded": [{"message": {"id": m["id"]}}]}
+                        for m in nuevos
+                    ],
+                    "historyId": str(self.history_id),
+                }
+
+            if camino == "/gmail/v1/users/me/messages":
+                self.peticiones["list"] += 1
+                vivos = [m for m in reversed(self.mensajes) if not m["borrado"]]
+                maximo = int(query.get("maxResults", 100))
+                return 200, {"messages": [{"id": m["id"]} for m in vivos[:maximo]]}
+
+            m = re.fullmatch(r"/gmail/v1/users/me/messages/([^/]+)", camino)
+            if m:
+                self.peticiones["get"] += 1
+                msg = next((x for x in self.mensajes if x["id"] == m.group(1) and not x["borrado"]), None)
+                if msg is None:
+                    return 404, {"error": {"code": 404, "message": "Requested entity was not found."}}
+                return 200, _mensaje_full(msg)
+        return 404, {"error": {"code": 404, "message": f"No encontrado: {camino}"}}
+
+
+def _mensaje_full(msg: dict) -> dict:
+    cuerpo = base64.urlsafe_b64encode(msg["cuerpo"].encode()).decode()
+    return {
+        "id": msg["id"],
+        "internalDate": msg["internalDate"],
+        "payload": {
+            "headers": [
+                {"name": "From", "value": msg["remitente"]},
+                {"name": "Subject", "value": msg["asunto"]},
+            ],
+            "parts": [{"mimeType": "text/plain", "body": {"data": cuerpo}}],
+        },
+    }
+
+
+def _manejador(gmail: ServidorGmail):
+    class Manejador(BaseHTTPRequestHandler):
+        protocol_version = "HTTP/1.1"
+        timeout = 10
+
+        def log_message(self, *args):
+            pass
+
+        def do_GET(self):
+            estado, datos = gmail.despachar(self.path)
+            cuerpo = json.dumps(datos).encode()
+            self.send_response(estado)
+            self.send_header("Content-Type", "application/json")
+            self.send_header("Content-Length", str(len(cuerpo)))
+            self.end_headers()
+            self.wfile.write(cuerpo)
+
+    return Manejador
@@ -0,0 +1,195 @@
+"""
+Servidor IMAP (TLS) mínimo para probar la escucha IDLE de imap_otp.
+
+Implementa lo que usa EscuchaImap: CAPABILITY, LOGIN, EXAMINE/SELECT,
+UID SEARCH, UID FETCH (INTERNALDATE BODY.PEEK[]), IDLE/DONE y LOGOUT. Con
+la conexión en IDLE, cada entrega se avisa con "* n EXISTS".
+
+Carreras reproducibles para las pruebas:
+
+- durante_busqueda: mensajes que llegan mientras se atiende el próximo
+  UID SEARCH (el EXISTS va antes del resultado, que ya no los incluye).
+- tras_fetch:       mensajes que llegan justo después de la respuesta del
+  próximo UID FETCH, con su EXISTS en el mismo envío TCP.
+
+    with ServidorImap(cert, clave) as imap:
+        imap.entregar(correo_otp("482913"), retraso=0.5)
+"""
+from collections import Counter
+import imaplib
+import re
+import socketserver
+import ssl
+import subprocess
+import threading
+import time
+
+REMITENTE = "MongoDB <mongodb-account@mongodb.com>"
+
+
+def correo_otp(otp: str, remitente: str = REMITENTE) -> bytes:
+    return (
+        f"From: {remitente}\r\n"
+        "Subject: MongoDB verification code\r\n"
+        "Content-Type: text/plain; charset=utf-8\r\n"
+        "\r\n"
+        f"Your verification code is {otp}.\r\n"
+    ).encode()
+
+
+def generar_certificado(directorio) -> tuple[str, str]:
+    """Certificado autofirmado con el openssl del sistema (para el TLS local)."""
+    cert, clave = directorio / "imap.crt", directorio / "imap.key"
+    subprocess.run(
+        ["openssl", "req", "-x509", "-newkey", "rsa:2048", "-nodes", "-days", "1",
+         "-subj", "/CN=127.0.0.1", "-keyout", str(clave), "-out", str(cert)],
+        check=True, capture_output=True,
+    )
+    return str(cert), str(clave)
+
+
+class ServidorImap:
+    def __init__(self, cert: str, clave: str):
+        self.mensajes: list[tuple[int, float, bytes]] = []
+        self.durante_busqueda: list[bytes] = []
+        self.tras_fetch: list[bytes] = []
+        self.peticiones: Counter[str] = Counter()
+        self._uid = 100
+        self._lock = threading.Lock()
+        self._en_idle: set["_Sesion"] = set()
+        self._temporizadores: list[threading.Timer] = []
+
+        contexto = ssl.SSLContext(ssl.PROTOCOL_TLS_SERVER)
+        contexto.load_cert_chain(cert, clave)
+        servidor = self
+
+        class _Tcp(socketserver.ThreadingTCPServer):
+            daemon_threads = True
+            allow_reuse_address = True
+
+            def get_request(self):
+                sock, addr = super().get_request()
+                return contexto.wrap_socket(sock, server_side=True), addr
+
+        class _Manejador(socketserver.StreamRequestHandler):
+            def handle(self):
+                _Sesion(servidor, self.connection).atender()
+
+        self._tcp = _Tcp(("127.0.0.1", 0), _Manejador)
+        self._hilo = threading.Thread(target=self._tcp.serve_forever, daemon=True)
+
+    @property
+    def puerto(self) -> int:
+        return self._tcp.server_address[1]
+
+    def __enter__(self) -> "ServidorImap":
+        self._hilo.start()
+        return self
+
+    def __exit__(self, *exc) -> None:
+        for t in self._temporizadores:
+            t.cancel()
+        self._tcp.shutdown()
+        self._tcp.server_close()
+
+    def entregar(self, crudo: bytes, retraso: float = 0.0) -> None:
+        """Añade un mensaje ahora o dentro de `retraso` segundos y avisa al IDLE."""
+        if retraso > 0:
+            t = threading.Timer(retraso, self.entregar, (crudo,))
+            t.daemon = True
+            self._temporizadores.append(t)
+            t.start()
+            return
+        total = self._agregar(crudo)
+        with self._lock:
+            sesiones = list(self._en_idle)
+        for sesion in sesiones:
+            sesion.enviar(f"* {total} EXISTS\r\n".encode())
+
+    def _agregar(self, crudo: bytes) -> int:
+        with self._lock:
+            self._uid += 1
+            self.mensajes.append((self._uid, time.time(), crudo))
+            return len(self.mensajes)
+
+
+class _Sesion:
+    def __init__(self, servidor: ServidorImap, conexion):
+        self._srv = servidor
+        self._conn = conexion
+        self._archivo = conexion.makefile("rb")
+        self._lock = threading.Lock()
+
+    def enviar(self, datos: bytes) -> None:
+        with self._lock:
+            self._conn.sendall(datos)
+
+    def atender(self) -> None:
+        self.enviar(b"* OK fake IMAP listo\r\n")
+        try:
+            while linea := self._archivo.readline():
+                tag, _, resto = linea.decode().rstrip("\r\n").partition(" ")
+                comando, _, args = resto.partition(" ")
+                comando = comando.upper()
+                if comando == "UID":
+                    comando, _, args = args.partition(" ")
+                    comando = "UID " + comando.upper()
+                self._srv.peticiones[comando] += 1
+                if not self._comando(tag, comando, args):
+                    break
+        except (ConnectionError, ssl.SSLError, OSError):
+            pass
+        finally:
+            with self._srv._lock:
+                self._srv._en_idle.discard(self)
+
+    def _comando(self, tag: str, comando: str, args: str) -> bool:
+        srv = self._srv
+        if comando == "CAPABILITY":
+            self.enviar(f"* CAPABILITY IMAP4rev1 IDLE\r\n{tag} OK CAPABILITY\r\n".encode())
+        elif comando == "LOGIN":
+            self.enviar(f"{tag} OK LOGIN\r\n".encode())
+        elif comando in ("SELECT", "EXAMINE"):
+            with srv._lock:
+                total, uidnext = len(srv.mensajes), srv._uid + 1
+            self.enviar(
+                f"* {total} EXISTS\r\n* OK [UIDNEXT {uidnext}] siguiente UID\r\n"
+                f"{tag} OK [READ-ONLY] {comando}\r\n".encode()
+            )
+        elif comando == "UID SEARCH":
+            desde = int(re.search(r"UID (\d+):\*", args).group(1))
+            with srv._lock:
+                uids = [uid for uid, _, _ in srv.mensajes if uid >= desde]
+                if not uids and srv.mensajes:
+                    uids = [srv.mensajes[-1][0]]
+                llegan, srv.durante_busqueda = srv.durante_busqueda, []
+            avisos = b"".join(f"* {srv._agregar(m)} EXISTS\r\n".encode() for m in llegan)
+            resultado = " ".join(map(str, uids))
+            self.enviar(avisos + f"* SEARCH {resultado}\r\n{tag} OK SEARCH\r\n".encode())
+        elif comando == "UID FETCH":
+            uid = int(args.split(" ", 1)[0])
+            with srv._lock:
+                pos, (_, ts, crudo) = next((i, m) for i, m in enumerate(srv.mensajes) if m[0] == uid)
+                llegan, srv.tras_fetch = srv.tras_fetch, []
+            fecha = imaplib.Time2Internaldate(ts)
+            respuesta = (
+                f"* {pos + 1} FETCH (UID {uid} INTERNALDATE {fecha} BODY[] {{{len(crudo)}}}\r\n".encode()
+                + crudo + b")\r\n" + f"{tag} OK FETCH\r\n".encode()
+            )
+            avisos = b"".join(f"* {srv._agregar(m)} EXISTS\r\n".encode() for m in llegan)
+            self.enviar(respuesta + avisos)
+        elif comando == "IDLE":
+            with srv._lock:
+                srv._en_idle.add(self)
+            self.enviar(b"+ idling\r\n")
+            self._archivo.readline()  # DONE
+            with srv._lock:
+                srv._en_idle.discard(self)
+            self.enviar(f"{tag} OK IDLE terminado\r\n".encode())
+        elif comando == "LOGOUT":
+            self.enviar(f"* BYE\r\n{tag} OK LOGOUT\r\n".encode())
+            return False
+        else:
+            self.enviar(f"{tag} BAD comando no soportado\r\n".encode())
+        return True
+
@@ -0,0 +1,91 @@
+"""Cliente de Anti-Captcha (tests/fake_anticaptcha.py) y vigencia de los tokens."""
+import asyncio
+import json
+import time
+
+import pytest
+
+from src import anticaptcha
+from src.anticaptcha import ClienteAnticaptcha
+from src.captcha_pool import PoolTokens
+from tests.fake_anticaptcha import ServidorAnticaptcha
+
+SITE_KEY = "6Lc-prueba"
+
+
+@pytest.fixture
+def pool(tmp_path, monkeypatch):
+    pool = PoolTokens(tmp_path / "pool.json", tamano=2, ttl_seg=150)
+    monkeypatch.setattr(anticaptcha, "obtener_pool", lambda: pool)
+    nuevos = []
+
+    def _resolver(page_url, site_key, action="login"):
+        nuevos.append(action)
+        return "token-nuevo"
+
+    monkeypatch.setattr(anticaptcha, "resolver_sin_pool", _resolver)
+    pool.resueltos = nuevos
+    return pool
+
+
+def _guardar(pool: PoolTokens, edad_seg: float) -> None:
+    token = {"site_key": SITE_KEY, "action": "login", "token": "token-pool", "ts": time.time() - edad_seg}
+    pool._path.write_text(json.dumps({"tokens": [token]}), encoding="utf-8")
+
+
+def test_tomar_devuelve_la_hora_de_resolucion(pool):
+    _guardar(pool, edad_seg=30)
+    token, ts = pool.tomar(SITE_KEY, "login")
+    assert token == "token-pool"
+    assert time.time() - ts == pytest.approx(30, abs=1)
+    assert pool.tomar(SITE_KEY, "login") is None
+
+
+def test_el_relleno_solo_se_activa_con_peticiones(pool):
+    assert pool.segundos_sin_demanda() == float("inf")
+    pool.agregar(SITE_KEY, "login", "token-pool")
+    # Reponer tokens no cuenta como demanda
+    assert pool.segundos_sin_demanda() == float("inf")
+    pool.tomar(SITE_KEY, "login")
+    pool.tomar(SITE_KEY, "login")   # también cuenta aunque el pool esté vacío
+    assert pool.segundos_sin_demanda() < 1
+
+
+def test_token_reciente_del_pool_se_usa(pool):
+    _guardar(pool, edad_seg=10)
+    captcha = anticaptcha.ResolucionAnticipada("https://atlas", SITE_KEY)
+    assert captcha.token("login") == "token-pool"
+    assert pool.resueltos == []
+
+
+def test_token_viejo_del_pool_se_resuelve_de_nuevo(pool):
+    # Vigente para el pool (TTL 150 s) pero ya pasado de la vigencia de envío
+    _guardar(pool, edad_seg=anticaptcha._VIGENCIA_TOKEN_SEG + 10)
+    captcha = anticaptcha.ResolucionAnticipada("https://atlas", SITE_KEY)
+    assert captcha.token("login") == "token-nuevo"
+    assert pool.resueltos == ["login"]
+
+
+def test_resoluciones_simultaneas_y_cancelacion():
+    with ServidorAnticaptcha(duracion=lambda task: 0.5 if task["pageAction"] == "login" else 30) as api:
+        async def _probar():
+            async with ClienteAnticaptcha(
+                "clave", base_url=api.url, primera_consulta_seg=0.2, intervalo_seg=0.1
+            ) as cliente:
+                lenta = asyncio.create_task(cliente.resolver_recaptcha_v3("https://atlas", SITE_KEY, "lenta"))
+                inicio = time.perf_counter()
+                tokens = await asyncio.gather(
+                    *(cliente.resolver_recaptcha_v3("https://atlas", SITE_KEY, "login") for _ in range(3))
+                )
+                transcurrido = time.perf_counter() - inicio
+                lenta.cancel()
+                with pytest.raises(asyncio.CancelledError):
+                    await lenta
+                return tokens, transcurrido
+
+        tokens, transcurrido = asyncio.run(_probar())
+
+    assert len(set(tokens)) == 3
+    assert transcurrido < 1.5
+    tarea = api.tareas[min(api.tareas)]["task"]
+    assert tarea["isEnterprise"] is True and tarea["apiDomain"] == "www.recaptcha.net"
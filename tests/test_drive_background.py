@@ -0,0 +1,45 @@
+"""SubidaEnSegundoPlano contra el servidor local (tests/fake_drive.py)."""
+from datetime import date
+import threading
+
+from src import drive
+
+
+def test_carpetas_drive_no_espera_indefinidamente(servidor_drive, monkeypatch):
+    monkeypatch.setattr(drive, "_get_service", servidor_drive.servicio)
+    ejecucion = servidor_drive.carpeta("20260301_100000")
+    liberar = threading.Event()
+
+    def _resolver_lento(service, run_ts, start, end):
+        liberar.wait(10)
+        return ejecucion
+
+    monkeypatch.setattr(drive, "_resolver_carpeta_ejecucion", _resolver_lento)
+    subida = drive.SubidaEnSegundoPlano("20260301_100000", date(2026, 1, 1), date(2026, 3, 31), ["mongod"])
+
+    assert subida.carpetas_drive(timeout=0.1) == {}
+
+    liberar.set()
+    info = subida.finalizar()
+    assert info["execution_folder"]["id"] == ejecucion
+    assert [f["id"] for f in servidor_drive.hijos(ejecucion, "mongod")] == [info["mongod"]["id"]]
+
+
+def test_finalizar_tras_un_error_sube_lo_encolado(servidor_drive, monkeypatch, tmp_path):
+    monkeypatch.setattr(drive, "_get_service", servidor_drive.servicio)
+    ejecucion = servidor_drive.carpeta("20260301_100000")
+    monkeypatch.setattr(drive, "_resolver_carpeta_ejecucion", lambda service, run_ts, start, end: ejecucion)
+    carpeta = tmp_path / "mongod-audit-log"
+    carpeta.mkdir()
+    (carpeta / "audit.log.gz").write_bytes(b"log" * 100)
+    subida = drive.SubidaEnSegundoPlano(
+        "20260301_100000", date(2026, 1, 1), date(2026, 3, 31), ["mongod-audit-log", "mongod"]
+    )
+    subida.encolar(carpeta)
+
+    # main llama a finalizar() en el `finally` aunque el segundo log haya fallado
+    info = subida.finalizar()
+    assert subida.finalizar() is info
+
+    destino = servidor_drive.hijos(ejecucion, "mongod-audit-log")[0]["id"]
+    assert [f["name"] for f in servidor_drive.hijos(destino)] == ["audit.log.gz"]
@@ -0,0 +1,57 @@
+"""Lotes de Drive contra el servidor local (tests/fake_drive.py)."""
+from src import drive, drive_batch
+
+
+def test_busquedas_agrupadas_en_un_lote(servidor_drive):
+    service = servidor_drive.servicio()
+    raiz = servidor_drive.carpeta("raiz")
+    for nombre in ("a", "b"):
+        servidor_drive.carpeta(nombre, raiz)
+
+    ids = drive._buscar_o_crear_carpetas(service, ["a", "b", "c", "d"], raiz)
+
+    assert set(ids) == {"a", "b", "c", "d"}
+    # Un lote para las 4 búsquedas y otro para las 2 creaciones
+    assert servidor_drive.peticiones["batch"] == 2
+    assert servidor_drive.peticiones["list"] == 4
+    assert servidor_drive.peticiones["create"] == 2
+
+
+def test_creacion_aplicada_con_error_no_se_duplica(servidor_drive):
+    service = servidor_drive.servicio()
+    raiz = servidor_drive.carpeta("raiz")
+    # "c" se crea en Drive pero la respuesta es un 503
+    servidor_drive.fallar_tras_crear = {"c"}
+
+    ids = drive._buscar_o_crear_carpetas(service, ["c", "d"], raiz)
+
+    assert [f["id"] for f in servidor_drive.hijos(raiz, "c")] == [ids["c"]]
+    assert len(servidor_drive.hijos(raiz, "d")) == 1
+    # La creación de "c" no se reenvía: se comprueba con una búsqueda
+    assert servidor_drive.peticiones["create"] == 2
+
+
+def test_crear_carpeta_suelta_no_se_duplica(servidor_drive):
+    service = servidor_drive.servicio()
+    raiz = servidor_drive.carpeta("raiz")
+    servidor_drive.fallar_tras_crear = {"sola"}
+
+    folder_id = drive._crear_carpetas(service, ["sola"], raiz)["sola"]
+
+    assert [f["id"] for f in servidor_drive.hijos(raiz, "sola")] == [folder_id]
+    assert servidor_drive.peticiones["create"] == 1
+
+
+def test_lote_sin_comprobar_reenvia_errores_transitorios(servidor_drive):
+    service = servidor_drive.servicio()
+    raiz = servidor_drive.carpeta("raiz")
+    servidor_drive.fallar_tras_crear = {"x"}
+    peticion = service.files().create(
+        body={"name": "x", "mimeType": "application/vnd.google-apps.folder", "parents": [raiz]}, fields="id"
+    )
+
+    resp, error = drive_batch.ejecutar_lote(service, {"x": peticion})["x"]
+
+    # Sin `comprobar` el reintento es ciego: es lo que evita el parámetro
+    assert error is None and resp["id"]
+    assert len(servidor_drive.hijos(raiz, "x")) == 2
@@ -0,0 +1,76 @@
+"""Resolución de carpetas con el espejo local activo (tests/fake_drive.py)."""
+import pytest
+
+from src import drive
+
+
+@pytest.fixture
+def con_espejo(servidor_drive, tmp_path, monkeypatch):
+    """Espejo activo sobre una raíz del Drive local; devuelve (service, raiz)."""
+    raiz = servidor_drive.carpeta("raiz")
+    monkeypatch.setattr(drive.config, "DRIVE_ESPEJO", True)
+    monkeypatch.setattr(drive.config, "DRIVE_PARENT_FOLDER_ID", raiz)
+    monkeypatch.setattr(drive.config, "DRIVE_ESPEJO_PATH", tmp_path / "espejo.sqlite3")
+    monkeypatch.setattr(drive, "_espejo", None)
+    monkeypatch.setattr(drive, "_espejo_fallido", False)
+    return servidor_drive.servicio(), raiz
+
+
+def test_carpeta_creada_tras_sincronizar_no_se_duplica(servidor_drive, con_espejo):
+    service, raiz = con_espejo
+    drive._get_espejo(service)
+    # Otra ejecución crea "2026" después de la sincronización
+    externa = servidor_drive.carpeta("2026", raiz)
+
+    ids = drive._buscar_o_crear_carpetas(service, ["2026", "2027"], raiz)
+
+    assert ids["2026"] == externa
+    assert len(servidor_drive.hijos(raiz, "2026")) == 1
+    assert servidor_drive.peticiones["create"] == 1
+
+
+def test_ruta_del_espejo_se_valida_en_un_lote(servidor_drive, con_espejo):
+    service, raiz = con_espejo
+    anno = servidor_drive.carpeta("2026", raiz)
+    trimestre = servidor_drive.carpeta("1Q", anno)
+    mongodb = servidor_drive.carpeta("MONGODB", trimestre)
+    drive._get_espejo(service)
+    antes = sum(servidor_drive.peticiones.values())
+
+    assert drive._resolver_ruta(service, ["2026", "1Q", "MONGODB"], raiz) == mongodb
+    # Un lote con los tres files().get: sin búsquedas por nombre ni creaciones
+    assert servidor_drive.peticiones["batch"] == 1
+    assert servidor_drive.peticiones["get"] == 3
+    assert sum(servidor_drive.peticiones.values()) - antes == 4
+
+
+def test_carpeta_movida_fuera_se_resuelve_en_vivo(servidor_drive, con_espejo):
+    service, raiz = con_espejo
+    otra_raiz = servidor_drive.carpeta("otra")
+    vieja = servidor_drive.carpeta("2026", raiz)
+    espejo = drive._get_espejo(service)
+    # Se mueve sin que el espejo se entere (sin volver a sincronizar)
+    servidor_drive.archivos[vieja]["parents"] = [otra_raiz]
+
+    nueva = drive._resolver_ruta(service, ["2026", "1Q"], raiz)
+
+    anno = servidor_drive.hijos(raiz, "2026")
+    assert len(anno) == 1 and anno[0]["id"] != vieja
+    assert servidor_drive.hijos(anno[0]["id"], "1Q")[0]["id"] == nueva
+    assert espejo.buscar(raiz, "2026", carpeta=True) == anno[0]["id"]
+
+
+def test_cambios_fuera_del_subarbol_se_descartan(servidor_drive, con_espejo):
+    service, raiz = con_espejo
+    espejo = drive._get_espejo(service)
+    ajena = servidor_drive.carpeta("ajena")
+    servidor_drive.carpeta("dentro_de_ajena", ajena)
+    anno = servidor_drive.carpeta("2026", raiz)
+    trimestre = servidor_drive.carpeta("1Q", anno)
+
+    espejo.sincronizar(service)
+
+    # La carpeta nueva y su hija (en la misma página de cambios) entran; lo ajeno no
+    assert espejo.buscar(raiz, "2026", carpeta=True) == anno
+    assert espejo.buscar(anno, "1Q", carpeta=True) == trimestre
+    assert not espejo.contiene(ajena)
@@ -0,0 +1,81 @@
+"""Subidas a Drive contra el servidor local (tests/fake_drive.py)."""
+import hashlib
+
+import pytest
+
+from src import drive
+
+
+@pytest.fixture
+def servicio(servidor_drive, monkeypatch):
+    service = servidor_drive.servicio()
+    monkeypatch.setattr(drive, "_get_service", lambda: service)
+    monkeypatch.setattr(drive.config, "DRIVE_SYNC_INCREMENTAL", True)
+    monkeypatch.setattr(drive.config, "DRIVE_LARGE_FILE_MB", 0)
+    monkeypatch.setattr(drive.config, "DRIVE_CHUNK_MB", 1)
+    return service
+
+
+def _log(tmp_path, proceso: str = "mongod", mb: int = 3) -> tuple:
+    contenido = bytes(range(256)) * (mb * 4096)
+    path = tmp_path / proceso / "mongodb.log.gz"
+    path.parent.mkdir(parents=True, exist_ok=True)
+    path.write_bytes(contenido)
+    return path, contenido
+
+
+def test_log_de_una_ejecucion_anterior_se_copia(servidor_drive, servicio, tmp_path):
+    path, contenido = _log(tmp_path)
+    mongodb = servidor_drive.carpeta("MONGODB")
+    anterior = servidor_drive.carpeta("mongod", servidor_drive.carpeta("20260301_100000", mongodb))
+    servidor_drive.archivo(path.name, anterior, contenido)
+    actual = servidor_drive.carpeta("mongod", servidor_drive.carpeta("20260301_110000", mongodb))
+
+    resultado = drive._subir_tarea(path, actual, [])
+
+    assert resultado["omitido"]
+    assert servidor_drive.peticiones["copy"] == 1
+    assert servidor_drive.peticiones["upload_start"] == 0
+    [copia] = servidor_drive.hijos(actual, path.name)
+    assert copia["id"] == resultado["id"]
+    assert copia["md5Checksum"] == hashlib.md5(contenido).hexdigest()
+
+
+def test_log_con_otro_contenido_se_sube(servidor_drive, servicio, tmp_path):
+    path, contenido = _log(tmp_path)
+    anterior = servidor_drive.carpeta("anterior")
+    servidor_drive.archivo(path.name, anterior, contenido[:-1])
+    actual = servidor_drive.carpeta("actual")
+
+    resultado = drive._subir_tarea(path, actual, [])
+
+    assert "omitido" not in resultado
+    assert servidor_drive.peticiones["copy"] == 0
+    assert servidor_drive.bytes_recibidos == len(contenido)
+    assert [f["id"] for f in servidor_drive.hijos(actual, path.name)] == [resultado["id"]]
+
+
+def test_subida_interrumpida_se_reanuda_en_la_siguiente_ejecucion(servidor_drive, servicio, tmp_path, monkeypatch):
+    path, contenido = _log(tmp_path)
+    run1 = servidor_drive.carpeta("mongod", servidor_drive.carpeta("20260301_100000"))
+    run2 = servidor_drive.carpeta("mongod", servidor_drive.carpeta("20260301_110000"))
+
+    # Primera ejecución: el servidor falla a partir del tercer chunk hasta agotar los reintentos
+    servidor_drive.cortar_subida_tras = 2
+    with pytest.raises(Exception):
+        drive._subir_archivo(servicio, path, run1)
+    assert servidor_drive.bytes_recibidos == 2 * 1024 * 1024
+
+    # Reinicio del proceso: estado leído de disco, servicio nuevo, otra carpeta [run_ts]
+    servidor_drive.cortar_subida_tras = None
+    monkeypatch.setattr(drive, "_estado_subidas", None)
+    resultado = drive._subir_archivo(servidor_drive.servicio(), path, run2)
+
+    assert servidor_drive.bytes_recibidos == len(contenido)
+    assert servidor_drive.peticiones["upload_start"] == 1
+    assert [f["id"] for f in servidor_drive.hijos(run2)] == [resultado["id"]]
+    assert servidor_drive.hijos(run1) == []
+    assert servidor_drive.contenidos[resultado["id"]] == contenido
+    assert drive._get_estado_subidas().obtener(
+        drive.EstadoSubidas.clave("mongod", path.name, hashlib.md5(contenido).hexdigest(), len(contenido))
+    ) is None
@@ -0,0 +1,58 @@
+"""Paquetes de evidencias: determinismo y extracción por rango desde Drive."""
+import hashlib
+import os
+
+import pytest
+
+from src import drive, evidence_bundle
+
+
+@pytest.fixture
+def capturas(tmp_path):
+    carpeta = tmp_path / "mongod"
+    carpeta.mkdir()
+    for i in range(3):
+        (carpeta / f"captura_{i}.png").write_bytes(bytes([i]) * (1000 + i))
+    return carpeta
+
+
+def _md5(path) -> str:
+    return hashlib.md5(path.read_bytes()).hexdigest()
+
+
+def test_paquete_identico_entre_ejecuciones(capturas, tmp_path):
+    tar1, manifiesto1, _ = evidence_bundle.empaquetar(capturas, tmp_path / "run1", 1)
+    tar2, manifiesto2, _ = evidence_bundle.empaquetar(capturas, tmp_path / "run2", 1)
+
+    assert _md5(tar1) == _md5(tar2)
+    assert _md5(manifiesto1) == _md5(manifiesto2)
+
+
+def test_paquete_identico_con_otra_copia_de_las_capturas(capturas, tmp_path):
+    # Las mismas capturas descargadas de nuevo: otra hora de modificación y otros permisos
+    copia = tmp_path / "copia" / "mongod"
+    copia.mkdir(parents=True)
+    for i, original in enumerate(sorted(capturas.iterdir())):
+        destino = copia / original.name
+        destino.write_bytes(original.read_bytes())
+        os.utime(destino, (1_700_000_000 + i, 1_700_000_000 + i))
+        destino.chmod(0o600)
+
+    tar1, _, _ = evidence_bundle.empaquetar(capturas, tmp_path / "run1", 1)
+    tar2, _, _ = evidence_bundle.empaquetar(copia, tmp_path / "run2", 1)
+
+    assert _md5(tar1) == _md5(tar2)
+
+
+def test_extraer_evidencia_usa_el_manifiesto_de_la_carpeta(servidor_drive, capturas, tmp_path, monkeypatch):
+    monkeypatch.setattr(drive, "_get_service", servidor_drive.servicio)
+    tar, manifiesto, _ = evidence_bundle.empaquetar(capturas, tmp_path / "paquete", 1)
+    carpeta_id = servidor_drive.carpeta("mongod")
+    servidor_drive.archivo(tar.name, carpeta_id, tar.read_bytes())
+    servidor_drive.archivo(manifiesto.name, carpeta_id, manifiesto.read_bytes())
+
+    salida = drive.extraer_evidencia(carpeta_id, "captura_1.png", tmp_path / "extraidas")
+
+    assert salida.read_bytes() == (capturas / "captura_1.png").read_bytes()
+    with pytest.raises(FileNotFoundError):
+        drive.extraer_evidencia(carpeta_id, "no_existe.png", tmp_path / "extraidas")
@@ -0,0 +1,60 @@
+"""Lectura del OTP contra el servidor local de Gmail (tests/fake_gmail.py)."""
+import time
+
+import pytest
+
+from src import gmail_otp
+from tests.fake_gmail import ServidorGmail
+
+
+@pytest.fixture
+def gmail(monkeypatch):
+    monkeypatch.setattr(gmail_otp.config, "OTP_INTERVALO_MIN_SEG", 0.05)
+    monkeypatch.setattr(gmail_otp.config, "OTP_INTERVALO_MAX_SEG", 0.2)
+    with ServidorGmail() as servidor:
+        service = servidor.servicio()
+        monkeypatch.setattr(gmail_otp, "_get_service", lambda: service)
+        yield servidor
+
+
+def test_otp_por_historial(gmail):
+    marca = gmail_otp.marcar_buzon()
+    envio = time.time()
+    gmail.entregar("482913", retraso=0.3)
+
+    assert gmail_otp.obtener_otp(timeout_seg=5, after_ts=envio, history_id=marca) == "482913"
+    assert gmail.peticiones["list"] == 0
+    assert gmail.peticiones["get"] == 1
+
+
+def test_mensaje_borrado_en_el_historial_se_omite(gmail):
+    marca = gmail_otp.marcar_buzon()
+    envio = time.time()
+    gmail.entregar("111111", borrado=True)
+    gmail.entregar("482913", retraso=0.3)
+
+    assert gmail_otp.obtener_otp(timeout_seg=5, after_ts=envio, history_id=marca) == "482913"
+    # El 404 no hace caer a la búsqueda clásica
+    assert gmail.peticiones["list"] == 0
+
+
+def test_otp_por_busqueda_sin_marca(gmail):
+    envio = time.time()
+    gmail.entregar("482913", retraso=0.2)
+
+    assert gmail_otp.obtener_otp(timeout_seg=5, intervalo_seg=1, after_ts=envio) == "482913"
+    assert gmail.peticiones["history"] == 0
+
+
+def test_intervalo_fijo_en_la_ventana_rapida(gmail, monkeypatch):
+    monkeypatch.setattr(gmail_otp.config, "OTP_INTERVALO_MIN_SEG", 0.2)
+    monkeypatch.setattr(gmail_otp.config, "OTP_INTERVALO_MAX_SEG", 2)
+    monkeypatch.setattr(gmail_otp.config, "OTP_VENTANA_RAPIDA_SEG", 10)
+    marca = gmail_otp.marcar_buzon()
+    envio = time.time()
+    gmail.entregar("482913", retraso=3)
+
+    assert gmail_otp.obtener_otp(timeout_seg=10, after_ts=envio, history_id=marca) == "482913"
+    # Sin crecer el intervalo: un sondeo cada 0,2 s hasta que llega (~15), no ~6
+    assert gmail.peticiones["history"] >= 12
+    assert time.time() - envio < 3.5
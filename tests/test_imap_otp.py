@@ -0,0 +1,62 @@
+"""Escucha IMAP IDLE contra el servidor local (tests/fake_imap.py)."""
+import shutil
+import time
+
+import pytest
+
+from src import imap_otp
+from tests.fake_imap import ServidorImap, correo_otp, generar_certificado
+
+pytestmark = pytest.mark.skipif(shutil.which("openssl") is None, reason="hace falta openssl para el TLS local")
+
+
+@pytest.fixture
+def imap(tmp_path, monkeypatch):
+    cert, clave = generar_certificado(tmp_path)
+    with ServidorImap(cert, clave) as servidor:
+        monkeypatch.setattr(imap_otp.config, "IMAP_HOST", "127.0.0.1")
+        monkeypatch.setattr(imap_otp.config, "IMAP_PORT", servidor.puerto)
+        monkeypatch.setattr(imap_otp.config, "IMAP_AUTH", "password")
+        monkeypatch.setattr(imap_otp.config, "IMAP_USER", "bot@example.com")
+        monkeypatch.setattr(imap_otp.config, "IMAP_PASSWORD", "secreto")
+        yield servidor
+
+
+@pytest.fixture
+def escucha(imap):
+    escucha = imap_otp.EscuchaImap()
+    escucha.abrir()
+    yield escucha
+    escucha.cerrar()
+
+
+def test_otp_por_idle(imap, escucha):
+    envio = time.time() - 1
+    imap.entregar(correo_otp("482913"), retraso=0.3)
+
+    assert escucha.esperar_otp(5, after_ts=envio) == "482913"
+
+
+def test_aviso_durante_la_busqueda_no_se_pierde(imap, escucha):
+    envio = time.time() - 1
+    # El OTP llega mientras se procesa el aviso del primer correo (de otro remitente)
+    imap.durante_busqueda = [correo_otp("482913")]
+    imap.entregar(correo_otp("000000", remitente="otro@example.com"))
+
+    assert escucha.esperar_otp(3, after_ts=envio) == "482913"
+
+
+def test_aviso_pegado_a_la_respuesta_del_fetch_no_se_pierde(imap, escucha):
+    envio = time.time() - 1
+    # El EXISTS llega en el mismo envío TCP que la respuesta del FETCH
+    imap.tras_fetch = [correo_otp("482913")]
+    imap.entregar(correo_otp("000000", remitente="otro@example.com"))
+
+    assert escucha.esperar_otp(3, after_ts=envio) == "482913"
+
+
+def test_sin_correo_agota_el_tiempo(escucha):
+    inicio = time.monotonic()
+    with pytest.raises(TimeoutError):
+        escucha.esperar_otp(1)
+    assert time.monotonic() - inicio < 3
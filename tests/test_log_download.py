@@ -0,0 +1,89 @@
+"""Descarga de logs por HTTP contra el servidor local (tests/fake_atlas_logs.py)."""
+from datetime import date
+import gzip
+import os
+
+import httpx
+import pytest
+
+from src import log_download
+from tests.fake_atlas_logs import COOKIE, ServidorLogs
+
+HOST = "vis-data-prd-shard-00-02.ofu2u.mongodb.net"
+INICIO, FIN = date(2026, 2, 1), date(2026, 2, 15)
+
+
+class _Contexto:
+    """Lo único que log_download usa del BrowserContext de Playwright."""
+
+    def __init__(self, cookies: list[dict]):
+        self._cookies = cookies
+
+    def cookies(self) -> list[dict]:
+        return self._cookies
+
+
+SESION = _Contexto([{"name": COOKIE[0], "value": COOKIE[1], "domain": "127.0.0.1", "path": "/"}])
+
+
+@pytest.fixture
+def atlas(monkeypatch):
+    datos = {
+        # Poco comprimible para que ocupe varios bloques
+        "mongodb-audit-log": gzip.compress(os.urandom(3 * 1024 * 1024)),
+        "mongodb": gzip.compress(b'{"t":{"$date":"2026-02-01"},"msg":"Connection accepted"}\n' * 2000),
+    }
+    with ServidorLogs(datos) as servidor:
+        monkeypatch.setattr(
+            log_download.config, "ATLAS_LOG_URL",
+            servidor.url + "v2/{project_id}/logs/{hostname}/{proceso}.gz?startDate={inicio}&endDate={fin}",
+        )
+        monkeypatch.setattr(log_download.config, "ATLAS_DESCARGA_BLOQUE_KB", 64)
+        yield servidor
+    log_download.cerrar()
+
+
+def _descargar(proceso: str, carpeta, contexto=SESION):
+    url = log_download.url_log(HOST, proceso, INICIO, FIN)
+    return log_download.descargar_con_sesion(
+        contexto, "Mozilla/5.0 prueba", url, carpeta, log_download.nombre_log(HOST, proceso)
+    )
+
+
+def test_descarga_los_dos_logs_con_la_sesion(atlas, tmp_path):
+    audit = _descargar("mongodb-audit-log", tmp_path)
+    general = _descargar("mongodb", tmp_path)
+
+    assert audit.name == f"{HOST}_MONGODB_AUDIT_LOG.log.gz"
+    assert general.name == f"{HOST}_mongodb.log.gz"
+    assert audit.read_bytes() == atlas.logs["mongodb-audit-log"]
+    assert gzip.decompress(general.read_bytes()).startswith(b'{"t":')
+    assert not list(tmp_path.glob("*.part"))
+    # Mismo rango que el modal: 12:00am → 11:30pm en America/Lima
+    assert atlas.peticiones[0]["startDate"] == "1769922000"
+    assert atlas.peticiones[0]["endDate"] == "1771216200"
+    # Una sola conexión keep-alive para las dos descargas
+    assert len(atlas.conexiones) == 1
+
+
+def test_sin_content_disposition_usa_el_nombre_del_modal(atlas, tmp_path):
+    atlas.sin_nombre = True
+    assert _descargar("mongodb-audit-log", tmp_path).name == f"{HOST}_MONGODB_AUDIT_LOG.log.gz"
+
+
+def test_content_encoding_no_descomprime_el_gz(atlas, tmp_path):
+    atlas.con_encoding = True
+    assert _descargar("mongodb", tmp_path).read_bytes() == atlas.logs["mongodb"]
+
+
+def test_sesion_caducada_no_deja_archivos(atlas, tmp_path):
+    with pytest.raises(RuntimeError, match="HTML"):
+        _descargar("mongodb-audit-log", tmp_path, contexto=_Contexto([]))
+    assert not list(tmp_path.iterdir())
+
+
+def test_descarga_cortada_no_deja_archivos(atlas, tmp_path):
+    atlas.cortar_en = 512 * 1024
+    with pytest.raises((RuntimeError, httpx.HTTPError)):
+        _descargar("mongodb-audit-log", tmp_path)
+    assert not list(tmp_path.iterdir())